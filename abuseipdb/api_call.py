@@ -1,6 +1,40 @@
-import requests
 import os
+import socket
+import struct
 import ipaddress
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from abuseipdb.rate_limit import get_rate_limiter
+from abuseipdb.metrics import get_metrics
+from abuseipdb.retry import RetryPolicy, CircuitBreaker
+from abuseipdb.singleflight import SingleFlight
+
+API_BASE_URL = 'https://api.abuseipdb.com/api/v2'
+MAX_AGE_IN_DAYS = 90
+MEDIUM_RISK_SCORE = 25
+# classify_risk_levels() returns indexes into this tuple
+RISK_LEVELS = ("LOW", "MEDIUM", "HIGH")
+_V4_MAPPED_PREFIX = bytes(10) + b"\xff\xff"
+
+
+# Imported by _import_requests() when the first request is sent
+requests = None
+_requests_lock = threading.Lock()
+
+def _import_requests():
+    """
+    Returns the requests module, importing it on first use so validation-only
+    and cache-hit runs never pay for it. Threads racing on the first request
+    wait for one complete import.
+    """
+    global requests
+    if requests is None:
+        with _requests_lock:
+            if requests is None:
+                import requests as module
+                requests = module
+    return requests
 
 
 def is_valid_ip(ip):
@@ -11,53 +45,446 @@ def is_valid_ip(ip):
     except ValueError:
         return False
 
-def calculate_risk_level(abuse_confidence_score):
+def is_network(value):
+    """Checks if a string is a CIDR network (e.g. 203.0.113.0/24) rather than a single address."""
+    if not isinstance(value, str) or "/" not in value:
+        return False
+    try:
+        ipaddress.ip_network(value.strip(), strict=False)
+        return True
+    except ValueError:
+        return False
+
+def canonical_ip(ip):
+    """
+    Returns the canonical spelling of an IP address, or None if it is invalid.
+    Surrounding whitespace is ignored, IPv6 is compressed and lower-cased, and
+    IPv4-mapped IPv6 addresses (::ffff:a.b.c.d) collapse to plain IPv4.
+    """
+    if not isinstance(ip, str):
+        return None
+    try:
+        address = ipaddress.ip_address(ip.strip())
+    except ValueError:
+        return None
+    if address.version == 6 and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    return str(address)
+
+def confidence_threshold():
+    """Score from which an IP counts as HIGH risk (CONFIDENCE_THRESHOLD, default 70)."""
+    return int(os.getenv('CONFIDENCE_THRESHOLD', 70))
+
+def calculate_risk_level(abuse_confidence_score, threshold=None):
     """
     Categorizes risk level (HIGH/MEDIUM/LOW) based on abuse confidence score.
+    Pass `threshold` to skip reading CONFIDENCE_THRESHOLD on every call.
     """
-    confidence=int(os.getenv('CONFIDENCE_THRESHOLD', 70))
+    confidence=confidence_threshold() if threshold is None else threshold
     if abuse_confidence_score >= confidence:
         return "HIGH"
-    elif abuse_confidence_score>=25:
+    elif abuse_confidence_score>=MEDIUM_RISK_SCORE:
         return "MEDIUM"
     return "LOW"
 
+def pack_ips(ip_addresses):
+    """
+    Validates and parses a whole sequence of IP strings at once.
+
+    Returns three parallel arrays: the IP version of each input (array('B'):
+    4, 6, or 0 when is_valid_ip would reject it) and the address as a 128-bit
+    integer split into high and low 64-bit halves (array('Q'); an IPv4
+    address is in the low half). IPv4-mapped IPv6 addresses are packed as
+    IPv4, as canonical_ip does. Most inputs are parsed by inet_pton without
+    raising; only the rest go through ipaddress, so the rules stay the same.
+    """
+    versions = array("B")
+    high = array("Q")
+    low = array("Q")
+    add_version, add_high, add_low = versions.append, high.append, low.append
+    pton, AF_INET, AF_INET6 = socket.inet_pton, socket.AF_INET, socket.AF_INET6
+    unpack4, unpack6 = struct.Struct("!I").unpack, struct.Struct("!QQ").unpack
+    for ip in ip_addresses:
+        try:
+            value, = unpack4(pton(AF_INET, ip))
+            add_version(4)
+            add_high(0)
+            add_low(value)
+            continue
+        except (OSError, TypeError, ValueError):
+            pass
+        try:
+            packed = pton(AF_INET6, ip)
+        except (OSError, TypeError, ValueError):
+            # Forms inet_pton does not take (scoped IPv6, packed bytes, ...)
+            try:
+                address = ipaddress.ip_address(ip)
+            except ValueError:
+                add_version(0)
+                add_high(0)
+                add_low(0)
+                continue
+            packed = address.packed if address.version == 6 else _V4_MAPPED_PREFIX + address.packed
+        if packed[:12] == _V4_MAPPED_PREFIX:
+            value, = unpack4(packed[12:])
+            add_version(4)
+            add_high(0)
+            add_low(value)
+        else:
+            first, second = unpack6(packed)
+            add_version(6)
+            add_high(first)
+            add_low(second)
+    return versions, high, low
+
+def _risk_table(threshold, signed):
+    """Byte translation table from a 1-byte score to its RISK_LEVELS index."""
+    table = bytearray(256)
+    for byte in range(256):
+        score = byte - 256 if signed and byte > 127 else byte
+        table[byte] = 2 if score >= threshold else 1 if score >= MEDIUM_RISK_SCORE else 0
+    return bytes(table)
+
+def classify_risk_levels(scores, threshold=None):
+    """
+    calculate_risk_level over a whole score column in one pass.
+
+    Returns each score's index into RISK_LEVELS (0 LOW, 1 MEDIUM, 2 HIGH):
+    a NumPy uint8 array for a NumPy input, array('B') otherwise. The
+    threshold is read once. NumPy arrays are compared vectorized, and 1-byte
+    arrays (such as ResultStore's score column) are classified with a single
+    bytes.translate(); any other sequence falls back to a Python loop.
+    """
+    threshold = confidence_threshold() if threshold is None else threshold
+    if type(scores).__module__ == "numpy":
+        import numpy
+        levels = (scores >= MEDIUM_RISK_SCORE).astype(numpy.uint8)
+        levels[scores >= threshold] = 2
+        return levels
+    if isinstance(scores, array) and scores.typecode in ("b", "B"):
+        return array("B", scores.tobytes().translate(_risk_table(threshold, scores.typecode == "b")))
+    return array("B", [2 if score >= threshold else 1 if score >= MEDIUM_RISK_SCORE else 0
+                       for score in scores])
+
 def status_code_message(data):
     if data.get("error") == "invalid_ip":
         return 1, "failed"
-    if data.get("error") in ["api_failed", "missing_api_key"]:
+    if data.get("error") in ["api_failed", "missing_api_key", "rate_limited"]:
         return 2, "failed"
     return 0, "success"
 
-def make_ip_check_request(ip_address):
+def make_ip_check_request(ip_address, limiter=None, session=None, api_key=None,
+                          base_url=API_BASE_URL, timeout=10, max_age_in_days=MAX_AGE_IN_DAYS,
+                          retry=None, breaker=None):
     """
     Fetches IP reputation data from AbuseIPDB using environment variables.
+    Every call goes through the shared rate limiter (or `limiter`, if given).
+    A `session` and `api_key` can be passed in to reuse pooled connections and
+    configuration, as AbuseIPDBClient does. A single attempt is made unless a
+    RetryPolicy (`retry`) and/or CircuitBreaker (`breaker`) is given.
     Returns the 'data' payload from the API or an error dictionary.
     """
-    if not is_valid_ip(ip_address):
+    metrics = get_metrics()
+    with metrics.timer("validation"):
+        valid = is_valid_ip(ip_address)
+    if not valid:
+        metrics.error("invalid_ip")
         return {"error": "invalid_ip","message":"Invalid IP address format"}
     
-    api_key = os.getenv('ABUSEIPDB_API_KEY')
-    if not api_key:
-        return {"error": "missing_api_key", "message": "ABUSEIPDB_API_KEY not set"}
-    url = 'https://api.abuseipdb.com/api/v2/check'
     querystring = {
             'ipAddress': ip_address,
-            'maxAgeInDays': '90'   
+            'maxAgeInDays': str(max_age_in_days)
         }
+    return _api_get('check', querystring, limiter or get_rate_limiter(), session, api_key,
+                    base_url, timeout, retry, breaker)
+
+def make_block_check_request(network, limiter=None, session=None, api_key=None,
+                             base_url=API_BASE_URL, timeout=10, max_age_in_days=MAX_AGE_IN_DAYS,
+                             retry=None, breaker=None):
+    """
+    Fetches the reports for a whole CIDR network from /check-block in one request.
+    Returns the 'data' payload (networkAddress, netmask, reportedAddress, ...)
+    or an error dictionary. check-block has its own daily quota, so it is not
+    paced by the /check rate limiter unless a `limiter` is given.
+    """
+    if not is_network(network):
+        return {"error": "invalid_ip", "message": "Invalid network format"}
+    querystring = {
+        'network': str(ipaddress.ip_network(network.strip(), strict=False)),
+        'maxAgeInDays': str(max_age_in_days)
+    }
+    return _api_get('check-block', querystring, limiter, session, api_key, base_url, timeout,
+                    retry, breaker)
+
+def make_blacklist_request(confidence_minimum=90, limit=10000, limiter=None, session=None,
+                           api_key=None, base_url=API_BASE_URL, timeout=30, retry=None, breaker=None):
+    """
+    Downloads the AbuseIPDB blacklist from /blacklist.
+    Returns the list of entries (ipAddress, abuseConfidenceScore, countryCode,
+    lastReportedAt) or an error dictionary.
+    """
+    querystring = {
+        'confidenceMinimum': str(confidence_minimum),
+        'limit': str(limit)
+    }
+    return _api_get('blacklist', querystring, limiter, session, api_key, base_url, timeout,
+                    retry, breaker)
+
+def _api_get(endpoint, querystring, limiter, session, api_key, base_url, timeout,
+             retry=None, breaker=None):
+    """
+    Sends a GET to an API endpoint and returns its 'data' payload or an error dictionary.
+
+    With a RetryPolicy, timeouts, connection errors, 5xx responses and 429s are
+    retried with jittered exponential backoff; every attempt takes its own
+    limiter token. With a CircuitBreaker, upstream failures are counted and,
+    while the breaker is open, the call fails fast without touching the network.
+    Every attempt and every error (by type) is counted in the metrics registry.
+    """
+    metrics = get_metrics()
+    api_key = api_key or os.getenv('ABUSEIPDB_API_KEY')
+    if not api_key:
+        metrics.error("missing_api_key")
+        return {"error": "missing_api_key", "message": "ABUSEIPDB_API_KEY not set"}
+    url = f'{base_url}/{endpoint}'
     
     headers = {
         'Accept': 'application/json',
         'Key': api_key
     }
 
+    attempts = 1 + (retry.max_retries if retry is not None else 0)
+    for attempt in range(attempts):
+        if breaker is not None and not breaker.allow():
+            metrics.error("circuit_open")
+            return {"error": "api_failed", "message": "API unavailable (circuit open)"}
+        if limiter is not None and not limiter.acquire():
+            if breaker is not None:
+                breaker.release()
+            metrics.error("quota_exhausted")
+            return {"error": "rate_limited", "message": "Daily API quota exhausted"}
+
+        metrics.request(endpoint)
+        data, retryable, retry_after = _send(url, headers, querystring, limiter, session, timeout,
+                                             breaker, metrics)
+        if not retryable or attempt == attempts - 1:
+            return data
+        if retry_after is not None and limiter is None:
+            # Without a limiter to pause for us, honour a short Retry-After ourselves.
+            if retry_after > retry.max_delay:
+                return data
+            retry.wait(attempt, retry_after)
+        elif retry_after is None:
+            retry.wait(attempt)
+        # A 429 seen by the limiter is waited out in the next acquire().
+    return data
+
+def _send(url, headers, querystring, limiter, session, timeout, breaker, metrics):
+    """
+    Sends one HTTP attempt. Returns (result, retryable, retry_after), where
+    retry_after is the Retry-After of a 429 response (None otherwise).
+    """
+    http_lib = _import_requests()
+    try:
+        http = session if session is not None else http_lib
+        with metrics.timer("http"):
+            response = http.get(url=url, headers=headers, params=querystring, timeout=timeout)
+    except http_lib.exceptions.RequestException as exc:
+        if isinstance(exc, http_lib.exceptions.Timeout):
+            metrics.error("timeout")
+        elif isinstance(exc, http_lib.exceptions.ConnectionError):
+            metrics.error("connection")
+        else:
+            metrics.error("request")
+        if breaker is not None:
+            breaker.record_failure()
+        return {"error": "api_failed", "message":"API request failed"}, True, None
+
+    if limiter is not None:
+        limiter.observe(response.status_code, response.headers)
+    if response.status_code == 429:
+        metrics.error("http_429")
+        if breaker is not None:
+            breaker.record_success()
+        retry_after = _header_seconds(response.headers, 'Retry-After')
+        return ({"error": "rate_limited", "message": "API rate limit exceeded"}, True,
+                retry_after if retry_after is not None else 0.0)
     try:
-        response = requests.get(url=url, headers=headers, params=querystring, timeout=10)
         response.raise_for_status()
-    except requests.exceptions.RequestException:
-        return {"error": "api_failed", "message":"API request failed"}
+    except http_lib.exceptions.RequestException:
+        server_error = response.status_code >= 500
+        metrics.error("http_5xx" if server_error else "http_4xx")
+        if breaker is not None and server_error:
+            breaker.record_failure()
+        elif breaker is not None:
+            breaker.record_success()
+        return {"error": "api_failed", "message":"API request failed"}, server_error, None
+    if breaker is not None:
+        breaker.record_success()
 
-    data=response.json()
+    with metrics.timer("parse"):
+        data=response.json()
     if 'data' not in data: #if they change the structure in the future
-        return {"error": "api_failed", "message":"API response missing data"}
-    return data['data']
\ No newline at end of file
+        metrics.error("bad_response")
+        return {"error": "api_failed", "message":"API response missing data"}, False, None
+    return data['data'], False, None
+
+def _header_seconds(headers, name):
+    value = headers.get(name) if headers is not None else None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class AbuseIPDBClient:
+    """
+    Long-lived AbuseIPDB client for repeated lookups.
+
+    Holds a keep-alive requests.Session with a bounded connection pool, so
+    consecutive checks reuse one TCP+TLS connection per pooled slot instead of
+    opening a new one per call. The session is created on first use. The API
+    key and settings are read once, from the arguments or the ABUSEIPDB_*
+    environment variables.
+
+    With a ReputationCache, successful lookups are served locally until they
+    expire; `bypass_cache` (or ABUSEIPDB_CACHE_BYPASS=1) forces a fresh
+    request whose result still refreshes the cache.
+
+    Concurrent lookups of the same address (or network) are coalesced: while
+    one request is in flight, other callers wait for it and share its result
+    or error dictionary instead of sending their own.
+
+    When the cache has a soft TTL, entries past it are still returned at once
+    (stale-while-revalidate) and a refresh is queued on a background thread;
+    until it succeeds the stale entry keeps being served.
+
+    Transient failures (timeouts, 5xx, 429) are retried with jittered
+    exponential backoff per `retry_policy`, and a shared `breaker` stops
+    sending requests for a cool-down once the API keeps failing. Both default
+    to the ABUSEIPDB_MAX_RETRIES / ABUSEIPDB_BREAKER_* settings.
+    """
+
+    def __init__(self, api_key=None, pool_size=None, retries=None, timeout=None,
+                 base_url=None, limiter=None, cache=None, bypass_cache=None,
+                 max_age_in_days=MAX_AGE_IN_DAYS, retry_policy=None, breaker=None):
+        self.api_key = api_key or os.getenv('ABUSEIPDB_API_KEY')
+        self.cache = cache
+        if bypass_cache is None:
+            bypass_cache = os.getenv('ABUSEIPDB_CACHE_BYPASS', '') in ('1', 'true', 'yes')
+        self.bypass_cache = bypass_cache
+        self.max_age_in_days = max_age_in_days
+        self.flight = SingleFlight()
+        self._background = None
+        self._revalidating = set()
+        self._lock = threading.Lock()
+        self.base_url = (base_url or os.getenv('ABUSEIPDB_BASE_URL') or API_BASE_URL).rstrip('/')
+        self.timeout = timeout or float(os.getenv('ABUSEIPDB_TIMEOUT', 10))
+        self.limiter = limiter
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy.from_env()
+        self.breaker = breaker if breaker is not None else CircuitBreaker.from_env()
+        if pool_size is None:
+            pool_size = int(os.getenv('ABUSEIPDB_POOL_SIZE', 10))
+        if retries is None:
+            retries = int(os.getenv('ABUSEIPDB_CONNECT_RETRIES', 2))
+        self.pool_size = pool_size
+        self.retries = retries
+        self._session = None
+
+    @property
+    def session(self):
+        """The pooled requests.Session, created (and requests imported) on first use."""
+        if self._session is not None:
+            return self._session
+        with self._lock:
+            if self._session is None:
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                # Only connection failures are retried here: the request never reached
+                # the API, so retrying costs no quota.
+                retry = Retry(total=self.retries, connect=self.retries, read=0, status=0, other=0,
+                              backoff_factor=0.2, raise_on_status=False)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size,
+                                      max_retries=retry, pool_block=True)
+                session = _import_requests().Session()
+                session.headers.update({'Accept': 'application/json', 'Connection': 'keep-alive'})
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def check(self, ip_address, bypass_cache=False):
+        """Same contract as make_ip_check_request, over the pooled session and cache."""
+        with get_metrics().timer("lookup"):
+            return self._check(ip_address, bypass_cache)
+
+    def _check(self, ip_address, bypass_cache):
+        if not is_valid_ip(ip_address):
+            return make_ip_check_request(ip_address)
+        use_cache = self.cache is not None
+        if use_cache and not (bypass_cache or self.bypass_cache):
+            cached = self.cache.get_entry(ip_address, self.max_age_in_days)
+            if cached is not None:
+                data, stale = cached
+                if stale:
+                    self._revalidate(canonical_ip(ip_address))
+                return data
+        address = canonical_ip(ip_address)
+        return self.flight.do(("check", address), self._fetch, address, use_cache)
+
+    def _revalidate(self, address):
+        """Queues one background refresh of a stale cache entry."""
+        with self._lock:
+            if address in self._revalidating:
+                return
+            self._revalidating.add(address)
+            if self._background is None:
+                self._background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="abuseipdb-revalidate")
+        self._background.submit(self._refresh, address)
+
+    def _refresh(self, address):
+        try:
+            self.flight.do(("check", address), self._fetch, address, True)
+        finally:
+            with self._lock:
+                self._revalidating.discard(address)
+
+    def _fetch(self, ip_address, use_cache):
+        data = make_ip_check_request(ip_address, limiter=self.limiter, session=self.session,
+                                     api_key=self.api_key, base_url=self.base_url,
+                                     timeout=self.timeout, max_age_in_days=self.max_age_in_days,
+                                     retry=self.retry_policy, breaker=self.breaker)
+        if use_cache and "error" not in data:
+            self.cache.set(ip_address, self.max_age_in_days, data)
+        return data
+
+    def check_block(self, network):
+        """Looks up a whole CIDR network with a single /check-block request."""
+        def fetch():
+            return make_block_check_request(network, session=self.session, api_key=self.api_key,
+                                            base_url=self.base_url, timeout=self.timeout,
+                                            max_age_in_days=self.max_age_in_days,
+                                            retry=self.retry_policy, breaker=self.breaker)
+        return self.flight.do(("check-block", network.strip()), fetch)
+
+    def blacklist(self, confidence_minimum=90, limit=10000):
+        """Downloads the AbuseIPDB blacklist (a list of entries or an error dictionary)."""
+        return make_blacklist_request(confidence_minimum, limit, session=self.session,
+                                      api_key=self.api_key, base_url=self.base_url,
+                                      timeout=max(self.timeout, 30), retry=self.retry_policy,
+                                      breaker=self.breaker)
+
+    def close(self):
+        if self._background is not None:
+            self._background.shutdown(wait=True, cancel_futures=True)
+        if self._session is not None:
+            self._session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,82 @@
+import os
+import json
+import time
+from abuseipdb.api_call import canonical_ip
+
+
+class Blacklist:
+    """
+    Local copy of the AbuseIPDB /blacklist download.
+
+    Maps canonical addresses to their blacklist entry, so membership tests
+    and the reputation of listed addresses need no API call.
+    """
+
+    def __init__(self, entries=(), fetched_at=None):
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self._entries = {}
+        for entry in entries:
+            address = canonical_ip(entry.get("ipAddress"))
+            if address is not None:
+                self._entries[address] = entry
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, ip):
+        return canonical_ip(ip) in self._entries
+
+    def entries(self):
+        return list(self._entries.values())
+
+    def result_for(self, ip):
+        """
+        Returns a /check-shaped payload for a listed address, or None.
+        The blacklist carries no report count or ISP, so those are None.
+        """
+        address = canonical_ip(ip)
+        entry = self._entries.get(address)
+        if entry is None:
+            return None
+        return {
+            "ipAddress": address,
+            "abuseConfidenceScore": entry.get("abuseConfidenceScore"),
+            "totalReports": None,
+            "countryCode": entry.get("countryCode"),
+            "isp": None,
+            "lastReportedAt": entry.get("lastReportedAt"),
+            "source": "blacklist",
+        }
+
+    def save(self, path):
+        with open(path, "w") as handle:
+            json.dump({"fetched_at": self.fetched_at, "data": self.entries()}, handle)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as handle:
+            payload = json.load(handle)
+        return cls(payload.get("data", []), payload.get("fetched_at"))
+
+
+def fetch_blacklist(client, confidence_minimum=90, limit=10000):
+    """Downloads the blacklist through `client`; returns a Blacklist or an error dictionary."""
+    data = client.blacklist(confidence_minimum, limit)
+    if isinstance(data, dict) and "error" in data:
+        return data
+    return Blacklist(data)
+
+def load_or_fetch_blacklist(path, client, max_age=86400, confidence_minimum=90, limit=10000):
+    """
+    Returns the blacklist saved at `path`, downloading and saving a fresh copy
+    when the file is missing or older than `max_age` seconds.
+    Returns an error dictionary when a needed download fails.
+    """
+    if os.path.exists(path):
+        blacklist = Blacklist.load(path)
+        if time.time() - blacklist.fetched_at < max_age:
+            return blacklist
+    blacklist = fetch_blacklist(client, confidence_minimum, limit)
+    if isinstance(blacklist, Blacklist):
+        blacklist.save(path)
+    return blacklist
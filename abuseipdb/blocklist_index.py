@@ -0,0 +1,224 @@
+import sys
+import mmap
+import socket
+import heapq
+import struct
+import argparse
+import ipaddress
+from array import array
+from bisect import bisect_right
+
+_MAGIC = b"IPBL"
+_VERSION = 1
+# magic, version, byte order, v4 count, v6 count (24 bytes, keeps the arrays 8-byte aligned)
+_HEADER = struct.Struct("<4sHc1xQQ")
+
+
+def _interval(network):
+    """(version, first, last) integer bounds of an address or CIDR network string."""
+    net = ipaddress.ip_network(network.strip(), strict=False)
+    if net.version == 6 and net.prefixlen >= 96 and net.network_address.ipv4_mapped is not None:
+        net = ipaddress.ip_network(f"{net.network_address.ipv4_mapped}/{net.prefixlen - 96}")
+    return net.version, int(net.network_address), int(net.broadcast_address)
+
+def _parse(ip):
+    """(version, integer) for an address string, or None if it is invalid."""
+    if not isinstance(ip, str):
+        return None
+    ip = ip.strip()
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+    except OSError:
+        pass
+    try:
+        address = ipaddress.IPv6Address(ip)
+    except ValueError:
+        return None
+    if address.ipv4_mapped is not None:
+        return 4, int(address.ipv4_mapped)
+    return 6, int(address)
+
+def _segments(intervals):
+    """
+    Flattens possibly overlapping (first, last, score) intervals into sorted,
+    non-overlapping ones where each address keeps the highest score covering
+    it. Touching segments with the same score are merged.
+    """
+    events = []
+    for first, last, score in intervals:
+        events.append((first, score))
+        events.append((last + 1, -score - 1))
+    events.sort()
+    active = []
+    closed = {}
+    segments = []
+    i = 0
+    while i < len(events):
+        point = events[i][0]
+        while i < len(events) and events[i][0] == point:
+            value = events[i][1]
+            if value >= 0:
+                heapq.heappush(active, -value)
+            else:
+                score = -value - 1
+                closed[score] = closed.get(score, 0) + 1
+            i += 1
+        while active and closed.get(-active[0], 0):
+            closed[-active[0]] -= 1
+            heapq.heappop(active)
+        if i < len(events) and active:
+            score = -active[0]
+            end = events[i][0] - 1
+            if segments and segments[-1][1] == point - 1 and segments[-1][2] == score:
+                segments[-1][1] = end
+            else:
+                segments.append([point, end, score])
+    return segments
+
+
+class _U128Column:
+    """Read-only sequence of 128-bit integers stored as high/low 64-bit halves."""
+
+    def __init__(self, high, low):
+        self.high = high
+        self.low = low
+
+    def __len__(self):
+        return len(self.high)
+
+    def __getitem__(self, i):
+        return (self.high[i] << 64) | self.low[i]
+
+
+class BlocklistIndex:
+    """
+    Offline "is this address in a known-bad range?" index for IPv4 and IPv6.
+
+    Ranges are stored as sorted, non-overlapping integer intervals (start and
+    end columns plus a one-byte score per range), so a lookup is one binary
+    search with no network call. save() writes the columns as flat arrays
+    and load() memory-maps them, so even a large index opens instantly and
+    is shared between processes through the page cache.
+    """
+
+    def __init__(self, v4, v6, _mmap=None):
+        self._v4_starts, self._v4_ends, self._v4_scores = v4
+        self._v6_starts, self._v6_ends, self._v6_scores = v6
+        self._mmap = _mmap
+
+    @classmethod
+    def build(cls, entries):
+        """Builds an index from (address or CIDR network, score 0-100) pairs."""
+        intervals = {4: [], 6: []}
+        for network, score in entries:
+            version, first, last = _interval(network)
+            intervals[version].append((first, last, max(0, min(int(score), 100))))
+
+        v4 = _segments(intervals[4])
+        v6 = _segments(intervals[6])
+        mask = (1 << 64) - 1
+        return cls(
+            (array("I", (s[0] for s in v4)), array("I", (s[1] for s in v4)), array("B", (s[2] for s in v4))),
+            (_U128Column(array("Q", (s[0] >> 64 for s in v6)), array("Q", (s[0] & mask for s in v6))),
+             _U128Column(array("Q", (s[1] >> 64 for s in v6)), array("Q", (s[1] & mask for s in v6))),
+             array("B", (s[2] for s in v6))),
+        )
+
+    def __len__(self):
+        return len(self._v4_starts) + len(self._v6_starts)
+
+    def __contains__(self, ip):
+        return self.lookup(ip) is not None
+
+    def lookup(self, ip):
+        """Returns the score of the range containing `ip`, or None if it is not listed or invalid."""
+        parsed = _parse(ip)
+        if parsed is None:
+            return None
+        return self.lookup_int(*parsed)
+
+    def lookup_int(self, version, value):
+        """lookup() for an address already encoded as (IP version, integer)."""
+        if version == 4:
+            starts, ends, scores = self._v4_starts, self._v4_ends, self._v4_scores
+        else:
+            starts, ends, scores = self._v6_starts, self._v6_ends, self._v6_scores
+        i = bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return scores[i]
+        return None
+
+    def save(self, path):
+        """Writes the index in its flat, memory-mappable on-disk format."""
+        byteorder = b"<" if sys.byteorder == "little" else b">"
+        with open(path, "wb") as handle:
+            handle.write(_HEADER.pack(_MAGIC, _VERSION, byteorder, len(self._v4_starts), len(self._v6_starts)))
+            for column in (self._v6_starts.high, self._v6_starts.low, self._v6_ends.high, self._v6_ends.low,
+                           self._v4_starts, self._v4_ends, self._v4_scores, self._v6_scores):
+                handle.write(bytes(column))
+
+    @classmethod
+    def load(cls, path):
+        """Memory-maps an index written by save(); nothing is copied into memory."""
+        with open(path, "rb") as handle:
+            data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, byteorder, n4, n6 = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a blocklist index")
+        if byteorder != (b"<" if sys.byteorder == "little" else b">"):
+            raise ValueError(f"{path} was built on a machine with a different byte order")
+
+        view = memoryview(data)
+        offset = _HEADER.size
+
+        def column(fmt, count, size):
+            nonlocal offset
+            part = view[offset:offset + count * size].cast(fmt)
+            offset += count * size
+            return part
+
+        v6_start_high, v6_start_low = column("Q", n6, 8), column("Q", n6, 8)
+        v6_end_high, v6_end_low = column("Q", n6, 8), column("Q", n6, 8)
+        v4 = (column("I", n4, 4), column("I", n4, 4), column("B", n4, 1))
+        v6_scores = column("B", n6, 1)
+        v6 = (_U128Column(v6_start_high, v6_start_low), _U128Column(v6_end_high, v6_end_low), v6_scores)
+        return cls(v4, v6, _mmap=data)
+
+
+def read_cidr_feed(path, score=100):
+    """
+    Yields (network, score) pairs from a CIDR feed file: one address or
+    network per line, with '#' or ';' starting a comment (as in DROP lists).
+    """
+    with open(path) as handle:
+        for line in handle:
+            value = line.split("#", 1)[0].split(";", 1)[0].strip()
+            if value:
+                yield value, score
+
+def blacklist_entries(blacklist):
+    """Yields (address, score) pairs from an abuseipdb.blacklist.Blacklist; a missing score counts as 100."""
+    for entry in blacklist.entries():
+        score = entry.get("abuseConfidenceScore")
+        yield entry["ipAddress"], 100 if score is None else score
+
+
+if __name__ == "__main__":
+    from abuseipdb.blacklist import Blacklist
+
+    parser = argparse.ArgumentParser(description="Build an offline blocklist index.")
+    parser.add_argument("output", help="index file to write")
+    parser.add_argument("feeds", nargs="*", help="CIDR feed files (one network per line)")
+    parser.add_argument("--blacklist", action="append", default=[], help="saved AbuseIPDB blacklist JSON")
+    parser.add_argument("--score", type=int, default=100, help="score given to CIDR feed entries")
+    args = parser.parse_args()
+
+    def entries():
+        for feed in args.feeds:
+            yield from read_cidr_feed(feed, args.score)
+        for path in args.blacklist:
+            yield from blacklist_entries(Blacklist.load(path))
+
+    index = BlocklistIndex.build(entries())
+    index.save(args.output)
+    print(f"{len(index)} ranges written to {args.output}")
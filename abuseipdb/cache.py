@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import heapq
+import sqlite3
+import threading
+from collections import OrderedDict
+from abuseipdb.api_call import canonical_ip
+
+
+def cache_key(ip_address, max_age_in_days):
+    """Cache key for one lookup; spelling variants of an address share a key."""
+    canonical = canonical_ip(ip_address)
+    if canonical is None:
+        raise ValueError(f"Invalid IP address: {ip_address!r}")
+    return f"{canonical}|{max_age_in_days}"
+
+
+class ReputationCache:
+    """
+    Local cache of AbuseIPDB reputation payloads.
+
+    An in-memory LRU holds up to `max_entries` results; when `path` is given a
+    SQLite file keeps them across runs as well. Entries live for `ttl` seconds,
+    but never longer than the `maxAgeInDays` window the lookup was made with.
+    Only successful payloads should be stored, errors are always retried.
+
+    With a `soft_ttl`, entries older than it are still served but reported as
+    stale by get_entry(), so callers can refresh them in the background. Each
+    entry counts how often it was served, for hottest().
+    """
+
+    def __init__(self, max_entries=10000, ttl=86400, path=None, clock=time.time, soft_ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.soft_ttl = soft_ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS reputation "
+                "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    def _ttl_for(self, max_age_in_days):
+        return min(self.ttl, int(max_age_in_days) * 86400)
+
+    def _remember(self, key, stored_at, data, queries=0):
+        self._entries[key] = (stored_at, data, queries)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key):
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT stored_at, data FROM reputation WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), 0
+
+    def get(self, ip_address, max_age_in_days):
+        """Returns a copy of the cached payload, or None on a miss or expired entry."""
+        entry = self.get_entry(ip_address, max_age_in_days)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, ip_address, max_age_in_days):
+        """
+        Returns (copy of the payload, stale) or None on a miss or expired entry.
+        `stale` is True once the entry is older than soft_ttl.
+        """
+        key = cache_key(ip_address, max_age_in_days)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._load(key)
+            age = self._clock() - entry[0] if entry is not None else None
+            if entry is not None and age < self._ttl_for(max_age_in_days):
+                stored_at, data, queries = entry
+                self._remember(key, stored_at, data, queries + 1)
+                self.hits += 1
+                stale = self.soft_ttl is not None and age >= self.soft_ttl
+                if stale:
+                    self.stale_hits += 1
+                return dict(data), stale
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def set(self, ip_address, max_age_in_days, data):
+        """Stores a successful payload for the address."""
+        key = cache_key(ip_address, max_age_in_days)
+        stored_at = self._clock()
+        with self._lock:
+            previous = self._entries.get(key)
+            self._remember(key, stored_at, dict(data), previous[2] if previous else 0)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO reputation (key, stored_at, data) VALUES (?, ?, ?)",
+                    (key, stored_at, json.dumps(data)),
+                )
+                self._db.commit()
+
+    def stats(self):
+        """Hit/miss counters and current in-memory size."""
+        with self._lock:
+            stats = {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+            if self.soft_ttl is not None:
+                stats["stale_hits"] = self.stale_hits
+            return stats
+
+    def hottest(self, count):
+        """
+        The `count` most often served in-memory entries, as
+        (ip, max_age_in_days, age in seconds, seconds left before expiry) tuples.
+        """
+        with self._lock:
+            now = self._clock()
+            ranked = heapq.nlargest(count, self._entries.items(), key=lambda item: item[1][2])
+            hottest = []
+            for key, (stored_at, _, _) in ranked:
+                ip, max_age_in_days = key.rsplit("|", 1)
+                age = now - stored_at
+                hottest.append((ip, int(max_age_in_days), age, self._ttl_for(max_age_in_days) - age))
+            return hottest
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM reputation")
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def cache_from_env(path=None):
+    """
+    Builds the cache described by ABUSEIPDB_CACHE_SIZE (0 disables caching),
+    ABUSEIPDB_CACHE_TTL (seconds), ABUSEIPDB_CACHE_SOFT_TTL (seconds after
+    which entries are refreshed in the background) and ABUSEIPDB_CACHE_PATH
+    (SQLite file, overridden by `path`).
+    """
+    max_entries = int(os.getenv("ABUSEIPDB_CACHE_SIZE", 10000))
+    if max_entries <= 0:
+        return None
+    return ReputationCache(
+        max_entries=max_entries,
+        ttl=int(os.getenv("ABUSEIPDB_CACHE_TTL", 86400)),
+        path=path or os.getenv("ABUSEIPDB_CACHE_PATH") or None,
+        soft_ttl=float(os.getenv("ABUSEIPDB_CACHE_SOFT_TTL", 0)) or None,
+    )
@@ -0,0 +1,203 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit.
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_HELP = {
+    "abuseipdb_stage_seconds": ("histogram", "Time spent per lookup stage."),
+    "abuseipdb_api_requests_total": ("counter", "HTTP requests sent to the API, per endpoint."),
+    "abuseipdb_api_errors_total": ("counter", "Lookup errors, per type."),
+    "abuseipdb_quota_remaining": ("gauge", "Best known number of API requests left today."),
+    "abuseipdb_quota_used": ("gauge", "API requests spent today by this process."),
+    "abuseipdb_cache_hits_total": ("counter", "Reputation cache hits."),
+    "abuseipdb_cache_stale_hits_total": ("counter", "Reputation cache hits past the soft TTL."),
+    "abuseipdb_cache_misses_total": ("counter", "Reputation cache misses."),
+    "abuseipdb_cache_entries": ("gauge", "Entries in the in-memory reputation cache."),
+}
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed bucket bounds, as Prometheus expects."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) pairs, ending with +Inf."""
+        total = 0
+        pairs = []
+        for bound, count in zip((*self.bounds, float("inf")), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "started")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = self.metrics._clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, self.metrics._clock() - self.started)
+
+
+class Metrics:
+    """
+    Thread-safe counters and per-stage latency histograms for the lookup path.
+
+    Stages are timed with `with metrics.timer("http"):` and errors counted by
+    type with error(). render() returns the Prometheus text format, adding
+    quota and cache gauges read from the given limiter and cache at that
+    moment, and write() dumps the same text to a file (for node_exporter's
+    textfile collector or a post-mortem of a batch run).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, clock=time.perf_counter):
+        self.buckets = buckets
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def timer(self, stage):
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def inc(self, name, labels=(), amount=1):
+        """Adds to counter `name`; `labels` is a tuple of (label, value) pairs."""
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def error(self, kind):
+        self.inc("abuseipdb_api_errors_total", (("type", kind),))
+
+    def request(self, endpoint):
+        self.inc("abuseipdb_api_requests_total", (("endpoint", endpoint),))
+
+    def stage(self, stage):
+        """(count, total seconds) observed for a stage so far."""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            return (histogram.count, histogram.sum) if histogram is not None else (0, 0.0)
+
+    def counter(self, name, labels=()):
+        with self._lock:
+            return self._counters.get((name, labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def _samples(self, cache, limiter):
+        """Every sample as (metric name, sample name, labels, value), grouped by metric."""
+        samples = []
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                labels = (("stage", stage),)
+                for bound, count in histogram.cumulative():
+                    le = "+Inf" if bound == float("inf") else _number(float(bound))
+                    samples.append(("abuseipdb_stage_seconds", "abuseipdb_stage_seconds_bucket",
+                                    labels + (("le", le),), count))
+                samples.append(("abuseipdb_stage_seconds", "abuseipdb_stage_seconds_sum", labels, histogram.sum))
+                samples.append(("abuseipdb_stage_seconds", "abuseipdb_stage_seconds_count", labels, histogram.count))
+            for (name, labels), value in sorted(self._counters.items()):
+                samples.append((name, name, labels, value))
+        if limiter is not None:
+            remaining = limiter.quota_remaining()
+            if remaining is not None:
+                samples.append(("abuseipdb_quota_remaining", "abuseipdb_quota_remaining", (), remaining))
+            samples.append(("abuseipdb_quota_used", "abuseipdb_quota_used", (), limiter.used))
+        if cache is not None:
+            stats = cache.stats()
+            samples.append(("abuseipdb_cache_hits_total", "abuseipdb_cache_hits_total", (), stats["hits"]))
+            if "stale_hits" in stats:
+                samples.append(("abuseipdb_cache_stale_hits_total", "abuseipdb_cache_stale_hits_total", (),
+                                stats["stale_hits"]))
+            samples.append(("abuseipdb_cache_misses_total", "abuseipdb_cache_misses_total", (), stats["misses"]))
+            samples.append(("abuseipdb_cache_entries", "abuseipdb_cache_entries", (), stats["size"]))
+        return samples
+
+    def render(self, cache=None, limiter=None):
+        """The metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        current = None
+        for metric, sample, labels, value in self._samples(cache, limiter):
+            if metric != current:
+                current = metric
+                kind, text = _HELP.get(metric, ("untyped", metric))
+                lines.append(f"# HELP {metric} {text}")
+                lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{sample}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, cache=None, limiter=None):
+        """Writes render() to `path`, replacing it atomically so scrapers never see half a file."""
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as handle:
+            handle.write(self.render(cache, limiter))
+        os.replace(temporary, path)
+
+
+_metrics = Metrics()
+
+def get_metrics():
+    """The process-wide registry every lookup reports to."""
+    return _metrics
+
+
+@contextmanager
+def profiled(path):
+    """
+    Runs the block under cProfile and saves the stats to `path` (read them
+    with `python -m pstats path`). Does nothing when `path` is empty.
+    Only the calling thread is profiled; with thread workers the lookups
+    themselves show up as waits, so profile with one worker to see them.
+    """
+    if not path:
+        yield None
+        return
+    import cProfile
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
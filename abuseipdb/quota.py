@@ -0,0 +1,70 @@
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+
+def _utc_day():
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+class SharedQuota:
+    """
+    Daily API quota shared by every process that opens the same SQLite file.
+
+    take() atomically spends one request of today's (UTC) budget under an
+    exclusive write lock, so batch shards running side by side can never
+    overrun `daily_quota` between them. sync() folds in the server's
+    X-RateLimit-Remaining, which also covers requests made elsewhere with
+    the same API key.
+    """
+
+    def __init__(self, path, daily_quota, today=_utc_day, timeout=30):
+        self.path = path
+        self.daily_quota = daily_quota
+        self._today = today
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS quota (day TEXT PRIMARY KEY, used INTEGER NOT NULL)")
+
+    def _update(self, change):
+        """Runs change(used) -> (new used, result) for today in one locked transaction."""
+        day = self._today()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT used FROM quota WHERE day = ?", (day,)).fetchone()
+                used, result = change(row[0] if row else 0)
+                self._db.execute("INSERT OR REPLACE INTO quota (day, used) VALUES (?, ?)", (day, used))
+                self._db.execute("DELETE FROM quota WHERE day < ?", (day,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return result
+
+    def take(self):
+        """Spends one request; returns False, spending nothing, when today's quota is used up."""
+        def change(used):
+            if used >= self.daily_quota:
+                return used, False
+            return used + 1, True
+        return self._update(change)
+
+    def sync(self, remaining):
+        """Raises today's count to match a server-reported number of remaining requests."""
+        self._update(lambda used: (max(used, self.daily_quota - int(remaining)), None))
+
+    def used(self):
+        with self._lock:
+            row = self._db.execute("SELECT used FROM quota WHERE day = ?", (self._today(),)).fetchone()
+        return row[0] if row else 0
+
+    def remaining(self):
+        return max(self.daily_quota - self.used(), 0)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def _utc_today():
+    return datetime.now(timezone.utc).date()
+
+def _seconds_until_utc_midnight():
+    now = datetime.now(timezone.utc)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), timezone.utc)
+    return (midnight - now).total_seconds()
+
+def _header_number(headers, name):
+    """Reads a numeric header value, ignoring anything that is not a number."""
+    value = headers.get(name) if headers is not None else None
+    if not isinstance(value, str):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that paces AbuseIPDB requests.
+
+    Tokens refill at `rate` per second up to `capacity`, and a daily quota caps
+    the number of requests per UTC day. Server feedback passed to observe()
+    adapts the bucket: a 429 pauses it for Retry-After seconds and halves the
+    rate, successful responses raise the rate back step by step, and
+    X-RateLimit-Remaining keeps the local quota count in line with what other
+    processes sharing the API key have already spent.
+
+    With a `shared` quota (abuseipdb.quota.SharedQuota) every token is also
+    taken from a budget shared with other processes, so several of them
+    together stay within the daily limit.
+    """
+
+    def __init__(self, rate=10, capacity=None, daily_quota=1000, max_wait=60,
+                 clock=time.monotonic, sleep=time.sleep, shared=None):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(float(rate), 1.0)
+        self.daily_quota = daily_quota
+        self.max_wait = max_wait
+        self._clock = clock
+        self._sleep = sleep
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._exhausted_until = None
+        self._day = _utc_today()
+        self.used = 0
+        self.remaining = None
+
+    def _refill(self, now):
+        today = _utc_today()
+        if today != self._day:
+            self._day = today
+            self.used = 0
+            self.remaining = None
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _exhausted(self, now):
+        if self._exhausted_until is not None:
+            if now < self._exhausted_until:
+                return True
+            # The server-side window is over. Only a new UTC day (see _refill)
+            # resets the local count; the server's figure is re-read on the next response.
+            self._exhausted_until = None
+            self.remaining = None
+        return self.daily_quota is not None and self.used >= self.daily_quota
+
+    def quota_exhausted(self):
+        """Returns True when no more requests may be made in the current quota window."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            return self._exhausted(now)
+
+    def quota_remaining(self):
+        """Best known number of requests left today, or None when unlimited."""
+        with self._lock:
+            self._refill(self._clock())
+            local = None if self.daily_quota is None else max(self.daily_quota - self.used, 0)
+            if self.shared is not None:
+                shared = self.shared.remaining()
+                local = shared if local is None else min(local, shared)
+            if self.remaining is None:
+                return local
+            return self.remaining if local is None else min(local, self.remaining)
+
+    def acquire(self):
+        """
+        Waits for a token and takes it.
+        Returns False without waiting when the quota window is exhausted.
+        """
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if self._exhausted(now):
+                    return False
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= 1:
+                    if self.shared is not None and not self.shared.take():
+                        self._exhausted_until = now + _seconds_until_utc_midnight()
+                        return False
+                    self._tokens -= 1
+                    self.used += 1
+                    if self.remaining is not None:
+                        self.remaining = max(self.remaining - 1, 0)
+                    return True
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+    def observe(self, status_code, headers):
+        """Adapts the bucket to an API response's status code and rate-limit headers."""
+        retry_after = _header_number(headers, "Retry-After")
+        remaining = _header_number(headers, "X-RateLimit-Remaining")
+        with self._lock:
+            now = self._clock()
+            if remaining is not None:
+                self.remaining = int(remaining)
+                if self.daily_quota is not None:
+                    self.used = max(self.used, self.daily_quota - self.remaining)
+                if self.shared is not None:
+                    self.shared.sync(self.remaining)
+            if status_code == 429:
+                self.rate = max(self.rate / 2, self.max_rate / 16)
+                self._tokens = 0
+                wait = retry_after if retry_after is not None else 1 / self.rate
+                if wait > self.max_wait or self.remaining == 0:
+                    self._exhausted_until = now + (wait if retry_after is not None
+                                                   else _seconds_until_utc_midnight())
+                else:
+                    self._blocked_until = max(self._blocked_until, now + wait)
+                return
+            if self.remaining == 0 and self._exhausted_until is None:
+                self._exhausted_until = now + (retry_after if retry_after is not None
+                                               else _seconds_until_utc_midnight())
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 16)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def limiter_from_env(share=1, quota_path=None):
+    """
+    Builds a limiter from ABUSEIPDB_RATE_LIMIT (requests/second),
+    ABUSEIPDB_BURST and ABUSEIPDB_DAILY_QUOTA (0 disables the daily cap).
+    With ABUSEIPDB_QUOTA_PATH set, or else `quota_path`, the daily quota is
+    shared through that SQLite file with every other process using it. A
+    process that is one of `share` processes splitting the work gets 1/share
+    of the request rate.
+    """
+    quota = int(os.getenv("ABUSEIPDB_DAILY_QUOTA", 1000))
+    path = os.getenv("ABUSEIPDB_QUOTA_PATH") or quota_path
+    shared = None
+    if path and quota:
+        from abuseipdb.quota import SharedQuota
+        shared = SharedQuota(path, quota)
+    return TokenBucket(
+        rate=float(os.getenv("ABUSEIPDB_RATE_LIMIT", 10)) / share,
+        capacity=float(os.getenv("ABUSEIPDB_BURST", 0)) / share or None,
+        daily_quota=quota or None,
+        shared=shared,
+    )
+
+def get_rate_limiter():
+    """Returns the process-wide limiter shared by every API call, see limiter_from_env()."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = limiter_from_env()
+        return _limiter
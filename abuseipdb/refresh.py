@@ -0,0 +1,88 @@
+import os
+import threading
+from abuseipdb.rate_limit import get_rate_limiter, _utc_today
+
+
+class ProactiveRefresher:
+    """
+    Keeps the most-queried cache entries fresh before they expire.
+
+    Every `interval` seconds the `top_n` most often served entries of the
+    client's cache are checked, and those past the cache's soft TTL (or
+    `refresh_at` of their lifetime when there is none) are looked up again.
+    Refreshes may spend at most `quota_share` of the daily quota per UTC day,
+    so they never starve regular lookups.
+    """
+
+    def __init__(self, client, top_n=100, quota_share=0.1, interval=300, refresh_at=0.8):
+        self.client = client
+        self.top_n = top_n
+        self.quota_share = quota_share
+        self.interval = interval
+        self.refresh_at = refresh_at
+        self.spent = 0
+        self._day = _utc_today()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def budget(self):
+        """Refreshes still allowed today, or None when the quota is unlimited."""
+        today = _utc_today()
+        if today != self._day:
+            self._day = today
+            self.spent = 0
+        quota = (self.client.limiter or get_rate_limiter()).daily_quota
+        if quota is None:
+            return None
+        return max(int(quota * self.quota_share) - self.spent, 0)
+
+    def due(self, age, left):
+        soft_ttl = self.client.cache.soft_ttl
+        if soft_ttl is not None:
+            return age >= soft_ttl
+        return age >= (age + left) * self.refresh_at
+
+    def run_once(self):
+        """Refreshes the hot entries that are due; returns how many were refreshed."""
+        refreshed = 0
+        for ip, max_age_in_days, age, left in self.client.cache.hottest(self.top_n):
+            if max_age_in_days != self.client.max_age_in_days or not self.due(age, left):
+                continue
+            budget = self.budget()
+            if budget is not None and budget <= 0:
+                break
+            self.spent += 1
+            refreshed += 1
+            self.client.check(ip, bypass_cache=True)
+        return refreshed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="abuseipdb-refresher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def refresher_from_env(client):
+    """
+    Builds the refresher described by ABUSEIPDB_REFRESH_TOP_N (0 or unset
+    disables it), ABUSEIPDB_REFRESH_QUOTA_SHARE and ABUSEIPDB_REFRESH_INTERVAL,
+    or returns None when it is disabled or the client has no cache.
+    """
+    top_n = int(os.getenv("ABUSEIPDB_REFRESH_TOP_N", 0))
+    if top_n <= 0 or client.cache is None:
+        return None
+    return ProactiveRefresher(
+        client,
+        top_n=top_n,
+        quota_share=float(os.getenv("ABUSEIPDB_REFRESH_QUOTA_SHARE", 0.1)),
+        interval=float(os.getenv("ABUSEIPDB_REFRESH_INTERVAL", 300)),
+    )
@@ -0,0 +1,101 @@
+import os
+import time
+import random
+import threading
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for transient API failures.
+
+    Attempt n (0-based) waits a random time between 0 and
+    min(max_delay, base_delay * 2**n) before retrying, so workers that failed
+    together do not retry in lockstep.
+    """
+
+    def __init__(self, max_retries=2, base_delay=0.5, max_delay=8.0, sleep=time.sleep, rand=random.random):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._rand = rand
+
+    def delay(self, attempt):
+        return self._rand() * min(self.max_delay, self.base_delay * (2 ** attempt))
+
+    def wait(self, attempt, retry_after=None):
+        """Sleeps before retry `attempt`, honouring a server-provided Retry-After."""
+        self._sleep(retry_after if retry_after is not None else self.delay(attempt))
+
+    @classmethod
+    def from_env(cls):
+        """Reads ABUSEIPDB_MAX_RETRIES, ABUSEIPDB_BACKOFF_BASE and ABUSEIPDB_BACKOFF_MAX."""
+        return cls(
+            max_retries=int(os.getenv("ABUSEIPDB_MAX_RETRIES", 2)),
+            base_delay=float(os.getenv("ABUSEIPDB_BACKOFF_BASE", 0.5)),
+            max_delay=float(os.getenv("ABUSEIPDB_BACKOFF_MAX", 8)),
+        )
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the API is down.
+
+    After `failure_threshold` consecutive upstream failures (timeouts,
+    connection errors, 5xx) the breaker opens and allow() refuses requests
+    for `cooldown` seconds. Then a single trial request is let through: its
+    success closes the breaker, its failure opens it for another cool-down.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, cooldown=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self._clock = clock
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._clock() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release(self):
+        """Gives back the trial slot taken by allow() when no request was sent after all."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_running = False
+
+    @classmethod
+    def from_env(cls):
+        """Reads ABUSEIPDB_BREAKER_THRESHOLD (0 disables) and ABUSEIPDB_BREAKER_COOLDOWN."""
+        threshold = int(os.getenv("ABUSEIPDB_BREAKER_THRESHOLD", 5))
+        if threshold <= 0:
+            return None
+        return cls(threshold, float(os.getenv("ABUSEIPDB_BREAKER_COOLDOWN", 30)))
@@ -0,0 +1,16 @@
+"""Helpers shared by the abuseipdb test modules."""
+
+
+class FakeClock:
+    """Manual clock whose sleep() simply advances time."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
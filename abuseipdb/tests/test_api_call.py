@@ -1,8 +1,23 @@
 import unittest
 import os
+import threading
+from array import array
 from unittest.mock import patch, MagicMock
 import requests
-from abuseipdb.api_call import is_valid_ip, make_ip_check_request, calculate_risk_level, status_code_message
+from abuseipdb.rate_limit import TokenBucket
+from abuseipdb.cache import ReputationCache
+from abuseipdb.retry import RetryPolicy, CircuitBreaker
+from abuseipdb.api_call import (
+    is_valid_ip, make_ip_check_request, calculate_risk_level, status_code_message,
+    AbuseIPDBClient, canonical_ip, is_network, make_block_check_request, make_blacklist_request,
+    pack_ips, classify_risk_levels, RISK_LEVELS,
+)
+from abuseipdb.tests.helpers import FakeClock
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class TestIsValidIp(unittest.TestCase):
@@ -27,6 +42,18 @@ class TestIsValidIp(unittest.TestCase):
         """Test handling of None input"""
         self.assertFalse(is_valid_ip(None))
 
+class TestCanonicalIp(unittest.TestCase):
+    """Test cases for canonical_ip function"""
+
+    def test_canonical_forms(self):
+        self.assertEqual(canonical_ip(" 1.2.3.4 "), "1.2.3.4")
+        self.assertEqual(canonical_ip("::ffff:1.2.3.4"), "1.2.3.4")
+        self.assertEqual(canonical_ip("2001:0DB8::0001"), "2001:db8::1")
+
+    def test_invalid(self):
+        self.assertIsNone(canonical_ip("not_an_ip"))
+        self.assertIsNone(canonical_ip(None))
+
 class TestCalculateRiskLevel(unittest.TestCase):
     """Test cases for calculate_risk_level function"""
     
@@ -52,6 +79,39 @@ class TestCalculateRiskLevel(unittest.TestCase):
             self.assertEqual(calculate_risk_level(24), "LOW")
             
 
+class TestBulkValidation(unittest.TestCase):
+    """Test cases for pack_ips and classify_risk_levels"""
+
+    def test_pack_ips(self):
+        ips = ["1.2.3.4", "::ffff:1.2.3.4", "2001:db8::1", "fe80::1%eth0", "01.2.3.4", " 1.2.3.4", None, "", "1.2.3.4\x00"]
+        versions, high, low = pack_ips(ips)
+        self.assertEqual(list(versions), [4, 4, 6, 6, 0, 0, 0, 0, 0])
+        self.assertEqual([bool(version) for version in versions], [is_valid_ip(ip) for ip in ips])
+        self.assertEqual((high[0], low[0]), (0, 0x01020304))
+        self.assertEqual(low[1], low[0])
+        self.assertEqual((high[2] << 64) | low[2], 0x20010db8 << 96 | 1)
+        self.assertEqual(versions.typecode + high.typecode + low.typecode, "BQQ")
+
+    def test_classify_matches_scalar(self):
+        scores = list(range(-1, 101))
+        expected = [calculate_risk_level(score, 70) for score in scores]
+        for column in (scores, array("b", scores), array("B", range(0, 101))):
+            levels = [RISK_LEVELS[code] for code in classify_risk_levels(column, 70)]
+            self.assertEqual(levels, [calculate_risk_level(score, 70) for score in column])
+        self.assertEqual([RISK_LEVELS[code] for code in classify_risk_levels(array("b", scores), 70)], expected)
+
+    def test_classify_reads_threshold_once(self):
+        with patch.dict(os.environ, {'CONFIDENCE_THRESHOLD': '20'}):
+            self.assertEqual(list(classify_risk_levels(array("b", [10, 20, 30]))), [0, 2, 2])
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_classify_numpy(self):
+        scores = numpy.arange(-1, 101, dtype=numpy.int16)
+        levels = classify_risk_levels(scores, 70)
+        self.assertIsInstance(levels, numpy.ndarray)
+        self.assertEqual(levels.tolist(), list(classify_risk_levels(scores.tolist(), 70)))
+
+
 class TestStatusCodeMessage(unittest.TestCase):
     """Test cases for status_code_message function"""
 
@@ -64,6 +124,9 @@ class TestStatusCodeMessage(unittest.TestCase):
     def test_api_failed_error(self):
         self.assertEqual(status_code_message({"error": "api_failed"}), (2, "failed"))
 
+    def test_rate_limited_error(self):
+        self.assertEqual(status_code_message({"error": "rate_limited"}), (2, "failed"))
+
 
 
 class TestMakeIpCheckRequest(unittest.TestCase):
@@ -82,7 +145,7 @@ class TestMakeIpCheckRequest(unittest.TestCase):
             result = make_ip_check_request('')
             self.assertEqual(result.get('error'), "invalid_ip")
     
-    @patch('abuseipdb.api_call.requests.get')
+    @patch('requests.get')
     def test_successful_api_response(self, mock_get):
         """Test successful API response"""
         mock_response = MagicMock()
@@ -111,7 +174,7 @@ class TestMakeIpCheckRequest(unittest.TestCase):
 
 
     
-    @patch('abuseipdb.api_call.requests.get')
+    @patch('requests.get')
     def test_api_response_without_data_key(self, mock_get):
         """Test API response without 'data' key"""
         mock_response = MagicMock()
@@ -124,7 +187,7 @@ class TestMakeIpCheckRequest(unittest.TestCase):
             self.assertEqual(result.get("error"), "api_failed")
             self.assertEqual(result.get("message"), "API response missing data")
     
-    @patch('abuseipdb.api_call.requests.get')
+    @patch('requests.get')
     def test_api_timeout(self, mock_get):
         """Test API timeout handling"""
         mock_get.side_effect = requests.exceptions.Timeout("Request timeout")
@@ -135,6 +198,220 @@ class TestMakeIpCheckRequest(unittest.TestCase):
             self.assertEqual(result.get("message"), "API request failed")
 
 
+    @patch('requests.get')
+    def test_api_rate_limited(self, mock_get):
+        """Test that a 429 response is reported as rate_limited and pauses the limiter"""
+        mock_response = MagicMock()
+        mock_response.status_code = 429
+        mock_response.headers = {'Retry-After': '7200'}
+        mock_get.return_value = mock_response
+        limiter = TokenBucket(rate=100, daily_quota=None)
+
+        with patch.dict(os.environ, {'ABUSEIPDB_API_KEY': 'test_key'}):
+            result = make_ip_check_request('8.8.8.8', limiter=limiter)
+            self.assertEqual(result.get("error"), "rate_limited")
+            # The quota window is closed, so no further request is sent
+            result = make_ip_check_request('1.1.1.1', limiter=limiter)
+            self.assertEqual(result.get("message"), "Daily API quota exhausted")
+            self.assertEqual(mock_get.call_count, 1)
+
+
+class TestBulkRequests(unittest.TestCase):
+    """Test cases for the check-block and blacklist endpoints"""
+
+    def test_is_network(self):
+        self.assertTrue(is_network("203.0.113.0/24"))
+        self.assertTrue(is_network("2001:db8::/64"))
+        self.assertFalse(is_network("203.0.113.7"))
+        self.assertFalse(is_network("203.0.113.0/33"))
+
+    @patch('requests.get')
+    def test_block_check_request(self, mock_get):
+        """A CIDR network is looked up with a single check-block request"""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'data': {'networkAddress': '203.0.113.0', 'reportedAddress': []}}
+        mock_get.return_value = mock_response
+
+        with patch.dict(os.environ, {'ABUSEIPDB_API_KEY': 'test_key'}):
+            result = make_block_check_request('203.0.113.9/24')
+        self.assertEqual(result['networkAddress'], '203.0.113.0')
+        kwargs = mock_get.call_args.kwargs
+        self.assertTrue(kwargs['url'].endswith('/check-block'))
+        self.assertEqual(kwargs['params']['network'], '203.0.113.0/24')
+
+    def test_block_check_invalid_network(self):
+        with patch.dict(os.environ, {'ABUSEIPDB_API_KEY': 'test_key'}):
+            self.assertEqual(make_block_check_request('203.0.113.0')['error'], 'invalid_ip')
+
+    @patch('requests.get')
+    def test_blacklist_request(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'data': [{'ipAddress': '1.2.3.4', 'abuseConfidenceScore': 100}]}
+        mock_get.return_value = mock_response
+
+        with patch.dict(os.environ, {'ABUSEIPDB_API_KEY': 'test_key'}):
+            result = make_blacklist_request(confidence_minimum=75, limit=500)
+        self.assertEqual(result[0]['ipAddress'], '1.2.3.4')
+        kwargs = mock_get.call_args.kwargs
+        self.assertTrue(kwargs['url'].endswith('/blacklist'))
+        self.assertEqual(kwargs['params'], {'confidenceMinimum': '75', 'limit': '500'})
+
+    @patch('requests.get')
+    def test_blacklist_request_failure(self, mock_get):
+        mock_get.side_effect = requests.exceptions.ConnectionError()
+        with patch.dict(os.environ, {'ABUSEIPDB_API_KEY': 'test_key'}):
+            self.assertEqual(make_blacklist_request()['error'], 'api_failed')
+
+
+class TestAbuseIPDBClient(unittest.TestCase):
+    """Test cases for the pooled AbuseIPDBClient"""
+
+    def test_config_read_once(self):
+        """API key and pool settings are captured at construction time"""
+        env = {'ABUSEIPDB_API_KEY': 'env_key', 'ABUSEIPDB_POOL_SIZE': '4'}
+        with patch.dict(os.environ, env):
+            client = AbuseIPDBClient()
+        self.assertEqual(client.api_key, 'env_key')
+        adapter = client.session.get_adapter('https://api.abuseipdb.com/api/v2/check')
+        self.assertEqual(adapter._pool_maxsize, 4)
+        self.assertEqual(adapter.max_retries.connect, 2)
+        client.close()
+
+    def test_check_uses_session(self):
+        """Lookups go through the client's session, not module-level requests.get"""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'data': {'ipAddress': '8.8.8.8'}}
+        with AbuseIPDBClient(api_key='test_key', base_url='http://localhost:9999/api/v2/',
+                             limiter=TokenBucket(rate=100, daily_quota=None)) as client:
+            with patch.object(client.session, 'get', return_value=mock_response) as mock_get, \
+                    patch('requests.get') as module_get:
+                result = client.check('8.8.8.8')
+                client.check('1.1.1.1')
+        self.assertEqual(result, {'ipAddress': '8.8.8.8'})
+        self.assertEqual(mock_get.call_count, 2)
+        module_get.assert_not_called()
+        kwargs = mock_get.call_args.kwargs
+        self.assertEqual(kwargs['url'], 'http://localhost:9999/api/v2/check')
+        self.assertEqual(kwargs['headers']['Key'], 'test_key')
+
+    def test_check_invalid_ip_skips_network(self):
+        with AbuseIPDBClient(api_key='test_key') as client:
+            with patch.object(client.session, 'get') as mock_get:
+                self.assertEqual(client.check('nope')['error'], 'invalid_ip')
+        mock_get.assert_not_called()
+
+    def test_cache_serves_repeats(self):
+        """Repeated lookups are answered from the cache without a request"""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'data': {'ipAddress': '8.8.8.8'}}
+        with AbuseIPDBClient(api_key='test_key', cache=ReputationCache(),
+                             limiter=TokenBucket(rate=100, daily_quota=None)) as client:
+            with patch.object(client.session, 'get', return_value=mock_response) as mock_get:
+                client.check('8.8.8.8')
+                self.assertEqual(client.check('8.8.8.8'), {'ipAddress': '8.8.8.8'})
+                self.assertEqual(mock_get.call_count, 1)
+                # bypass forces a fresh request
+                client.check('8.8.8.8', bypass_cache=True)
+                self.assertEqual(mock_get.call_count, 2)
+            self.assertEqual(client.cache.stats()['hits'], 1)
+
+    def test_concurrent_lookups_coalesced(self):
+        """Simultaneous lookups of one address send a single request"""
+        release = threading.Event()
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'data': {'ipAddress': '1.2.3.4'}}
+
+        def slow_get(**kwargs):
+            release.wait(5)
+            return mock_response
+
+        with AbuseIPDBClient(api_key='test_key', limiter=TokenBucket(rate=100, daily_quota=None)) as client:
+            with patch.object(client.session, 'get', side_effect=slow_get) as mock_get:
+                results = []
+                spellings = ['1.2.3.4', '::ffff:1.2.3.4', '::FFFF:1.2.3.4'] * 2
+                threads = [threading.Thread(target=lambda ip=ip: results.append(client.check(ip)))
+                           for ip in spellings]
+                for thread in threads:
+                    thread.start()
+                for _ in range(500):
+                    if client.flight.coalesced == 5:
+                        break
+                    threading.Event().wait(0.01)
+                release.set()
+                for thread in threads:
+                    thread.join()
+            self.assertEqual(mock_get.call_count, 1)
+            self.assertEqual(mock_get.call_args.kwargs['params']['ipAddress'], '1.2.3.4')
+            self.assertEqual(results, [{'ipAddress': '1.2.3.4'}] * 6)
+
+    def test_cache_skips_errors(self):
+        """Failed lookups are not cached"""
+        with AbuseIPDBClient(api_key='test_key', cache=ReputationCache(),
+                             limiter=TokenBucket(rate=100, daily_quota=None),
+                             retry_policy=RetryPolicy(max_retries=0)) as client:
+            with patch.object(client.session, 'get',
+                              side_effect=requests.exceptions.Timeout()) as mock_get:
+                client.check('8.8.8.8')
+                client.check('8.8.8.8')
+            self.assertEqual(mock_get.call_count, 2)
+
+    def test_transient_failures_retried(self):
+        """Timeouts and 5xx responses are retried with backoff until one succeeds"""
+        error = MagicMock(status_code=503)
+        error.raise_for_status.side_effect = requests.exceptions.HTTPError()
+        ok = MagicMock(status_code=200)
+        ok.json.return_value = {'data': {'ipAddress': '8.8.8.8'}}
+        sleeps = []
+        policy = RetryPolicy(max_retries=2, sleep=sleeps.append, rand=lambda: 1.0)
+        with AbuseIPDBClient(api_key='test_key', limiter=TokenBucket(rate=100, daily_quota=None),
+                             retry_policy=policy) as client:
+            with patch.object(client.session, 'get',
+                              side_effect=[requests.exceptions.Timeout(), error, ok]) as mock_get:
+                self.assertEqual(client.check('8.8.8.8'), {'ipAddress': '8.8.8.8'})
+            self.assertEqual(mock_get.call_count, 3)
+            self.assertEqual(sleeps, [0.5, 1.0])
+            self.assertEqual(client.limiter.used, 3)
+
+    def test_client_errors_not_retried(self):
+        """A 4xx other than 429 is final"""
+        forbidden = MagicMock(status_code=403)
+        forbidden.raise_for_status.side_effect = requests.exceptions.HTTPError()
+        with AbuseIPDBClient(api_key='test_key', limiter=TokenBucket(rate=100, daily_quota=None),
+                             retry_policy=RetryPolicy(sleep=lambda s: None)) as client:
+            with patch.object(client.session, 'get', return_value=forbidden) as mock_get:
+                self.assertEqual(client.check('8.8.8.8')['error'], 'api_failed')
+            self.assertEqual(mock_get.call_count, 1)
+            self.assertEqual(client.breaker.failures, 0)
+
+    def test_open_breaker_fails_fast(self):
+        """Once the breaker opens, lookups fail without a request"""
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+        with AbuseIPDBClient(api_key='test_key', limiter=TokenBucket(rate=100, daily_quota=None),
+                             retry_policy=RetryPolicy(sleep=lambda s: None), breaker=breaker) as client:
+            with patch.object(client.session, 'get',
+                              side_effect=requests.exceptions.ConnectionError()) as mock_get:
+                client.check('8.8.8.8')
+                result = client.check('1.1.1.1')
+            self.assertEqual(mock_get.call_count, 2)
+            self.assertEqual(result, {'error': 'api_failed', 'message': 'API unavailable (circuit open)'})
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_stale_entry_served_and_revalidated(self):
+        """A stale hit is answered from the cache while a refresh runs in the background"""
+        clock = FakeClock()
+        cache = ReputationCache(ttl=100, soft_ttl=10, clock=clock)
+        cache.set('8.8.8.8', 90, {'ipAddress': '8.8.8.8', 'abuseConfidenceScore': 0})
+        clock.now = 20
+        fresh = MagicMock(status_code=200)
+        fresh.json.return_value = {'data': {'ipAddress': '8.8.8.8', 'abuseConfidenceScore': 75}}
+        with AbuseIPDBClient(api_key='test_key', cache=cache,
+                             limiter=TokenBucket(rate=100, daily_quota=None)) as client:
+            with patch.object(client.session, 'get', return_value=fresh) as mock_get:
+                self.assertEqual(client.check('8.8.8.8')['abuseConfidenceScore'], 0)
+                client._background.shutdown(wait=True)
+            self.assertEqual(mock_get.call_count, 1)
+            self.assertEqual(cache.get('8.8.8.8', 90)['abuseConfidenceScore'], 75)
+
 
 if __name__ == '__main__':
     unittest.main()
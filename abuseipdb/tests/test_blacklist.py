@@ -0,0 +1,62 @@
+import unittest
+import os
+import time
+import tempfile
+from unittest.mock import MagicMock
+from abuseipdb.blacklist import Blacklist, fetch_blacklist, load_or_fetch_blacklist
+
+ENTRIES = [
+    {'ipAddress': '1.2.3.4', 'abuseConfidenceScore': 100, 'countryCode': 'CN',
+     'lastReportedAt': '2024-01-01T00:00:00+00:00'},
+    {'ipAddress': '2001:0db8::0001', 'abuseConfidenceScore': 95, 'countryCode': 'US',
+     'lastReportedAt': '2024-01-02T00:00:00+00:00'},
+]
+
+
+class TestBlacklist(unittest.TestCase):
+    """Test cases for the local blacklist copy"""
+
+    def test_membership_uses_canonical_form(self):
+        blacklist = Blacklist(ENTRIES)
+        self.assertEqual(len(blacklist), 2)
+        self.assertIn('::ffff:1.2.3.4', blacklist)
+        self.assertIn('2001:db8::1', blacklist)
+        self.assertNotIn('8.8.8.8', blacklist)
+
+    def test_result_for(self):
+        """Listed addresses get a /check-shaped payload"""
+        result = Blacklist(ENTRIES).result_for('1.2.3.4')
+        self.assertEqual(result['abuseConfidenceScore'], 100)
+        self.assertEqual(result['countryCode'], 'CN')
+        self.assertEqual(result['source'], 'blacklist')
+        self.assertIsNone(Blacklist(ENTRIES).result_for('8.8.8.8'))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'blacklist.json')
+            Blacklist(ENTRIES, fetched_at=123.0).save(path)
+            loaded = Blacklist.load(path)
+        self.assertEqual(loaded.fetched_at, 123.0)
+        self.assertIn('1.2.3.4', loaded)
+
+    def test_fetch_error_passthrough(self):
+        client = MagicMock()
+        client.blacklist.return_value = {'error': 'api_failed', 'message': 'API request failed'}
+        self.assertEqual(fetch_blacklist(client)['error'], 'api_failed')
+
+    def test_load_or_fetch(self):
+        """A fresh file is reused; a stale one is downloaded again"""
+        client = MagicMock()
+        client.blacklist.return_value = ENTRIES
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'blacklist.json')
+            self.assertIn('1.2.3.4', load_or_fetch_blacklist(path, client))
+            load_or_fetch_blacklist(path, client)
+            self.assertEqual(client.blacklist.call_count, 1)
+            Blacklist(ENTRIES, fetched_at=time.time() - 2 * 86400).save(path)
+            load_or_fetch_blacklist(path, client)
+            self.assertEqual(client.blacklist.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
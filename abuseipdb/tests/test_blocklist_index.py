@@ -0,0 +1,73 @@
+import unittest
+import os
+import tempfile
+from abuseipdb.blacklist import Blacklist
+from abuseipdb.blocklist_index import BlocklistIndex, read_cidr_feed, blacklist_entries
+
+
+class TestBlocklistIndex(unittest.TestCase):
+    """Test cases for the offline blocklist index"""
+
+    def setUp(self):
+        self.index = BlocklistIndex.build([
+            ('10.0.0.0/8', 50),
+            ('10.1.2.3', 100),
+            ('10.1.0.0/16', 70),
+            ('2001:db8::/32', 80),
+            ('::ffff:192.0.2.0/120', 60),
+        ])
+
+    def test_lookup(self):
+        """The most specific listing does not lose to a wider, lower-scored one"""
+        self.assertEqual(self.index.lookup('10.1.2.3'), 100)
+        self.assertEqual(self.index.lookup('10.1.2.4'), 70)
+        self.assertEqual(self.index.lookup('10.200.0.1'), 50)
+        self.assertEqual(self.index.lookup('2001:db8:ffff::1'), 80)
+        self.assertIsNone(self.index.lookup('11.0.0.0'))
+        self.assertIsNone(self.index.lookup('2001:db9::'))
+
+    def test_ipv4_mapped_and_invalid(self):
+        self.assertEqual(self.index.lookup('192.0.2.10'), 60)
+        self.assertEqual(self.index.lookup('::ffff:10.1.2.3'), 100)
+        self.assertIsNone(self.index.lookup('not_an_ip'))
+        self.assertIsNone(self.index.lookup(None))
+
+    def test_overlaps_are_flattened(self):
+        """Overlapping input ranges become non-overlapping stored ranges"""
+        index = BlocklistIndex.build([('10.0.0.0/24', 90), ('10.0.0.0/25', 90), ('10.0.1.0/24', 90)])
+        self.assertEqual(len(index), 1)
+        self.assertIn('10.0.1.255', index)
+        self.assertNotIn('10.0.2.0', index)
+
+    def test_save_and_memory_mapped_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bad.idx')
+            self.index.save(path)
+            loaded = BlocklistIndex.load(path)
+            self.assertEqual(len(loaded), len(self.index))
+            for ip in ('10.1.2.3', '10.1.2.4', '2001:db8::1', '192.0.2.1', '11.0.0.0'):
+                self.assertEqual(loaded.lookup(ip), self.index.lookup(ip))
+
+    def test_load_rejects_other_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'other.idx')
+            with open(path, 'wb') as handle:
+                handle.write(b'\0' * 64)
+            with self.assertRaises(ValueError):
+                BlocklistIndex.load(path)
+
+    def test_sources(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'drop.txt')
+            with open(path, 'w') as handle:
+                handle.write('; Spamhaus DROP\n1.10.16.0/20 ; SBL256894\n\n2.56.192.0/22 # note\n')
+            self.assertEqual(list(read_cidr_feed(path, 90)), [('1.10.16.0/20', 90), ('2.56.192.0/22', 90)])
+        blacklist = Blacklist([{'ipAddress': '1.2.3.4', 'abuseConfidenceScore': 99},
+                               {'ipAddress': '1.2.3.5', 'abuseConfidenceScore': 0},
+                               {'ipAddress': '1.2.3.6'}])
+        self.assertEqual(list(blacklist_entries(blacklist)), [('1.2.3.4', 99), ('1.2.3.5', 0), ('1.2.3.6', 100)])
+        self.assertEqual(BlocklistIndex.build(blacklist_entries(blacklist)).lookup('1.2.3.5'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
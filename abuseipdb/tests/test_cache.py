@@ -0,0 +1,111 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+from abuseipdb.cache import ReputationCache, cache_from_env
+from abuseipdb.tests.helpers import FakeClock
+
+
+class TestReputationCache(unittest.TestCase):
+    """Test cases for the ReputationCache"""
+
+    def setUp(self):
+        self.clock = FakeClock(1000.0)
+        self.cache = ReputationCache(max_entries=2, ttl=60, clock=self.clock)
+
+    def test_hit_and_miss_counters(self):
+        """A stored payload is returned and counted as a hit"""
+        self.assertIsNone(self.cache.get('8.8.8.8', 90))
+        self.cache.set('8.8.8.8', 90, {'abuseConfidenceScore': 0})
+        self.assertEqual(self.cache.get('8.8.8.8', 90), {'abuseConfidenceScore': 0})
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+    def test_ttl_expiry(self):
+        """Entries older than the TTL are misses"""
+        self.cache.set('8.8.8.8', 90, {'abuseConfidenceScore': 0})
+        self.clock.now += 61
+        self.assertIsNone(self.cache.get('8.8.8.8', 90))
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_ttl_capped_by_max_age(self):
+        """The TTL never exceeds the maxAgeInDays window of the lookup"""
+        cache = ReputationCache(ttl=10 * 86400, clock=self.clock)
+        cache.set('8.8.8.8', 1, {'abuseConfidenceScore': 0})
+        self.clock.now += 86400
+        self.assertIsNone(cache.get('8.8.8.8', 1))
+
+    def test_max_age_is_part_of_key(self):
+        self.cache.set('8.8.8.8', 90, {'abuseConfidenceScore': 0})
+        self.assertIsNone(self.cache.get('8.8.8.8', 30))
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted first"""
+        self.cache.set('1.1.1.1', 90, {'n': 1})
+        self.cache.set('2.2.2.2', 90, {'n': 2})
+        self.cache.get('1.1.1.1', 90)
+        self.cache.set('3.3.3.3', 90, {'n': 3})
+        self.assertIsNone(self.cache.get('2.2.2.2', 90))
+        self.assertIsNotNone(self.cache.get('1.1.1.1', 90))
+
+    def test_equivalent_spellings_share_entry(self):
+        self.cache.set('2001:db8::1', 90, {'n': 1})
+        self.assertEqual(self.cache.get('2001:0db8::0001', 90), {'n': 1})
+
+    def test_returns_copy(self):
+        self.cache.set('1.1.1.1', 90, {'n': 1})
+        self.cache.get('1.1.1.1', 90)['n'] = 2
+        self.assertEqual(self.cache.get('1.1.1.1', 90), {'n': 1})
+
+    def test_sqlite_backend_persists(self):
+        """Entries written to the SQLite file survive a new cache instance"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.db')
+            cache = ReputationCache(path=path, clock=self.clock)
+            cache.set('8.8.8.8', 90, {'abuseConfidenceScore': 3})
+            cache.close()
+            cache = ReputationCache(path=path, clock=self.clock)
+            self.assertEqual(cache.get('8.8.8.8', 90), {'abuseConfidenceScore': 3})
+            cache.clear()
+            self.assertIsNone(cache.get('8.8.8.8', 90))
+            cache.close()
+
+    def test_soft_ttl_marks_stale(self):
+        """Entries past the soft TTL are still served, flagged as stale"""
+        cache = ReputationCache(ttl=60, soft_ttl=30, clock=self.clock)
+        cache.set('8.8.8.8', 90, {'n': 1})
+        self.assertEqual(cache.get_entry('8.8.8.8', 90), ({'n': 1}, False))
+        self.clock.now += 31
+        self.assertEqual(cache.get_entry('8.8.8.8', 90), ({'n': 1}, True))
+        self.assertEqual(cache.stats()['stale_hits'], 1)
+        self.clock.now += 30
+        self.assertIsNone(cache.get_entry('8.8.8.8', 90))
+
+    def test_hottest(self):
+        """Entries are ranked by how often they were served, across refreshes"""
+        cache = ReputationCache(ttl=60, clock=self.clock)
+        cache.set('1.1.1.1', 90, {'n': 1})
+        cache.set('2.2.2.2', 90, {'n': 2})
+        for _ in range(3):
+            cache.get('2.2.2.2', 90)
+        cache.get('1.1.1.1', 90)
+        self.clock.now += 10
+        cache.set('2.2.2.2', 90, {'n': 3})
+        self.assertEqual(cache.hottest(1), [('2.2.2.2', 90, 0, 60)])
+        self.assertEqual([ip for ip, *_ in cache.hottest(5)], ['2.2.2.2', '1.1.1.1'])
+
+
+class TestCacheFromEnv(unittest.TestCase):
+
+    def test_disabled(self):
+        with patch.dict(os.environ, {'ABUSEIPDB_CACHE_SIZE': '0'}):
+            self.assertIsNone(cache_from_env())
+
+    def test_configured(self):
+        with patch.dict(os.environ, {'ABUSEIPDB_CACHE_SIZE': '5', 'ABUSEIPDB_CACHE_TTL': '30'}):
+            cache = cache_from_env()
+        self.assertEqual(cache.max_entries, 5)
+        self.assertEqual(cache.ttl, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import os
+import pstats
+import tempfile
+from unittest.mock import patch, MagicMock
+import requests
+from abuseipdb.metrics import Metrics, Histogram, get_metrics, profiled
+from abuseipdb.api_call import make_ip_check_request
+from abuseipdb.cache import ReputationCache
+from abuseipdb.rate_limit import TokenBucket
+from abuseipdb.tests.helpers import FakeClock
+
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for the lookup metrics registry and its exports"""
+
+    def setUp(self):
+        get_metrics().reset()
+        self.addCleanup(get_metrics().reset)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative(), [(0.1, 2), (1, 3), (float('inf'), 4)])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 3.65)
+
+    def test_timer_observes_stage(self):
+        clock = FakeClock()
+        metrics = Metrics(clock=clock)
+        with metrics.timer('http'):
+            clock.now += 0.25
+        self.assertEqual(metrics.stage('http'), (1, 0.25))
+        self.assertEqual(metrics.stage('parse'), (0, 0.0))
+
+    def test_render_prometheus_text(self):
+        metrics = Metrics(buckets=(0.5,))
+        metrics.observe('http', 0.2)
+        metrics.error('timeout')
+        metrics.error('timeout')
+        cache = ReputationCache()
+        cache.get('1.1.1.1', 90)
+        limiter = TokenBucket(rate=1000, daily_quota=100)
+        limiter.acquire()
+        text = metrics.render(cache, limiter)
+        self.assertIn('# TYPE abuseipdb_stage_seconds histogram\n', text)
+        self.assertIn('abuseipdb_stage_seconds_bucket{stage="http",le="0.5"} 1\n', text)
+        self.assertIn('abuseipdb_stage_seconds_bucket{stage="http",le="+Inf"} 1\n', text)
+        self.assertIn('abuseipdb_stage_seconds_count{stage="http"} 1\n', text)
+        self.assertIn('abuseipdb_api_errors_total{type="timeout"} 2\n', text)
+        self.assertIn('abuseipdb_quota_remaining 99\n', text)
+        self.assertIn('abuseipdb_cache_misses_total 1\n', text)
+        self.assertEqual(text.count('# TYPE abuseipdb_stage_seconds '), 1)
+
+    def test_write_dump(self):
+        metrics = Metrics()
+        metrics.request('check')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'abuseipdb.prom')
+            metrics.write(path)
+            with open(path) as handle:
+                self.assertIn('abuseipdb_api_requests_total{endpoint="check"} 1', handle.read())
+            self.assertEqual(os.listdir(tmp), ['abuseipdb.prom'])
+
+    @patch.dict(os.environ, {'ABUSEIPDB_API_KEY': 'test_key'})
+    @patch('requests.get')
+    def test_lookup_stages_and_errors(self, mock_get):
+        response = MagicMock(status_code=200, headers={})
+        response.json.return_value = {'data': {'ipAddress': '1.1.1.1'}}
+        mock_get.side_effect = [response, requests.exceptions.Timeout()]
+        limiter = TokenBucket(rate=1000, daily_quota=None)
+        make_ip_check_request('1.1.1.1', limiter=limiter)
+        make_ip_check_request('1.1.1.1', limiter=limiter)
+        make_ip_check_request('not_an_ip', limiter=limiter)
+        metrics = get_metrics()
+        self.assertEqual(metrics.stage('validation')[0], 3)
+        self.assertEqual(metrics.stage('http')[0], 2)
+        self.assertEqual(metrics.stage('parse')[0], 1)
+        self.assertEqual(metrics.counter('abuseipdb_api_requests_total', (('endpoint', 'check'),)), 2)
+        self.assertEqual(metrics.counter('abuseipdb_api_errors_total', (('type', 'timeout'),)), 1)
+        self.assertEqual(metrics.counter('abuseipdb_api_errors_total', (('type', 'invalid_ip'),)), 1)
+
+    def test_profiled(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'batch.prof')
+            with profiled(path):
+                sorted(range(1000), key=str)
+            stats = pstats.Stats(path)
+            self.assertTrue(stats.total_calls > 0)
+        with profiled(None) as profile:
+            self.assertIsNone(profile)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+from abuseipdb import rate_limit
+from abuseipdb.rate_limit import TokenBucket, get_rate_limiter, limiter_from_env
+from abuseipdb.quota import SharedQuota
+from abuseipdb.tests.helpers import FakeClock
+
+
+def make_bucket(**kwargs):
+    clock = FakeClock()
+    return TokenBucket(clock=clock, sleep=clock.sleep, **kwargs), clock
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test cases for the TokenBucket rate limiter"""
+
+    def test_burst_then_paced(self):
+        """Tokens up to capacity are free, later ones wait 1/rate seconds"""
+        bucket, clock = make_bucket(rate=10, capacity=2, daily_quota=None)
+        for _ in range(4):
+            self.assertTrue(bucket.acquire())
+        self.assertEqual(len(clock.slept), 2)
+        self.assertAlmostEqual(clock.now, 0.2)
+
+    def test_idle_time_refills_bucket(self):
+        """No delay is added once the bucket had time to refill"""
+        bucket, clock = make_bucket(rate=10, capacity=1, daily_quota=None)
+        bucket.acquire()
+        clock.now += 5
+        bucket.acquire()
+        self.assertEqual(clock.slept, [])
+
+    def test_daily_quota(self):
+        """acquire() refuses immediately once the daily quota is spent"""
+        bucket, clock = make_bucket(rate=100, daily_quota=3)
+        self.assertTrue(all(bucket.acquire() for _ in range(3)))
+        self.assertFalse(bucket.acquire())
+        self.assertTrue(bucket.quota_exhausted())
+        self.assertEqual(bucket.quota_remaining(), 0)
+
+    def test_remaining_header_syncs_quota(self):
+        """X-RateLimit-Remaining accounts for quota spent by other processes"""
+        bucket, _ = make_bucket(rate=100, daily_quota=1000)
+        bucket.acquire()
+        bucket.observe(200, {'X-RateLimit-Remaining': '2'})
+        self.assertEqual(bucket.quota_remaining(), 2)
+        self.assertTrue(bucket.acquire())
+        self.assertTrue(bucket.acquire())
+        self.assertFalse(bucket.acquire())
+
+    def test_429_with_short_retry_after_pauses(self):
+        """A 429 pauses the bucket for Retry-After seconds and slows it down"""
+        bucket, clock = make_bucket(rate=10, daily_quota=None)
+        bucket.observe(429, {'Retry-After': '3'})
+        self.assertLess(bucket.rate, 10)
+        self.assertTrue(bucket.acquire())
+        self.assertGreaterEqual(clock.now, 3)
+
+    def test_429_with_long_retry_after_exhausts(self):
+        """A Retry-After longer than max_wait means the quota window is over"""
+        bucket, clock = make_bucket(rate=10, daily_quota=None, max_wait=60)
+        bucket.observe(429, {'Retry-After': '3600'})
+        self.assertFalse(bucket.acquire())
+        clock.now += 3600
+        self.assertTrue(bucket.acquire())
+
+    def test_retry_after_window_keeps_daily_count(self):
+        """Only a new UTC day, not the end of a Retry-After window, resets the daily count"""
+        bucket, clock = make_bucket(rate=100, daily_quota=5, max_wait=60)
+        self.assertTrue(all(bucket.acquire() for _ in range(3)))
+        bucket.observe(429, {'Retry-After': '3600'})
+        clock.now += 3600
+        self.assertTrue(all(bucket.acquire() for _ in range(2)))
+        self.assertFalse(bucket.acquire())
+        self.assertEqual(bucket.used, 5)
+
+    def test_rate_recovers_after_success(self):
+        """Successful responses raise a reduced rate back to the configured one"""
+        bucket, _ = make_bucket(rate=16, daily_quota=None)
+        bucket.observe(429, {'Retry-After': '1'})
+        for _ in range(20):
+            bucket.observe(200, {})
+        self.assertEqual(bucket.rate, 16)
+
+    def test_non_numeric_headers_ignored(self):
+        """Missing or malformed headers leave the bucket untouched"""
+        bucket, _ = make_bucket(rate=10, daily_quota=5)
+        bucket.observe(200, {'X-RateLimit-Remaining': 'soon'})
+        self.assertEqual(bucket.quota_remaining(), 5)
+
+
+class TestGetRateLimiter(unittest.TestCase):
+    """Test cases for the shared limiter factory"""
+
+    def tearDown(self):
+        rate_limit._limiter = None
+
+    def test_configured_from_env(self):
+        rate_limit._limiter = None
+        env = {'ABUSEIPDB_RATE_LIMIT': '5', 'ABUSEIPDB_DAILY_QUOTA': '0'}
+        with patch.dict(os.environ, env):
+            limiter = get_rate_limiter()
+        self.assertEqual(limiter.rate, 5)
+        self.assertIsNone(limiter.daily_quota)
+        self.assertIs(get_rate_limiter(), limiter)
+
+    def test_share_of_rate_and_shared_quota(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {'ABUSEIPDB_RATE_LIMIT': '8', 'ABUSEIPDB_DAILY_QUOTA': '100',
+                   'ABUSEIPDB_QUOTA_PATH': os.path.join(tmp, 'quota.db')}
+            with patch.dict(os.environ, env):
+                limiter = limiter_from_env(4)
+            self.assertEqual(limiter.rate, 2)
+            self.assertEqual(limiter.shared.daily_quota, 100)
+            limiter.shared.close()
+
+
+class TestSharedQuota(unittest.TestCase):
+    """Test cases for the daily quota shared through SQLite"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'quota.db')
+        self.day = '2026-01-01'
+
+    def open(self, daily_quota=3):
+        quota = SharedQuota(self.path, daily_quota, today=lambda: self.day)
+        self.addCleanup(quota.close)
+        return quota
+
+    def test_budget_is_shared(self):
+        first, second = self.open(), self.open()
+        self.assertTrue(first.take())
+        self.assertTrue(second.take())
+        self.assertTrue(first.take())
+        self.assertFalse(second.take())
+        self.assertEqual(first.used(), 3)
+        self.assertEqual(second.remaining(), 0)
+
+    def test_new_day_resets(self):
+        quota = self.open(daily_quota=1)
+        self.assertTrue(quota.take())
+        self.assertFalse(quota.take())
+        self.day = '2026-01-02'
+        self.assertTrue(quota.take())
+
+    def test_sync_with_server_remaining(self):
+        quota = self.open(daily_quota=100)
+        quota.take()
+        quota.sync(10)
+        self.assertEqual(quota.used(), 90)
+        quota.sync(50)
+        self.assertEqual(quota.used(), 90)
+
+    def test_buckets_stop_at_shared_quota(self):
+        """Two limiters sharing a quota file spend it only once between them"""
+        first, _ = make_bucket(rate=100, daily_quota=3, shared=self.open())
+        second, _ = make_bucket(rate=100, daily_quota=3, shared=self.open())
+        granted = [first.acquire(), second.acquire(), first.acquire(), second.acquire()]
+        self.assertEqual(granted, [True, True, True, False])
+        self.assertTrue(second.quota_exhausted())
+        self.assertEqual(first.quota_remaining(), 0)
+        second.observe(200, {'X-RateLimit-Remaining': '0'})
+        self.assertFalse(first.acquire())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import os
+from unittest.mock import patch, MagicMock
+from abuseipdb.cache import ReputationCache
+from abuseipdb.rate_limit import TokenBucket
+from abuseipdb.refresh import ProactiveRefresher, refresher_from_env
+from abuseipdb.tests.helpers import FakeClock
+
+
+def fake_client(cache, daily_quota=None):
+    client = MagicMock()
+    client.cache = cache
+    client.max_age_in_days = 90
+    client.limiter = TokenBucket(rate=100, daily_quota=daily_quota)
+    return client
+
+
+class TestProactiveRefresher(unittest.TestCase):
+    """Test cases for the proactive refresh of hot cache entries"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ReputationCache(ttl=100, soft_ttl=50, clock=self.clock)
+        for ip, hits in (('1.1.1.1', 5), ('2.2.2.2', 3), ('3.3.3.3', 1)):
+            self.cache.set(ip, 90, {'ipAddress': ip})
+            for _ in range(hits):
+                self.cache.get(ip, 90)
+
+    def refreshed(self, client):
+        return [call.args[0] for call in client.check.call_args_list]
+
+    def test_refreshes_hot_entries_past_soft_ttl(self):
+        client = fake_client(self.cache)
+        refresher = ProactiveRefresher(client, top_n=2)
+        self.assertEqual(refresher.run_once(), 0)
+        self.clock.now = 60
+        self.assertEqual(refresher.run_once(), 2)
+        self.assertEqual(self.refreshed(client), ['1.1.1.1', '2.2.2.2'])
+        client.check.assert_called_with('2.2.2.2', bypass_cache=True)
+
+    def test_quota_share_caps_refreshes(self):
+        """Refreshes stop once their share of the daily quota is spent"""
+        client = fake_client(self.cache, daily_quota=10)
+        refresher = ProactiveRefresher(client, top_n=3, quota_share=0.2)
+        self.clock.now = 60
+        self.assertEqual(refresher.run_once(), 2)
+        self.assertEqual(refresher.run_once(), 0)
+        self.assertEqual(refresher.budget(), 0)
+
+    def test_without_soft_ttl_refreshes_before_expiry(self):
+        cache = ReputationCache(ttl=100, clock=self.clock)
+        cache.set('1.1.1.1', 90, {'ipAddress': '1.1.1.1'})
+        client = fake_client(cache)
+        refresher = ProactiveRefresher(client, top_n=1, refresh_at=0.8)
+        self.clock.now = 79
+        self.assertEqual(refresher.run_once(), 0)
+        self.clock.now = 81
+        self.assertEqual(refresher.run_once(), 1)
+
+    def test_refresher_from_env(self):
+        client = fake_client(self.cache)
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(refresher_from_env(client))
+        with patch.dict(os.environ, {'ABUSEIPDB_REFRESH_TOP_N': '50', 'ABUSEIPDB_REFRESH_QUOTA_SHARE': '0.25'}):
+            refresher = refresher_from_env(client)
+        self.assertEqual((refresher.top_n, refresher.quota_share), (50, 0.25))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+import os
+from unittest.mock import patch, MagicMock
+from abuseipdb.retry import RetryPolicy, CircuitBreaker
+from abuseipdb.api_call import make_ip_check_request
+from abuseipdb.rate_limit import TokenBucket
+from abuseipdb.tests.helpers import FakeClock
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Test cases for RetryPolicy backoff"""
+
+    def test_delay_grows_exponentially_with_cap(self):
+        policy = RetryPolicy(base_delay=0.5, max_delay=3, rand=lambda: 1.0)
+        self.assertEqual([policy.delay(n) for n in range(4)], [0.5, 1.0, 2.0, 3])
+
+    def test_delay_is_jittered(self):
+        policy = RetryPolicy(base_delay=1, rand=lambda: 0.25)
+        self.assertEqual(policy.delay(2), 1.0)
+
+    def test_wait_prefers_retry_after(self):
+        sleeps = []
+        policy = RetryPolicy(sleep=sleeps.append, rand=lambda: 1.0)
+        policy.wait(0, retry_after=4)
+        policy.wait(1)
+        self.assertEqual(sleeps, [4, 1.0])
+
+    def test_from_env(self):
+        with patch.dict(os.environ, {'ABUSEIPDB_MAX_RETRIES': '5', 'ABUSEIPDB_BACKOFF_MAX': '2'}):
+            policy = RetryPolicy.from_env()
+        self.assertEqual((policy.max_retries, policy.max_delay), (5, 2.0))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test cases for CircuitBreaker state changes"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, cooldown=30, clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+
+    def test_success_resets_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_one_trial(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 30
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertTrue(self.breaker.allow())
+
+    def test_release_returns_trial_slot(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 30
+        self.breaker.allow()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.clock.now = 59
+        self.assertFalse(self.breaker.allow())
+
+    def test_threshold_zero_disables(self):
+        with patch.dict(os.environ, {'ABUSEIPDB_BREAKER_THRESHOLD': '0'}):
+            self.assertIsNone(CircuitBreaker.from_env())
+
+
+class TestRetriedRequest(unittest.TestCase):
+    """Test cases for retries in make_ip_check_request"""
+
+    @patch('requests.get')
+    def test_short_429_retried(self, mock_get):
+        """A 429 with a short Retry-After is waited out by the limiter and retried"""
+        limited = MagicMock(status_code=429, headers={'Retry-After': '1'})
+        ok = MagicMock(status_code=200, headers={})
+        ok.json.return_value = {'data': {'ipAddress': '8.8.8.8'}}
+        mock_get.side_effect = [limited, ok]
+        clock = FakeClock()
+        limiter = TokenBucket(rate=100, daily_quota=None, clock=clock, sleep=clock.sleep)
+        policy = RetryPolicy(sleep=clock.sleep)
+
+        with patch.dict(os.environ, {'ABUSEIPDB_API_KEY': 'test_key'}):
+            result = make_ip_check_request('8.8.8.8', limiter=limiter, retry=policy)
+        self.assertEqual(result, {'ipAddress': '8.8.8.8'})
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(sum(clock.slept), 1)
+
+    @patch('requests.get')
+    def test_long_429_not_retried(self, mock_get):
+        """A Retry-After beyond the limiter's patience closes the quota window instead"""
+        mock_get.return_value = MagicMock(status_code=429, headers={'Retry-After': '7200'})
+        limiter = TokenBucket(rate=100, daily_quota=None)
+
+        with patch.dict(os.environ, {'ABUSEIPDB_API_KEY': 'test_key'}):
+            result = make_ip_check_request('8.8.8.8', limiter=limiter,
+                                           retry=RetryPolicy(sleep=lambda s: None))
+        self.assertEqual(result['message'], 'Daily API quota exhausted')
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('requests.get')
+    def test_quota_refusal_releases_trial(self, mock_get):
+        """A half-open trial refused by the limiter leaves the slot for the next call"""
+        ok = MagicMock(status_code=200, headers={})
+        ok.json.return_value = {'data': {'ipAddress': '8.8.8.8'}}
+        mock_get.return_value = ok
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=30, clock=clock)
+        breaker.record_failure()
+        clock.now = 30
+        empty = TokenBucket(rate=100, daily_quota=0)
+
+        with patch.dict(os.environ, {'ABUSEIPDB_API_KEY': 'test_key'}):
+            refused = make_ip_check_request('8.8.8.8', limiter=empty, breaker=breaker)
+            result = make_ip_check_request('8.8.8.8', limiter=TokenBucket(rate=100, daily_quota=None),
+                                           breaker=breaker)
+        self.assertEqual(refused['message'], 'Daily API quota exhausted')
+        self.assertEqual(result, {'ipAddress': '8.8.8.8'})
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import threading
+from abuseipdb.singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test cases for SingleFlight request coalescing"""
+
+    def run_concurrently(self, flight, key, func, callers=8):
+        """Starts `callers` threads on the same key while `func` is blocked."""
+        results = []
+        errors = []
+
+        def call():
+            try:
+                results.append(flight.do(key, func))
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def wait_for_followers(self, flight, count):
+        for _ in range(500):
+            if flight.coalesced >= count:
+                return
+            threading.Event().wait(0.01)
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait(5)
+            return {'abuseConfidenceScore': 42}
+
+        threads, results, _ = self.run_concurrently(flight, '1.2.3.4', slow)
+        self.wait_for_followers(flight, 7)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_exception_shared(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def failing():
+            release.wait(5)
+            raise RuntimeError('boom')
+
+        threads, results, errors = self.run_concurrently(flight, 'k', failing, callers=3)
+        self.wait_for_followers(flight, 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(results, [])
+
+    def test_sequential_calls_run_again(self):
+        """Finished calls are not remembered"""
+        flight = SingleFlight()
+        calls = []
+        flight.do('k', lambda: calls.append(1))
+        flight.do('k', lambda: calls.append(1))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(flight.coalesced, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Benchmark of the bulk validation and risk classification APIs.
+
+Compares pack_ips against is_valid_ip per string, and classify_risk_levels
+(on a 1-byte array, and on a NumPy array when NumPy is installed) against
+calculate_risk_level per score, both reading CONFIDENCE_THRESHOLD on every
+call and with the threshold passed in. Checks that the results agree.
+
+    python -m benchmarks.bench_bulk [count]
+"""
+import sys
+import time
+import random
+from array import array
+from abuseipdb.api_call import (
+    is_valid_ip, calculate_risk_level, confidence_threshold, pack_ips, classify_risk_levels, RISK_LEVELS,
+)
+
+
+def synthetic_inputs(count, invalid_rate=0.05, ipv6_rate=0.2, seed=1):
+    """`count` IP strings (IPv4, IPv6 and a share of invalid ones) and as many scores 0-100."""
+    rng = random.Random(seed)
+    ips = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < invalid_rate:
+            ips.append(rng.choice(["not_an_ip", "256.1.1.1", "1.2.3", "2001:db8:::1", ""]))
+        elif roll < invalid_rate + ipv6_rate:
+            ips.append(f"2001:db8:{rng.randrange(65536):x}::{rng.randrange(65536):x}")
+        else:
+            ips.append(".".join(str(rng.randrange(256)) for _ in range(4)))
+    scores = array("b", (rng.randint(0, 100) for _ in range(count)))
+    return ips, scores
+
+
+def timed(function):
+    """Returns (result, seconds) of one call."""
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def run(count=1_000_000):
+    """Returns [(name, seconds)] for every variant, after checking they agree."""
+    ips, scores = synthetic_inputs(count)
+    threshold = confidence_threshold()
+    timings = []
+
+    valid, seconds = timed(lambda: [is_valid_ip(ip) for ip in ips])
+    timings.append(("is_valid_ip per string", seconds))
+    (versions, _, _), seconds = timed(lambda: pack_ips(ips))
+    timings.append(("pack_ips", seconds))
+    if [bool(version) for version in versions] != valid:
+        raise AssertionError("pack_ips disagrees with is_valid_ip")
+
+    levels, seconds = timed(lambda: [calculate_risk_level(score) for score in scores])
+    timings.append(("calculate_risk_level per score", seconds))
+    _, seconds = timed(lambda: [calculate_risk_level(score, threshold) for score in scores])
+    timings.append(("calculate_risk_level, threshold passed", seconds))
+    codes, seconds = timed(lambda: classify_risk_levels(scores, threshold))
+    timings.append(("classify_risk_levels, array('b')", seconds))
+    if [RISK_LEVELS[code] for code in codes] != levels:
+        raise AssertionError("classify_risk_levels disagrees with calculate_risk_level")
+    try:
+        import numpy
+    except ImportError:
+        return timings
+    column = numpy.frombuffer(scores, dtype=numpy.int8)
+    numpy_codes, seconds = timed(lambda: classify_risk_levels(column, threshold))
+    timings.append(("classify_risk_levels, NumPy", seconds))
+    if numpy_codes.tobytes() != codes.tobytes():
+        raise AssertionError("NumPy classification differs from the array one")
+    return timings
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"{count} inputs")
+    for name, seconds in run(count):
+        print(f"  {name:40s} {seconds * 1000:9.1f} ms  ({seconds / count * 1e9:7.0f} ns/item)")
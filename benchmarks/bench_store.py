@@ -0,0 +1,43 @@
+"""
+Memory benchmark of the compact ResultStore against a dict of full results.
+
+Measures the memory held by `count` synthetic AbuseIPDB results kept as a
+plain dict of payloads and as a ResultStore, and checks that final_summary
+is the same for both.
+
+    python -m benchmarks.bench_store [count]
+"""
+import sys
+import gc
+import tracemalloc
+from check_ip_batch.main import final_summary
+from check_ip_batch.store import ResultStore
+from benchmarks.bench_summary import synthetic_results
+
+
+def measure(build):
+    """Returns (object, bytes still allocated after building it)."""
+    gc.collect()
+    tracemalloc.start()
+    built = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return built, size
+
+
+def run(count=100_000):
+    """Returns (dict bytes, store bytes) for `count` results."""
+    results, dict_size = measure(lambda: synthetic_results(count))
+    store, store_size = measure(lambda: ResultStore(results.items()))
+    if final_summary(store) != final_summary(results):
+        raise AssertionError("ResultStore summary differs from the dict one")
+    return dict_size, store_size
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dict_size, store_size = run(count)
+    print(f"{count} results")
+    print(f"  dict of payloads : {dict_size / 1e6:8.1f} MB")
+    print(f"  ResultStore      : {store_size / 1e6:8.1f} MB")
+    print(f"  reduction        : {dict_size / store_size:8.1f}x")
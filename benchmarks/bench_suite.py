@@ -0,0 +1,193 @@
+"""
+Benchmark suite against a local fake AbuseIPDB server.
+
+Measures throughput and latency percentiles of make_ip_check_request (one
+connection per call), AbuseIPDBClient.check (pooled keep-alive session),
+check_ip_batch.make_requests and final_summary at each requested size, and
+appends the run to a JSON-lines record (benchmarks/results.local.jsonl,
+untracked, unless --record names another file) so regressions show up as a
+change against the previous run with the same server settings. The fake
+server runs in the same process, so with no --latency the concurrent batch run
+measures client-side CPU cost rather than overlap of network waits.
+
+    python -m benchmarks.bench_suite --sizes 10,100,1000 --workers 16 --latency 0.005
+    python -m benchmarks.bench_suite --summary-sizes 1000,100000,1000000 --sizes 0
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+from abuseipdb.api_call import AbuseIPDBClient, make_ip_check_request
+from abuseipdb.rate_limit import TokenBucket
+from abuseipdb.retry import RetryPolicy
+from check_ip_batch.main import make_requests, final_summary
+from benchmarks.bench_summary import synthetic_results
+from benchmarks.fake_server import FakeAbuseIPDB
+
+RECORD_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.local.jsonl")
+
+
+def synthetic_ips(count):
+    return [f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}" for i in range(count)]
+
+def percentiles(samples):
+    """p50/p90/p99 of per-call latencies, in milliseconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    pick = lambda q: round(ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000, 3)
+    return {"p50_ms": pick(0.50), "p90_ms": pick(0.90), "p99_ms": pick(0.99)}
+
+def measurement(name, count, seconds, latencies=(), **extra):
+    result = {"name": name, "count": count, "seconds": round(seconds, 4),
+              "per_second": round(count / seconds, 1) if seconds else None}
+    result.update(percentiles(latencies))
+    result.update(extra)
+    return result
+
+def _limiter():
+    return TokenBucket(rate=1e9, daily_quota=None)
+
+def _retry():
+    return RetryPolicy(max_retries=2, base_delay=0.001, max_delay=0.01)
+
+def bench_check_request(base_url, count):
+    """Sequential make_ip_check_request calls, each on a new connection."""
+    limiter, retry = _limiter(), _retry()
+    latencies = []
+    start = time.perf_counter()
+    for ip in synthetic_ips(count):
+        began = time.perf_counter()
+        make_ip_check_request(ip, limiter=limiter, api_key="bench", base_url=base_url, retry=retry)
+        latencies.append(time.perf_counter() - began)
+    return measurement("make_ip_check_request", count, time.perf_counter() - start, latencies)
+
+def bench_client_check(base_url, count):
+    """Sequential AbuseIPDBClient.check calls over one keep-alive session."""
+    latencies = []
+    with AbuseIPDBClient(api_key="bench", base_url=base_url, limiter=_limiter(), retry_policy=_retry()) as client:
+        start = time.perf_counter()
+        for ip in synthetic_ips(count):
+            began = time.perf_counter()
+            client.check(ip)
+            latencies.append(time.perf_counter() - began)
+        seconds = time.perf_counter() - start
+    return measurement("AbuseIPDBClient.check", count, seconds, latencies)
+
+def bench_make_requests(base_url, count, workers):
+    """A whole batch through make_requests with the pooled client."""
+    latencies = []
+    with AbuseIPDBClient(api_key="bench", base_url=base_url, limiter=_limiter(), retry_policy=_retry(),
+                         pool_size=max(workers, 1)) as client:
+
+        def lookup(ip):
+            began = time.perf_counter()
+            try:
+                return client.check(ip)
+            finally:
+                latencies.append(time.perf_counter() - began)
+
+        start = time.perf_counter()
+        results = make_requests(synthetic_ips(count), workers, lookup=lookup)
+        seconds = time.perf_counter() - start
+    failed = sum(1 for result in results.values() if "error" in result)
+    return measurement("make_requests", count, seconds, latencies, workers=workers, failed=failed)
+
+def bench_final_summary(count):
+    results = synthetic_results(count)
+    start = time.perf_counter()
+    final_summary(results)
+    return measurement("final_summary", count, time.perf_counter() - start)
+
+def run(sizes=(10, 100, 1000), summary_sizes=(10, 1000, 100000), workers=16, **server_options):
+    """Runs the suite against a fresh fake server and returns its measurements."""
+    results = []
+    with FakeAbuseIPDB(**server_options) as server:
+        # The first request pays for importing the HTTP stack; keep it out of the numbers.
+        make_ip_check_request("192.0.2.1", limiter=_limiter(), api_key="bench", base_url=server.base_url)
+        for count in sizes:
+            results.append(bench_check_request(server.base_url, count))
+            results.append(bench_client_check(server.base_url, count))
+            results.append(bench_make_requests(server.base_url, count, 1))
+            if workers > 1:
+                results.append(bench_make_requests(server.base_url, count, workers))
+    for count in summary_sizes:
+        results.append(bench_final_summary(count))
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(RECORD_PATH), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def previous_run(path, server):
+    """The last recorded run with the same server settings, or None."""
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path) as handle:
+        for line in handle:
+            entry = json.loads(line)
+            if entry.get("server") == server:
+                last = entry
+    return last
+
+def record(path, server, results):
+    entry = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "server": server,
+        "results": results,
+    }
+    with open(path, "a") as handle:
+        handle.write(json.dumps(entry) + "\n")
+    return entry
+
+def report(results, previous=None, out=sys.stdout):
+    """Prints the measurements, with the throughput change against `previous`."""
+    before = {}
+    for result in (previous or {}).get("results", []):
+        before[(result["name"], result["count"], result.get("workers"))] = result.get("per_second")
+    out.write(f"{'benchmark':<24}{'count':>9}{'workers':>8}{'per second':>13}"
+              f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'change':>9}\n")
+    for result in results:
+        old = before.get((result["name"], result["count"], result.get("workers")))
+        change = f"{(result['per_second'] / old - 1) * 100:+.0f}%" if old and result["per_second"] else ""
+        out.write(f"{result['name']:<24}{result['count']:>9}{result.get('workers', ''):>8}"
+                  f"{result['per_second'] or 0:>13.1f}{result.get('p50_ms', ''):>9}"
+                  f"{result.get('p90_ms', ''):>9}{result.get('p99_ms', ''):>9}{change:>9}\n")
+
+
+def _sizes(value):
+    return [int(size) for size in value.split(",") if int(size) > 0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the API and batch paths against a fake AbuseIPDB.")
+    parser.add_argument("--sizes", type=_sizes, default=[10, 100, 1000], help="IP counts for the API benchmarks")
+    parser.add_argument("--summary-sizes", type=_sizes, default=[10, 1000, 100000],
+                        help="result counts for the summary benchmark")
+    parser.add_argument("--workers", type=int, default=16, help="workers for the concurrent batch run")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the fake API adds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument("--payload-size", type=int, default=0, help="approximate bytes per report")
+    parser.add_argument("--record", default=RECORD_PATH, help="JSON-lines file the run is appended to")
+    parser.add_argument("--no-record", action="store_true", help="only print the results")
+    args = parser.parse_args()
+
+    server = {"latency": args.latency, "error_rate": args.error_rate,
+              "rate_limit_rate": args.rate_limit_rate, "payload_size": args.payload_size}
+    results = run(args.sizes, args.summary_sizes, args.workers, **server)
+    report(results, previous_run(args.record, server))
+    if not args.no_record:
+        record(args.record, server, results)
+        print(f"recorded in {args.record}")
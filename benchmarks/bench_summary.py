@@ -0,0 +1,84 @@
+"""
+Benchmark of the check_ip_batch summary path on synthetic results.
+
+Compares the single-pass final_summary against the previous four-pass
+composition (batch_status_code_message, api_object_summary, results_summary
+and error_summary) and checks that both produce the same document.
+
+    python -m benchmarks.bench_summary [count]
+"""
+import sys
+import time
+import random
+from check_ip_batch.main import (
+    final_summary, batch_status_code_message, api_object_summary, results_summary, error_summary,
+)
+
+ERRORS = [
+    {"error": "invalid_ip", "message": "Invalid IP address format"},
+    {"error": "api_failed", "message": "API request failed"},
+    {"error": "rate_limited", "message": "Daily API quota exhausted"},
+]
+
+
+def synthetic_results(count, error_rate=0.05, seed=1):
+    """Builds `count` AbuseIPDB-shaped results with a share of errors."""
+    rng = random.Random(seed)
+    results = {}
+    for i in range(count):
+        ip = f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+        if rng.random() < error_rate:
+            results[ip] = dict(rng.choice(ERRORS))
+            continue
+        results[ip] = {
+            "ipAddress": ip,
+            "isPublic": True,
+            "abuseConfidenceScore": rng.randint(0, 100),
+            "countryCode": rng.choice(["US", "CN", "DE", "RU", "BR"]),
+            "usageType": "Data Center/Web Hosting/Transit",
+            "isp": rng.choice(["Example ISP", "Tencent Cloud", "Hetzner Online GmbH"]),
+            "domain": "example.com",
+            "hostnames": [],
+            "totalReports": rng.randint(0, 5000),
+            "numDistinctUsers": rng.randint(0, 500),
+            "lastReportedAt": "2024-01-01T00:00:00+00:00",
+        }
+    return results
+
+
+def multi_pass_summary(results):
+    """The pre-aggregator final_summary: four independent passes over the results."""
+    code, message = batch_status_code_message(results)
+    api_object = {"summary": api_object_summary(results), "results": results_summary(results)}
+    errors = error_summary(results)
+    if errors:
+        api_object["errors"] = errors
+    return {"step_status": {"code": code, "message": message}, "api_object": api_object}
+
+
+def best_of(func, results, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(results)
+        timings.append(time.perf_counter() - start)
+    return min(timings), output
+
+
+def run(count=100_000):
+    """Times both implementations on `count` results; returns (multi_pass, single_pass) seconds."""
+    results = synthetic_results(count)
+    multi_time, multi_output = best_of(multi_pass_summary, results)
+    single_time, single_output = best_of(final_summary, results)
+    if multi_output != single_output:
+        raise AssertionError("single-pass summary differs from the multi-pass one")
+    return multi_time, single_time
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    multi_time, single_time = run(count)
+    print(f"{count} results")
+    print(f"  multi-pass  : {multi_time * 1000:8.1f} ms")
+    print(f"  single-pass : {single_time * 1000:8.1f} ms")
+    print(f"  speed-up    : {multi_time / single_time:8.2f}x")
@@ -0,0 +1,158 @@
+"""
+Local stand-in for the AbuseIPDB API, for benchmarks and integration tests.
+
+Serves GET {base_url}/check with /check-shaped payloads derived from the
+queried address, over keep-alive HTTP/1.1, with configurable latency, share
+of 5xx errors, share of 429 responses and payload size. Point the tools at
+it with ABUSEIPDB_BASE_URL (or the client's base_url):
+
+    python -m benchmarks.fake_server --port 8900 --latency 0.02 --error-rate 0.01
+"""
+import sys
+import json
+import time
+import random
+import zlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+COUNTRIES = ["US", "CN", "DE", "RU", "BR", "NL", "FR", "IN"]
+ISPS = ["Example ISP", "Tencent Cloud", "Hetzner Online GmbH", "DigitalOcean LLC"]
+
+
+def fake_report(ip, padding=0):
+    """Deterministic /check payload for `ip`; `padding` adds that many hostname bytes."""
+    seed = zlib.crc32(ip.encode())
+    return {
+        "ipAddress": ip,
+        "isPublic": True,
+        "ipVersion": 6 if ":" in ip else 4,
+        "isWhitelisted": False,
+        "abuseConfidenceScore": seed % 101,
+        "countryCode": COUNTRIES[seed % len(COUNTRIES)],
+        "usageType": "Data Center/Web Hosting/Transit",
+        "isp": ISPS[seed % len(ISPS)],
+        "domain": "example.com",
+        "hostnames": ["x" * padding] if padding else [],
+        "isTor": False,
+        "totalReports": seed % 5000,
+        "numDistinctUsers": seed % 500,
+        "lastReportedAt": "2024-01-01T00:00:00+00:00",
+    }
+
+
+class FakeAbuseIPDB:
+    """
+    Fake AbuseIPDB server running on a background thread.
+
+    `latency` seconds are added to every response, `error_rate` of them are
+    503s and `rate_limit_rate` are 429s with a Retry-After of `retry_after`
+    seconds. `payload_size` pads each report to roughly that many bytes.
+    The request count is kept in `requests`.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=0, payload_size=0, seed=1):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.padding = max(payload_size - len(json.dumps({"data": fake_report("203.0.113.1")})), 0)
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v2"
+
+    def _outcome(self):
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+        if roll < self.error_rate:
+            return 503
+        if roll < self.error_rate + self.rate_limit_rate:
+            return 429
+        return 200
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Send headers and body in one segment; separate writes stall keep-alive
+            # clients on delayed ACKs.
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path != "/api/v2/check":
+                    return self._send(404, {"errors": [{"detail": "Not found"}]})
+                if fake.latency:
+                    time.sleep(fake.latency)
+                status = fake._outcome()
+                if status == 503:
+                    return self._send(503, {"errors": [{"detail": "Service unavailable"}]})
+                if status == 429:
+                    return self._send(429, {"errors": [{"detail": "Too many requests"}]},
+                                      {"Retry-After": str(fake.retry_after)})
+                ip = parse_qs(url.query).get("ipAddress", [""])[0]
+                self._send(200, {"data": fake_report(ip, fake.padding)})
+
+            def _send(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,),
+                                        name="fake-abuseipdb", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake AbuseIPDB API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument("--retry-after", type=int, default=0, help="Retry-After of 429 responses")
+    parser.add_argument("--payload-size", type=int, default=0, help="approximate bytes per report")
+    args = parser.parse_args()
+    server = FakeAbuseIPDB(args.host, args.port, args.latency, args.error_rate, args.rate_limit_rate,
+                           args.retry_after, args.payload_size)
+    print(f"Serving on {server.base_url} (set ABUSEIPDB_BASE_URL to it)", file=sys.stderr)
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
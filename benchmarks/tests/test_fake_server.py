@@ -0,0 +1,78 @@
+import unittest
+import io
+import os
+import sys
+import subprocess
+from abuseipdb.api_call import AbuseIPDBClient
+from abuseipdb.rate_limit import TokenBucket
+from abuseipdb.retry import RetryPolicy
+from benchmarks.fake_server import FakeAbuseIPDB, fake_report
+from benchmarks.bench_suite import percentiles, report, measurement
+
+
+def client_for(server, retries=0):
+    return AbuseIPDBClient(api_key='test_key', base_url=server.base_url,
+                           limiter=TokenBucket(rate=1e6, daily_quota=None),
+                           retry_policy=RetryPolicy(max_retries=retries, sleep=lambda s: None))
+
+
+class TestFakeServer(unittest.TestCase):
+    """End-to-end tests of AbuseIPDBClient against the fake AbuseIPDB server"""
+
+    def test_check_round_trip(self):
+        with FakeAbuseIPDB() as server, client_for(server) as client:
+            self.assertEqual(client.check('203.0.113.7'), fake_report('203.0.113.7'))
+            client.check('203.0.113.8')
+        self.assertEqual(server.requests, 2)
+
+    def test_payload_size(self):
+        with FakeAbuseIPDB(payload_size=4096) as server, client_for(server) as client:
+            hostnames = client.check('203.0.113.7')['hostnames']
+        self.assertGreater(len(hostnames[0]), 3000)
+
+    def test_errors_and_rate_limits(self):
+        with FakeAbuseIPDB(error_rate=1.0) as server, client_for(server, retries=2) as client:
+            self.assertEqual(client.check('203.0.113.7')['error'], 'api_failed')
+        self.assertEqual(server.requests, 3)
+        with FakeAbuseIPDB(rate_limit_rate=1.0, retry_after=3600) as server, client_for(server) as client:
+            self.assertEqual(client.check('203.0.113.7')['error'], 'rate_limited')
+
+    def test_threaded_cold_start(self):
+        """Concurrent first lookups in a fresh interpreter all import requests cleanly"""
+        script = (
+            "import sys\n"
+            "from functools import partial\n"
+            "from abuseipdb.api_call import make_ip_check_request\n"
+            "from abuseipdb.rate_limit import TokenBucket\n"
+            "from check_ip_batch.main import make_requests\n"
+            "from benchmarks.fake_server import FakeAbuseIPDB\n"
+            "assert 'requests' not in sys.modules\n"
+            "with FakeAbuseIPDB() as server:\n"
+            "    lookup = partial(make_ip_check_request, base_url=server.base_url, api_key='test_key',\n"
+            "                     limiter=TokenBucket(rate=1e6, daily_quota=None))\n"
+            "    results = make_requests([f'203.0.113.{i}' for i in range(32)], workers=8, lookup=lookup)\n"
+            "print(sum('error' in result for result in results.values()))\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        proc = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertEqual(proc.stdout.strip(), '0')
+
+
+class TestBenchSuiteHelpers(unittest.TestCase):
+
+    def test_percentiles(self):
+        self.assertEqual(percentiles([i / 1000 for i in range(1, 101)]),
+                         {'p50_ms': 51.0, 'p90_ms': 91.0, 'p99_ms': 100.0})
+        self.assertEqual(percentiles([]), {})
+
+    def test_report_shows_change(self):
+        now = [measurement('final_summary', 1000, 0.5)]
+        before = {'results': [measurement('final_summary', 1000, 1.0)]}
+        out = io.StringIO()
+        report(now, before, out)
+        self.assertIn('+100%', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import json
 import os
-from abuseipdb.api_call import make_ip_check_request, calculate_risk_level, status_code_message
+from abuseipdb.cache import cache_from_env
+from abuseipdb.api_call import AbuseIPDBClient, calculate_risk_level, status_code_message
 
 def build_result(data):
     """
@@ -35,10 +36,13 @@ def build_result(data):
     }
     return result
 
+def run(ip_address, cache=None):
+    """Looks up one IP (through `cache`, if given) and returns the build_result document."""
+    with AbuseIPDBClient(cache=cache) as client:
+        return build_result(client.check(ip_address))
+
         
 if __name__ == "__main__":
-    ip_address = os.getenv("IP_ADDRESS")
-    response_data = make_ip_check_request(ip_address)
-    result = build_result(response_data)
+    result = run(os.getenv("IP_ADDRESS"), cache_from_env())
     response=json.dumps(result, indent=4)
-    print(response)
\ No newline at end of file
+    print(response)
@@ -0,0 +1,46 @@
+import sys
+import csv
+import gzip
+from contextlib import nullcontext
+
+
+def open_input(path):
+    """Opens a batch input for reading text: "-" is stdin, *.gz is decompressed on the fly."""
+    if path == "-":
+        return nullcontext(sys.stdin)
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="")
+    return open(path, newline="")
+
+def iter_ip_addresses(path, column=None):
+    """
+    Lazily yields IP address strings from a file, stdin or gzip'd log.
+
+    Without `column` the input has one address per line; blank lines and
+    lines starting with '#' are skipped. With `column` the input is read as
+    CSV and the value is taken from that column, given either as a 0-based
+    index or as a header name (the first row is then the header).
+    Only one line is held in memory at a time.
+    """
+    with open_input(path) as stream:
+        if column is None:
+            for line in stream:
+                value = line.strip()
+                if value and not value.startswith("#"):
+                    yield value
+            return
+
+        reader = csv.reader(stream)
+        if str(column).isdigit():
+            index = int(column)
+        else:
+            header = next(reader, [])
+            names = [name.strip() for name in header]
+            if column not in names:
+                raise ValueError(f"Column {column!r} not found in input header")
+            index = names.index(column)
+        for row in reader:
+            if len(row) > index:
+                value = row[index].strip()
+                if value:
+                    yield value
@@ -0,0 +1,101 @@
+import os
+import json
+import sqlite3
+from abuseipdb.api_call import status_code_message
+
+
+class BatchJournal:
+    """
+    Checkpoint journal of a batch job, kept in SQLite.
+
+    Every (ip, result) pair is recorded as it arrives under the job's ID, so
+    a rerun of the same job skips inputs that already have a final result
+    and continues where the previous run stopped. Results with an API-side
+    error (code 2: api_failed, rate_limited) are not final and are looked up
+    again. Writes are committed every `commit_every` records and on close().
+    """
+
+    def __init__(self, path, job_id, commit_every=50):
+        self.path = path
+        self.job_id = job_id
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS journal "
+            "(job_id TEXT NOT NULL, ip TEXT NOT NULL, final INTEGER NOT NULL, result TEXT NOT NULL, "
+            "PRIMARY KEY (job_id, ip))"
+        )
+        self._db.commit()
+
+    def completed(self):
+        """Set of inputs of this job that already have a final result."""
+        rows = self._db.execute(
+            "SELECT ip FROM journal WHERE job_id = ? AND final = 1", (self.job_id,)
+        )
+        return {row[0] for row in rows}
+
+    def pending(self, ip_addresses):
+        """Yields the inputs that still need a lookup, lazily."""
+        completed = self.completed()
+        for ip in ip_addresses:
+            if ip not in completed:
+                yield ip
+
+    def record(self, ip, result):
+        final = status_code_message(result)[0] != 2
+        self._db.execute(
+            "INSERT OR REPLACE INTO journal (job_id, ip, final, result) VALUES (?, ?, ?, ?)",
+            (self.job_id, ip, int(final), json.dumps(result)),
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def record_all(self, results):
+        """Passes (ip, result) pairs through, journaling each one."""
+        for ip, result in results:
+            self.record(ip, result)
+            yield ip, result
+
+    def items(self):
+        """Lazily yields every journaled (ip, result) pair of this job, in the order they were recorded."""
+        self.commit()
+        rows = self._db.execute(
+            "SELECT ip, result FROM journal WHERE job_id = ? ORDER BY rowid", (self.job_id,)
+        )
+        for ip, result in rows:
+            yield ip, json.loads(result)
+
+    def results(self):
+        """Every journaled result of this job, as a dict."""
+        return dict(self.items())
+
+    def commit(self):
+        if self._uncommitted:
+            self._db.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        if self._db is not None:
+            self.commit()
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def journal_from_env():
+    """
+    Opens the journal for BATCH_JOB_ID in BATCH_JOURNAL_PATH (default
+    batch_journal.db), or returns None when no job ID is set.
+    """
+    job_id = os.getenv("BATCH_JOB_ID")
+    if not job_id:
+        return None
+    return BatchJournal(os.getenv("BATCH_JOURNAL_PATH", "batch_journal.db"), job_id)
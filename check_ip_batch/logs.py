@@ -0,0 +1,100 @@
+import os
+import re
+import sys
+import mmap
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from abuseipdb.api_call import canonical_ip
+
+CHUNK_SIZE = 64 * 1024 * 1024
+
+# Candidate tokens: maximal runs of hex digits, dots and colons (at least one
+# separator and three characters, so "::1" qualifies but plain numbers do
+# not), with an optional IPv6 zone ("%eth0"), that are not part of a longer
+# word, version string or dotted number. The final lookahead also refuses a
+# dot or colon so that a run cut short by a word never matches a shorter
+# prefix of itself. The few distinct tokens are then validated with the
+# checker's own rules, which discards timestamps, hex words and MAC addresses.
+_TOKEN = re.compile(rb"(?<![\w.])(?=[0-9A-Fa-f]*[:.])[0-9A-Fa-f:.]{3,}(?:%\w+)?(?![\w.:])")
+
+
+def _token_ip(token):
+    """Canonical address for a candidate token, allowing a trailing '.' or ':port' after IPv4."""
+    token = token.decode("ascii").rstrip(".")
+    if token.strip(":") == "":
+        # "::" (the unspecified address) is a separator in logs, not a peer.
+        return None
+    address = canonical_ip(token)
+    if address is None and token.count(":") == 1:
+        host, _, port = token.partition(":")
+        if port.isdigit() and "." in host:
+            address = canonical_ip(host)
+    return address
+
+def chunk_bounds(path, chunk_size=CHUNK_SIZE):
+    """Splits a file into (start, end) byte ranges of about `chunk_size` that end on a line break."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        bounds = []
+        start = 0
+        while start < size:
+            end = data.find(b"\n", min(start + chunk_size, size) - 1)
+            end = size if end == -1 else end + 1
+            bounds.append((start, end))
+            start = end
+    return bounds
+
+def scan_chunk(path, start, end):
+    """
+    Counts the valid addresses in one byte range of a file, keyed by their
+    canonical spelling. Runs in a worker process.
+    """
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        tokens = Counter(_TOKEN.findall(data, start, end))
+    counts = Counter()
+    for token, count in tokens.items():
+        address = _token_ip(token)
+        if address is not None:
+            counts[address] += count
+    return counts
+
+def extract_ips(paths, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Extracts every IPv4/IPv6 address from plain-text log files.
+
+    Files are memory-mapped and split into line-aligned chunks that are
+    scanned in parallel on a process pool (`workers` processes, default one
+    per CPU; a single chunk is scanned in-process). Tokens are accepted by
+    the same rules as the checker, and spellings of one address are counted
+    together. Returns a Counter of canonical address -> occurrences.
+    """
+    jobs = [(path, start, end) for path in paths for start, end in chunk_bounds(path, chunk_size)]
+    counts = Counter()
+    if len(jobs) <= 1 or workers == 1:
+        for job in jobs:
+            counts.update(scan_chunk(*job))
+        return counts
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_counts in executor.map(scan_chunk, *zip(*jobs)):
+            counts.update(chunk_counts)
+    return counts
+
+def log_ip_addresses(paths, workers=None):
+    """
+    The distinct addresses found in the logs as batch input: a Counter of
+    address -> occurrences that iterates most frequent first. With quota-aware
+    scheduling the counts become the lookup priorities.
+    """
+    return Counter(dict(extract_ips(paths, workers).most_common()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract and count IP addresses in log files.")
+    parser.add_argument("paths", nargs="+", help="plain-text log files")
+    parser.add_argument("--workers", type=int, default=None, help="scanner processes (default: one per CPU)")
+    args = parser.parse_args()
+    for address, count in extract_ips(args.paths, args.workers).most_common():
+        sys.stdout.write(f"{address}\t{count}\n")
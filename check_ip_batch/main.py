@@ -1,7 +1,26 @@
 import os
+import sys
 import json
-import time
-from abuseipdb.api_call import make_ip_check_request, calculate_risk_level, status_code_message
+import argparse
+import asyncio
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from check_ip_batch.inputs import iter_ip_addresses
+from check_ip_batch.logs import log_ip_addresses
+from check_ip_batch.journal import journal_from_env
+from check_ip_batch.scheduler import schedule, deferred_from_env
+from check_ip_batch.store import ResultStore
+from check_ip_batch.sinks import SINKS
+from check_ip_batch.options import add_batch_options, check_batch_options
+from abuseipdb.cache import cache_from_env
+from abuseipdb.rate_limit import get_rate_limiter
+from abuseipdb.metrics import get_metrics, profiled
+from abuseipdb.api_call import (
+    AbuseIPDBClient, make_ip_check_request, calculate_risk_level, status_code_message,
+    canonical_ip, confidence_threshold, is_network,
+)
+from abuseipdb.blacklist import Blacklist, load_or_fetch_blacklist
+from abuseipdb.blocklist_index import BlocklistIndex
 
 def separate_ip_addresses():
     """Separate IP addresses from environment variable and returns them as a list."""
@@ -17,15 +36,376 @@ def separate_ip_addresses():
             values.append(clean_value)
     return values
 
-def make_requests(ip_addresses):
-    """Make API requests for a list of IP addresses and return their results."""
-    results = {}
-    for i, ip in enumerate(ip_addresses):
-        if i > 0:
-            time.sleep(0.1)  # Rate limiting
-        result = make_ip_check_request(ip)
-        results[ip] = result
-    return results
+def input_ip_addresses():
+    """
+    Returns the batch input: a lazy stream from IP_INPUT_FILE (a path, "-" for
+    stdin, optionally gzip'd) when set, the distinct addresses found in the
+    raw IP_INPUT_LOGS files (comma-separated, most frequent first, with their
+    counts, see log_ip_addresses), otherwise the IP_ADDRESSES list.
+    IP_INPUT_COLUMN selects a CSV column by header name or 0-based index.
+    """
+    logs = [path.strip() for path in os.getenv("IP_INPUT_LOGS", "").split(",") if path.strip()]
+    path = os.getenv("IP_INPUT_FILE")
+    if path:
+        return iter_ip_addresses(path, os.getenv("IP_INPUT_COLUMN"))
+    if logs:
+        return log_ip_addresses(logs)
+    return separate_ip_addresses()
+
+def canonical_spellings(ip_addresses):
+    """
+    Maps every input spelling to the address it is looked up under.
+    Valid inputs map to their canonical form, so variants of one address share
+    a lookup; invalid inputs map to themselves and still get their own error.
+    """
+    spellings = {}
+    for ip in ip_addresses:
+        if ip not in spellings:
+            spellings[ip] = canonical_ip(ip) or ip
+    return spellings
+
+def iter_results(ip_addresses, workers=1, lookup=None, window=None, ordered=True):
+    """
+    Lazily yields (ip, result) pairs, one per distinct spelling.
+
+    `ip_addresses` can be any iterable, including a generator over a file; it
+    is consumed as results are produced. Each distinct address is looked up
+    once and shared by all its spellings. With workers > 1 up to `window`
+    inputs (default 4 per worker) are read ahead and looked up concurrently on
+    a thread pool while earlier results are yielded, in input order or, with
+    ordered=False, as soon as each lookup completes. Network results from
+    check-block are followed by one pair per reported address, except for
+    addresses that already have a pair (the first one wins).
+    """
+    seen = set()
+    return expand_networks(_iter_lookups(ip_addresses, workers, lookup, window, ordered, seen), seen)
+
+class _YieldedResults:
+    """
+    Results of the addresses _iter_lookups has already yielded, for their
+    later spellings. They are kept as compact ResultStore rows, so no full
+    payload outlives its first yield; only a payload the store cannot hold
+    (from a custom lookup) is kept as it is.
+    """
+
+    def __init__(self):
+        self._store = ResultStore()
+        self._other = {}
+
+    def add(self, address, result):
+        if result.get("error") is not None or "abuseConfidenceScore" in result:
+            self._store.add(address, result)
+        else:
+            self._other[address] = result
+
+    def __contains__(self, address):
+        return address in self._store or address in self._other
+
+    def __getitem__(self, address):
+        if address in self._other:
+            return self._other[address]
+        return self._store[address]
+
+def _iter_lookups(ip_addresses, workers, lookup, window, ordered, seen):
+    lookup = lookup or make_ip_check_request
+    done = _YieldedResults()
+    if workers <= 1:
+        # Pacing is handled by the shared rate limiter inside make_ip_check_request.
+        for ip in ip_addresses:
+            if ip in seen:
+                continue
+            seen.add(ip)
+            address = canonical_ip(ip) or ip
+            if address in done:
+                yield ip, done[address]
+                continue
+            result = lookup(address)
+            done.add(address, result)
+            yield ip, result
+        return
+
+    window = window or workers * 4
+    # Lookups in flight, until their result is first yielded
+    futures = {}
+
+    def finish(address, future):
+        result = future.result()
+        if futures.pop(address, None) is not None:
+            done.add(address, result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        waiting = {}
+        for ip in ip_addresses:
+            if ip in seen:
+                continue
+            seen.add(ip)
+            address = canonical_ip(ip) or ip
+            future = futures.get(address)
+            if future is None and address not in done:
+                future = futures[address] = executor.submit(lookup, address)
+            if ordered:
+                pending.append((ip, address, future))
+                while len(pending) >= window:
+                    yield _pending_result(pending.popleft(), finish, done)
+            elif future is None:
+                yield ip, done[address]
+            elif future in waiting:
+                waiting[future][1].append(ip)
+            elif future.done():
+                yield ip, finish(address, future)
+            else:
+                waiting[future] = (address, [ip])
+                while len(waiting) >= window:
+                    yield from _drain_completed(waiting, finish)
+        while pending:
+            yield _pending_result(pending.popleft(), finish, done)
+        while waiting:
+            yield from _drain_completed(waiting, finish)
+
+def _pending_result(entry, finish, done):
+    """(ip, result) for a queued (ip, address, future); without a future the address was already yielded."""
+    ip, address, future = entry
+    return ip, done[address] if future is None else finish(address, future)
+
+def _drain_completed(waiting, finish):
+    """Waits for at least one future in `waiting` and yields its spellings' results."""
+    completed, _ = wait(waiting, return_when=FIRST_COMPLETED)
+    for future in completed:
+        address, ips = waiting.pop(future)
+        result = finish(address, future)
+        for ip in ips:
+            yield ip, result
+
+def make_requests(ip_addresses, workers=1, mode="thread", lookup=None, store=None):
+    """
+    Make API requests for a list of IP addresses and return their results.
+
+    Inputs are normalized and deduplicated first: each distinct address is
+    looked up once and its result is fanned back out to every spelling of it.
+    With workers > 1 the lookups are kept in flight concurrently, either on a
+    bounded thread pool (mode="thread") or on an asyncio event loop
+    (mode="asyncio"). The returned mapping keeps the input order in all modes.
+    `lookup` replaces make_ip_check_request, e.g. with AbuseIPDBClient.check.
+    With a ResultStore as `store`, results are added to it as they arrive
+    (keeping only the summary fields) and the store is returned.
+    """
+    lookup = lookup or make_ip_check_request
+    if workers > 1 and mode == "asyncio":
+        results = {} if store is None else store
+        add = results.__setitem__ if store is None else store.add
+        asyncio.run(_collect_async(iter_results_async(ip_addresses, workers, lookup), add))
+        return results
+    if workers > 1 and mode != "thread":
+        raise ValueError(f"Unknown batch mode: {mode}")
+    results = iter_results(ip_addresses, workers, lookup)
+    if store is None:
+        return dict(results)
+    store.extend(results)
+    return store
+
+def run_journaled(ip_addresses, journal, workers=1, lookup=None, deferred=None):
+    """
+    Resumable make_requests: looks up only the inputs that have no final result
+    in the BatchJournal yet, journaling each result as soon as it arrives, and
+    returns every result of the job, including those of earlier runs, as a
+    ResultStore.
+    """
+    for _ in batch_stream(ip_addresses, workers, lookup, journal=journal, deferred=deferred):
+        pass
+    return ResultStore(journal.items())
+
+def batch_stream(ip_addresses, workers=1, lookup=None, journal=None, deferred=None, ordered=False):
+    """
+    iter_results with the optional batch features layered on: inputs already
+    finished in the `journal` are skipped, a DeferredQueue (`deferred`) turns
+    on priority scheduling with quota deferral, and every result is journaled.
+    A Counter input (see log_ip_addresses) gives each address its count as
+    scheduling priority.
+    """
+    priorities = ip_addresses if isinstance(ip_addresses, Counter) else None
+    if journal is not None:
+        ip_addresses = journal.pending(ip_addresses)
+    if deferred is not None:
+        stream = schedule(ip_addresses, deferred,
+                          lambda ranked: iter_results(ranked, workers, lookup), priorities)
+    else:
+        stream = iter_results(ip_addresses, workers, lookup, ordered=ordered)
+    if journal is not None:
+        stream = journal.record_all(stream)
+    return stream
+
+async def iter_results_async(ip_addresses, workers, lookup=None, window=None):
+    """
+    Asyncio variant of iter_results: lazily yields (ip, result) pairs in input
+    order while `ip_addresses` is still being read. `workers` tasks take the
+    distinct addresses from a bounded queue and run the blocking lookup in
+    worker threads, with at most `window` inputs (default 4 per worker) read
+    ahead, so the input is never held in memory as a whole.
+    """
+    lookup = lookup or make_ip_check_request
+    window = window or workers * 4
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(window)
+    seen = set()
+    done = _YieldedResults()
+    # Lookups queued or in flight, until their result is first yielded
+    futures = {}
+    pending = deque()
+
+    async def work(executor):
+        while True:
+            address, future = await queue.get()
+            try:
+                future.set_result(await loop.run_in_executor(executor, lookup, address))
+            except Exception as exc:
+                future.set_exception(exc)
+
+    async def finish(ip, address, future):
+        if future is None:
+            return ip, done[address]
+        result = await future
+        if futures.pop(address, None) is not None:
+            done.add(address, result)
+        return ip, result
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        tasks = [asyncio.ensure_future(work(executor)) for _ in range(workers)]
+        try:
+            for ip in ip_addresses:
+                if ip in seen:
+                    continue
+                seen.add(ip)
+                address = canonical_ip(ip) or ip
+                future = futures.get(address)
+                if future is None and address not in done:
+                    future = futures[address] = loop.create_future()
+                    await queue.put((address, future))
+                pending.append((ip, address, future))
+                while len(pending) >= window:
+                    for pair in expand_networks([await finish(*pending.popleft())], seen):
+                        yield pair
+            while pending:
+                for pair in expand_networks([await finish(*pending.popleft())], seen):
+                    yield pair
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+async def _collect_async(stream, add):
+    async for ip, result in stream:
+        add(ip, result)
+
+def block_lookup(lookup, check_block):
+    """
+    Lookup that sends CIDR inputs to `check_block`, one request per network,
+    and single addresses to `lookup`.
+    """
+    def check(address):
+        if is_network(address):
+            return network_result(address, check_block(address))
+        return lookup(address)
+    return check
+
+def screened_lookup(lookup, blacklist):
+    """Lookup that answers blacklisted addresses locally and sends the rest to `lookup`."""
+    def check(address):
+        result = blacklist.result_for(address)
+        if result is not None:
+            return result
+        return lookup(address)
+    return check
+
+def indexed_lookup(lookup, index):
+    """
+    Lookup that answers addresses inside a range of the offline BlocklistIndex
+    locally, with the range's score, and sends the rest to `lookup`.
+    """
+    def check(address):
+        score = index.lookup(address)
+        if score is None:
+            return lookup(address)
+        return {
+            "ipAddress": address,
+            "abuseConfidenceScore": score,
+            "totalReports": None,
+            "countryCode": None,
+            "isp": None,
+            "source": "blocklist_index",
+        }
+    return check
+
+def network_result(network, data):
+    """
+    Turns a check-block payload into a row for the network itself: the highest
+    score and the total report count across its reported addresses.
+    The reported addresses are kept for expand_networks.
+    """
+    if "error" in data:
+        return data
+    reported = data.get("reportedAddress") or []
+    return {
+        "ipAddress": network,
+        "abuseConfidenceScore": max((entry["abuseConfidenceScore"] for entry in reported), default=0),
+        "totalReports": sum(entry.get("numReports", 0) for entry in reported),
+        "countryCode": None,
+        "isp": None,
+        "reportedAddress": reported,
+    }
+
+def expand_networks(results, seen=None):
+    """
+    Passes (ip, result) pairs through, adding one pair per address reported in
+    a network result. `seen` holds the inputs already taken (see
+    _iter_lookups); a reported address in it is skipped, and the reported
+    addresses are added to it, so an address given both explicitly and inside
+    a network is counted once in every output format.
+    """
+    seen = set() if seen is None else seen
+    for ip, result in results:
+        yield ip, result
+        for entry in result.get("reportedAddress") or ():
+            if entry["ipAddress"] in seen:
+                continue
+            seen.add(entry["ipAddress"])
+            yield entry["ipAddress"], {
+                "ipAddress": entry["ipAddress"],
+                "abuseConfidenceScore": entry["abuseConfidenceScore"],
+                "totalReports": entry.get("numReports"),
+                "countryCode": entry.get("countryCode"),
+                "isp": None,
+                "lastReportedAt": entry.get("mostRecentReport"),
+            }
+
+def build_lookup(client):
+    """
+    Lookup used by the batch entry point: CIDR inputs go to check-block and,
+    when ABUSEIPDB_BLACKLIST_PATH is set, addresses on the locally kept
+    blacklist (refreshed daily) are answered without a per-IP check. With
+    BLOCKLIST_INDEX_PATH set, addresses in the offline index are screened
+    out before anything else.
+    """
+    lookup = block_lookup(client.check, client.check_block)
+    index_path = os.getenv("BLOCKLIST_INDEX_PATH")
+    path = os.getenv("ABUSEIPDB_BLACKLIST_PATH")
+    if path:
+        blacklist = load_or_fetch_blacklist(path, client,
+                                            confidence_minimum=int(os.getenv("BLACKLIST_CONFIDENCE_MINIMUM", 90)))
+        if isinstance(blacklist, Blacklist):
+            lookup = screened_lookup(lookup, blacklist)
+        else:
+            print(f"Blacklist unavailable: {blacklist.get('message')}", file=sys.stderr)
+    if index_path:
+        lookup = indexed_lookup(lookup, BlocklistIndex.load(index_path))
+    return lookup
+
+def batch_settings():
+    """Reads the worker count and concurrency mode from environment variables."""
+    workers = int(os.getenv("BATCH_WORKERS", 1))
+    mode = os.getenv("BATCH_MODE", "thread")
+    return workers, mode
 
 def api_object_summary(results):
     """
@@ -92,17 +472,21 @@ def results_summary(results):
     """
     results_summary={}
     for ip in results:
-        res={}
         if "error" not in results[ip]:
-            abuse_confidence_score=int(results[ip]['abuseConfidenceScore'])
-            res["risk_level"]=calculate_risk_level(abuse_confidence_score)
-            res["abuse_confidence_score"]=abuse_confidence_score
-            res["total_reports"]=results[ip]['totalReports']
-            res["country_code"]=results[ip]['countryCode']
-            res["isp"]=results[ip]['isp']
-            results_summary[ip]=res
+            results_summary[ip]=result_record(results[ip])
     return results_summary
 
+def result_record(result, threshold=None):
+    """Key fields of one successful API result, as listed under "results"."""
+    res={}
+    abuse_confidence_score=int(result['abuseConfidenceScore'])
+    res["risk_level"]=calculate_risk_level(abuse_confidence_score, threshold)
+    res["abuse_confidence_score"]=abuse_confidence_score
+    res["total_reports"]=result['totalReports']
+    res["country_code"]=result['countryCode']
+    res["isp"]=result['isp']
+    return res
+
 def error_summary(results):
     """
     Extract error information from failed API results.
@@ -120,28 +504,225 @@ def final_summary(results):
     Combine all result components into a final comprehensive summary.
     
     Returns a dictionary containing step status, API object summary, individual results,
-    and errors (if any).
+    and errors (if any). Built in a single pass over the results, timed as
+    the "summarize" stage.
     """
-    res={}
-    step_status={}
-    api_object={}
-    code,message=batch_status_code_message(results)
-    step_status["code"]=code
-    step_status["message"]=message
-    api_object["summary"]=api_object_summary(results)
-    api_object["results"]=results_summary(results)
-    
-    res["step_status"]= step_status
-    errors=error_summary(results)
-    if errors:
-        api_object["errors"]=errors
-    res["api_object"]=api_object
-    return res
+    with get_metrics().timer("summarize"):
+        aggregator=BatchAggregator(keep_results=True)
+        for ip, result in results.items():
+            aggregator.add(ip, result)
+        return aggregator.final_summary()
+
+
+class BatchAggregator:
+    """
+    Single-pass batch aggregator.
+
+    Each add() classifies one result once and updates the same counts that
+    api_object_summary and batch_status_code_message compute by scanning a
+    finished results dict, so a summary is available at any point without
+    keeping the results. With keep_results=True it also collects the
+    "results" and "errors" sections for final_summary(). The risk threshold
+    is resolved once, when the aggregator is created.
+    """
+
+    def __init__(self, keep_results=False, threshold=None):
+        self.threshold = confidence_threshold() if threshold is None else threshold
+        self.keep_results = keep_results
+        self.total = 0
+        self.successful = 0
+        self.status_successes = 0
+        self.api_failed = 0
+        self.risk_counts = {"HIGH": 0, "MEDIUM": 0, "LOW": 0}
+        self.results = {}
+        self.errors = {}
+
+    def add(self, ip, result):
+        """
+        Counts one result and returns its per-IP output record:
+        {"ip", "result"} for a successful lookup, {"ip", "error"} otherwise.
+        """
+        self.total += 1
+        code, _ = status_code_message(result)
+        if code == 0:
+            self.status_successes += 1
+        elif code == 2:
+            self.api_failed += 1
+
+        record = {"ip": ip}
+        if result.get("error") is not None:
+            record["error"] = result.get("message")
+            if self.keep_results:
+                self.errors[ip] = record["error"]
+            return record
+        self.successful += 1
+        record["result"] = result_record(result, self.threshold)
+        self.risk_counts[record["result"]["risk_level"]] += 1
+        if self.keep_results and "error" not in result:
+            self.results[ip] = record["result"]
+        return record
+
+    def step_status(self):
+        """Same (code, message) as batch_status_code_message over the results seen so far."""
+        if self.total == 0:
+            return 1, "failed"
+        if self.status_successes + self.api_failed == 0:
+            return 1, "failed"
+        if self.api_failed == 0:
+            return 0, "success"
+        if self.status_successes > 0:
+            return 0, "partial_success"
+        return 2, "failed"
+
+    def summary(self):
+        """Same dictionary as api_object_summary over the results seen so far."""
+        return {
+            "total": self.total,
+            "successful": self.successful,
+            "failed": self.total - self.successful,
+            "risk_counts": dict(self.risk_counts),
+        }
+
+
+    def summary_document(self):
+        """The step_status and summary counts, without the per-IP sections."""
+        code, message = self.step_status()
+        return {"step_status": {"code": code, "message": message}, "api_object": {"summary": self.summary()}}
+
+    def final_summary(self):
+        """Same document as final_summary over the results seen so far (needs keep_results)."""
+        code, message = self.step_status()
+        api_object = {"summary": self.summary(), "results": self.results}
+        if self.errors:
+            api_object["errors"] = self.errors
+        return {"step_status": {"code": code, "message": message}, "api_object": api_object}
+
+
+def write_ndjson(results, out, journal=None):
+    """
+    Writes one compact JSON line per (ip, result) pair as soon as it arrives,
+    followed by a closing line with the step_status and summary counts.
+    With the BatchJournal of a resumed job, the pairs are only this run's
+    and the closing counts cover every result of the job in the journal.
+    Returns the aggregator holding the final counts.
+    """
+    aggregator = BatchAggregator()
+    for ip, result in results:
+        out.write(json.dumps(aggregator.add(ip, result), separators=(",", ":")) + "\n")
+        out.flush()
+    if journal is not None:
+        aggregator = BatchAggregator(threshold=aggregator.threshold)
+        for ip, result in journal.items():
+            aggregator.add(ip, result)
+    out.write(json.dumps(aggregator.summary_document(), separators=(",", ":")) + "\n")
+    out.flush()
+    return aggregator
+
+def write_sink(results, sink):
+    """
+    Writes (ip, result) pairs to a bulk output sink (see check_ip_batch.sinks)
+    without keeping them, then closes it with the summary document.
+    Returns the aggregator holding the final counts.
+    """
+    aggregator = BatchAggregator()
+    sink.write(aggregator.add(ip, result) for ip, result in results)
+    sink.close(aggregator.summary_document())
+    return aggregator
+
+def write_results(results, output_format="json", output=None, out=None, overwrite=False):
+    """Writes finished results (a mapping) in one of the formats run() produces."""
+    out = out or sys.stdout
+    if output_format == "ndjson":
+        write_ndjson(results.items(), out)
+    elif output_format in SINKS:
+        aggregator = write_sink(results.items(), SINKS[output_format](output, overwrite))
+        print(json.dumps(aggregator.summary_document(), indent=4), file=out)
+    else:
+        print(json.dumps(final_summary(results), indent=4), file=out)
+
+def parse_args(argv=None):
+    """Command-line options (see check_ip_batch.options); they default to environment variables."""
+    parser = argparse.ArgumentParser(description="Check a batch of IP addresses against AbuseIPDB.")
+    add_batch_options(parser)
+    args = parser.parse_args(argv)
+    check_batch_options(parser, args)
+    return args
+
+def run_shards(ip_addresses, shards, directory, workers=1, output_format="json", output=None,
+               shard=None, merge=False, out=None, overwrite=False):
+    """
+    Sharded run (see check_ip_batch.shards): all `shards` as processes on
+    this host, only `shard` (the other shards run elsewhere against the same
+    input), or, with `merge`, no lookups but the merged results of every
+    shard journal in `directory`. Writes the output like run().
+    """
+    from check_ip_batch.shards import run_sharded, run_shard, merge_shards
+
+    if merge:
+        results = merge_shards(directory, shards)
+    elif shard is not None:
+        results = run_shard(ip_addresses, shard, shards, directory, workers)
+    else:
+        results = run_sharded(ip_addresses, shards, directory, workers)
+    write_results(results, output_format, output, out, overwrite)
+
+
+def run(ip_addresses, workers=1, mode="thread", output_format="json", output=None,
+        journal=None, deferred=None, cache=None, out=None, metrics_path=None, profile=None,
+        overwrite=False):
+    """
+    Runs a whole batch the way the entry point does and writes its output:
+    the final_summary JSON document, NDJSON lines, or a bulk sink at `output`
+    followed by the summary counts. Closes the journal and deferred queue.
+    With `metrics_path` the stage timings, error counts, quota and cache
+    stats are dumped there at the end; with `profile` the run is profiled.
+    The tables of an earlier sqlite output are only replaced with `overwrite`.
+    """
+    out = out or sys.stdout
+    try:
+        with AbuseIPDBClient(pool_size=max(workers, 1), cache=cache) as client, profiled(profile):
+            lookup = build_lookup(client)
+            if output_format == "ndjson":
+                write_ndjson(batch_stream(ip_addresses, workers, lookup, journal, deferred), out, journal)
+            elif output_format in SINKS:
+                # Opened first, so a sink that cannot be written fails before any quota is spent.
+                sink = SINKS[output_format](output, overwrite)
+                if journal is not None:
+                    results = run_journaled(ip_addresses, journal, workers, lookup, deferred).items()
+                else:
+                    results = batch_stream(ip_addresses, workers, lookup, deferred=deferred)
+                aggregator = write_sink(results, sink)
+                print(json.dumps(aggregator.summary_document(), indent=4), file=out)
+            else:
+                if journal is not None:
+                    results = run_journaled(ip_addresses, journal, workers, lookup, deferred)
+                elif deferred is not None:
+                    results = ResultStore(batch_stream(ip_addresses, workers, lookup, deferred=deferred))
+                else:
+                    results = make_requests(ip_addresses, workers, mode, lookup=lookup, store=ResultStore())
+                summary = final_summary(results)
+                response=json.dumps(summary, indent=4)  
+                print(response, file=out)
+            if deferred is not None and len(deferred):
+                limiter = client.limiter or get_rate_limiter()
+                print(f"{len(deferred)} lookups deferred to the next quota window "
+                      f"({deferred.path}); quota left: {limiter.quota_remaining()}", file=sys.stderr)
+            if metrics_path:
+                get_metrics().write(metrics_path, client.cache, client.limiter or get_rate_limiter())
+    finally:
+        if journal is not None:
+            journal.close()
+        if deferred is not None:
+            deferred.close()
 
 
 if __name__ == "__main__":
-    ip_addresses = separate_ip_addresses()
-    results = make_requests(ip_addresses)
-    summary = final_summary(results)
-    response=json.dumps(summary, indent=4)  
-    print(response)
\ No newline at end of file
+    args = parse_args()
+    workers, mode = batch_settings()
+    if args.shards:
+        run_shards(input_ip_addresses(), args.shards, args.shard_dir, workers, args.format, args.output,
+                   args.shard, args.merge, overwrite=args.overwrite)
+    else:
+        run(input_ip_addresses(), workers, mode, args.format, args.output,
+            journal_from_env(), deferred_from_env(), cache_from_env(),
+            metrics_path=args.metrics_path, profile=args.profile, overwrite=args.overwrite)
@@ -0,0 +1,50 @@
+import os
+import importlib.util
+
+# Formats written by a check_ip_batch.sinks sink to --output. Kept as names so
+# that building a parser does not import the sinks and their optional pyarrow.
+SINK_FORMATS = ("csv", "sqlite", "parquet")
+FORMATS = ("json", "ndjson", *SINK_FORMATS)
+
+
+def add_batch_options(parser):
+    """
+    Adds the output, metrics and shard options shared by check_ip_batch.main
+    and `ip-reputation batch`. They default to the OUTPUT_FORMAT, OUTPUT_PATH,
+    OUTPUT_OVERWRITE, METRICS_PATH, BATCH_PROFILE and BATCH_SHARD* environment variables.
+    """
+    parser.add_argument("--format", choices=FORMATS, default=os.getenv("OUTPUT_FORMAT", "json"),
+                        help="output format (csv, sqlite and parquet write to --output)")
+    parser.add_argument("--output", default=os.getenv("OUTPUT_PATH"),
+                        help="file written by the csv, sqlite and parquet formats")
+    parser.add_argument("--overwrite", action="store_true",
+                        default=os.getenv("OUTPUT_OVERWRITE", "") in ("1", "true", "yes"),
+                        help="replace the results and summary tables of an earlier sqlite output")
+    parser.add_argument("--metrics-path", default=os.getenv("METRICS_PATH"),
+                        help="file the run's metrics are written to, in Prometheus text format")
+    parser.add_argument("--profile", default=os.getenv("BATCH_PROFILE"),
+                        help="file the run's cProfile stats are written to")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("BATCH_SHARDS", 0)) or None,
+                        help="split the batch by IP hash into this many shards, one process each")
+    parser.add_argument("--shard", type=int, default=int(os.getenv("BATCH_SHARD")) if os.getenv("BATCH_SHARD") else None,
+                        help="run only this shard (0 to --shards - 1), e.g. one per machine")
+    parser.add_argument("--merge", action="store_true", default=os.getenv("BATCH_MERGE", "") in ("1", "true", "yes"),
+                        help="only merge the results of all --shards shards")
+    parser.add_argument("--shard-dir", default=os.getenv("BATCH_SHARD_DIR", "batch_shards"),
+                        help="directory holding one result journal per shard")
+
+def check_batch_options(parser, args):
+    """Exits through parser.error() when the options from add_batch_options cannot be combined."""
+    if args.format in SINK_FORMATS and not args.output:
+        parser.error(f"--format {args.format} needs --output")
+    if args.format == "sqlite" and not args.overwrite:
+        from check_ip_batch.sinks import SqliteSink
+        existing = SqliteSink.existing_tables(args.output)
+        if existing:
+            parser.error(f"{args.output} already has a {' and '.join(existing)} table; pass --overwrite to replace it")
+    if args.format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        parser.error("--format parquet needs pyarrow (pip install pyarrow)")
+    if (args.shard is not None or args.merge) and not args.shards:
+        parser.error("--shard and --merge need --shards")
+    if args.shard is not None and not 0 <= args.shard < args.shards:
+        parser.error(f"--shard must be between 0 and {args.shards - 1}")
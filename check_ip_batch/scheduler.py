@@ -0,0 +1,105 @@
+import os
+import time
+import sqlite3
+from collections import Counter
+from abuseipdb.api_call import canonical_ip
+
+
+def prioritize(ip_addresses, priorities=None):
+    """
+    Returns the distinct inputs as (ip, priority) pairs, highest priority first.
+
+    An input's priority is its value in `priorities` when given, otherwise how
+    often its address occurs in the input (all spellings counted together).
+    Inputs with the same priority keep their input order.
+    """
+    counts = Counter()
+    spellings = {}
+    for ip in ip_addresses:
+        address = canonical_ip(ip) or ip
+        counts[address] += 1
+        spellings.setdefault(ip, address)
+    priorities = priorities or {}
+    ranked = [(ip, priorities.get(ip, counts[address])) for ip, address in spellings.items()]
+    ranked.sort(key=lambda item: item[1], reverse=True)
+    return ranked
+
+
+class DeferredQueue:
+    """
+    Persistent queue of lookups parked until the next quota window.
+
+    Kept in a SQLite file so that IPs which could not be checked today are
+    picked up, with their priority, by the next run.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS deferred "
+            "(ip TEXT PRIMARY KEY, priority REAL NOT NULL, deferred_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM deferred").fetchone()[0]
+
+    def items(self):
+        """Parked (ip, priority) pairs, highest priority first."""
+        rows = self._db.execute("SELECT ip, priority FROM deferred ORDER BY priority DESC, deferred_at")
+        return [(ip, priority) for ip, priority in rows]
+
+    def add(self, ip, priority):
+        self._db.execute(
+            "INSERT INTO deferred (ip, priority, deferred_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (ip) DO UPDATE SET priority = MAX(priority, excluded.priority)",
+            (ip, priority, time.time()),
+        )
+        self._db.commit()
+
+    def remove(self, ip):
+        self._db.execute("DELETE FROM deferred WHERE ip = ?", (ip,))
+        self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def schedule(ip_addresses, deferred, run, priorities=None):
+    """
+    Quota-aware batch order.
+
+    Inputs, together with the lookups parked in the DeferredQueue by earlier
+    runs, are handed to `run` (e.g. iter_results with a bound lookup) in
+    priority order, so the most important lookups use the quota first. A
+    lookup that fails with rate_limited (the daily quota is spent) is parked
+    in `deferred` instead of being yielded as a failure; parked lookups that
+    now have a result leave the queue. Yields (ip, result) pairs.
+    """
+    parked = dict(deferred.items())
+    merged = dict(parked)
+    merged.update(priorities or {})
+    ranked = prioritize(list(parked) + list(ip_addresses), merged)
+    order = dict(ranked)
+    for ip, result in run(ip for ip, _ in ranked):
+        if result.get("error") == "rate_limited":
+            deferred.add(ip, order.get(ip, 0))
+            continue
+        if ip in parked:
+            deferred.remove(ip)
+        yield ip, result
+
+
+def deferred_from_env():
+    """Opens the DeferredQueue at BATCH_DEFERRED_PATH, or returns None when it is not set."""
+    path = os.getenv("BATCH_DEFERRED_PATH")
+    return DeferredQueue(path) if path else None
@@ -0,0 +1,92 @@
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from abuseipdb.api_call import AbuseIPDBClient, canonical_ip
+from abuseipdb.cache import cache_from_env
+from abuseipdb.rate_limit import limiter_from_env
+from check_ip_batch.journal import BatchJournal
+from check_ip_batch.store import ResultStore
+
+# Daily quota file the shards share in their directory unless ABUSEIPDB_QUOTA_PATH is set
+QUOTA_FILE = "quota.db"
+
+
+def shard_of(ip, shards):
+    """
+    Stable shard number (0 to shards - 1) of an input. Spellings of one
+    address share a shard, and the number is the same on every host and run
+    (unlike hash(), which is salted per process).
+    """
+    key = (canonical_ip(ip) or ip.strip()).encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big") % shards
+
+def select_shard(ip_addresses, shard, shards):
+    """Lazily yields the inputs that belong to `shard` of `shards`."""
+    for ip in ip_addresses:
+        if shard_of(ip, shards) == shard:
+            yield ip
+
+def shard_journal(directory, shard, shards):
+    """Opens the BatchJournal that holds the results of one shard, in `directory`."""
+    name = f"shard-{shard}-of-{shards}"
+    os.makedirs(directory, exist_ok=True)
+    return BatchJournal(os.path.join(directory, f"{name}.db"), name)
+
+def run_shard(ip_addresses, shard, shards, directory, workers=1, lookup=None):
+    """
+    Looks up this shard's part of the input and journals it in `directory`,
+    resuming where an earlier run of the shard stopped. Without a `lookup`
+    the shard uses its own client, whose limiter gets 1/shards of the request
+    rate and takes its daily quota from ABUSEIPDB_QUOTA_PATH, or by default
+    from quota.db in `directory`, which the other shards writing there share.
+    Returns the shard's results as a ResultStore.
+    """
+    from check_ip_batch.main import run_journaled, build_lookup
+
+    with shard_journal(directory, shard, shards) as journal:
+        ip_addresses = select_shard(ip_addresses, shard, shards)
+        if lookup is not None:
+            return run_journaled(ip_addresses, journal, workers, lookup)
+        limiter = limiter_from_env(shards, os.path.join(directory, QUOTA_FILE))
+        with AbuseIPDBClient(pool_size=max(workers, 1), cache=cache_from_env(), limiter=limiter) as client:
+            return run_journaled(ip_addresses, journal, workers, build_lookup(client))
+
+def _shard_process(ip_addresses, shard, shards, directory, workers, lookup):
+    return len(run_shard(ip_addresses, shard, shards, directory, workers, lookup))
+
+def merge_shards(directory, shards, ip_addresses=None):
+    """
+    Combines the journals of all `shards` in `directory` into one ResultStore.
+    Given the input, results follow its order, as in a single-process run,
+    followed by the addresses reported in check-block results.
+    """
+    merged = ResultStore()
+    for shard in range(shards):
+        if not os.path.exists(os.path.join(directory, f"shard-{shard}-of-{shards}.db")):
+            raise FileNotFoundError(f"Shard {shard}/{shards} has no results in {directory}")
+        with shard_journal(directory, shard, shards) as journal:
+            merged.extend(journal.items())
+    if ip_addresses is None:
+        return merged
+    ordered = ResultStore((ip, merged[ip]) for ip in dict.fromkeys(ip_addresses) if ip in merged)
+    ordered.extend((ip, result) for ip, result in merged.items() if ip not in ordered)
+    return ordered
+
+def run_sharded(ip_addresses, shards, directory, workers=1, lookup=None):
+    """
+    Runs a batch as `shards` processes on this host, each looking up the
+    inputs of one shard with `workers` concurrent lookups, and returns the
+    merged results. The processes split the request rate between them and
+    share one daily quota (see run_shard). A `lookup` must be picklable
+    (a module-level function).
+    """
+    ip_addresses = list(ip_addresses)
+    parts = [[] for _ in range(shards)]
+    for ip in ip_addresses:
+        parts[shard_of(ip, shards)].append(ip)
+    with ProcessPoolExecutor(max_workers=shards) as executor:
+        futures = [executor.submit(_shard_process, part, shard, shards, directory, workers, lookup)
+                   for shard, part in enumerate(parts)]
+        for future in futures:
+            future.result()
+    return merge_shards(directory, shards, ip_addresses)
@@ -0,0 +1,137 @@
+import os
+import csv
+import json
+import sqlite3
+from itertools import islice
+
+# One row per IP; "error" is set instead of the result fields for failed lookups
+COLUMNS = ("ip", "risk_level", "abuse_confidence_score", "total_reports", "country_code", "isp", "error")
+BATCH_ROWS = 10000
+
+
+def record_row(record):
+    """Flattens a BatchAggregator.add() record into a tuple of COLUMNS."""
+    result = record.get("result")
+    if result is None:
+        return (record["ip"], None, None, None, None, None, record.get("error"))
+    return (record["ip"], result["risk_level"], result["abuse_confidence_score"],
+            result["total_reports"], result["country_code"], result["isp"], None)
+
+def _import_pyarrow():
+    """pyarrow with its parquet module, imported on first use, or None when it is not installed."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:  # Parquet output is optional
+        return None
+    return pyarrow
+
+def _batches(records, size=BATCH_ROWS):
+    rows = map(record_row, records)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class CsvSink:
+    """
+    Writes the per-IP rows to a CSV file with a header, through a large write
+    buffer, and the summary document to `<path>.summary.json` next to it.
+    Existing files are replaced.
+    """
+
+    def __init__(self, path, overwrite=True):
+        self.path = path
+        self._handle = open(path, "w", newline="", buffering=1024 * 1024)
+        self._writer = csv.writer(self._handle)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, records):
+        for batch in _batches(records):
+            self._writer.writerows(batch)
+
+    def close(self, summary):
+        self._handle.close()
+        with open(f"{self.path}.summary.json", "w") as handle:
+            json.dump(summary, handle, indent=4)
+
+
+class SqliteSink:
+    """
+    Writes the per-IP rows to a `results` table and the summary document to a
+    one-row `summary` table, inserting BATCH_ROWS rows per transaction.
+    The file can be an existing database, but tables of an earlier output in
+    it are only replaced with `overwrite`; otherwise FileExistsError is raised.
+    """
+
+    def __init__(self, path, overwrite=False):
+        existing = self.existing_tables(path)
+        if existing and not overwrite:
+            raise FileExistsError(f"{path} already has a {' and '.join(existing)} table (use --overwrite)")
+        self._db = sqlite3.connect(path)
+        self._db.executescript(
+            "DROP TABLE IF EXISTS results; DROP TABLE IF EXISTS summary;"
+            "CREATE TABLE results (ip TEXT, risk_level TEXT, abuse_confidence_score INTEGER, "
+            "total_reports INTEGER, country_code TEXT, isp TEXT, error TEXT);"
+            "CREATE TABLE summary (document TEXT NOT NULL);"
+        )
+
+    @staticmethod
+    def existing_tables(path):
+        """The output tables (results, summary) that already exist in the database at `path`."""
+        if not os.path.exists(path):
+            return []
+        db = sqlite3.connect(path)
+        try:
+            names = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            db.close()
+        return [table for table in ("results", "summary") if table in names]
+
+    def write(self, records):
+        insert = f"INSERT INTO results VALUES ({', '.join('?' * len(COLUMNS))})"
+        for batch in _batches(records):
+            with self._db:
+                self._db.executemany(insert, batch)
+
+    def close(self, summary):
+        with self._db:
+            self._db.execute("INSERT INTO summary (document) VALUES (?)", (json.dumps(summary),))
+        self._db.close()
+
+
+class ParquetSink:
+    """
+    Writes the per-IP rows to a Parquet file, one row group per BATCH_ROWS
+    rows, with the summary document in the file's "summary" metadata.
+    Needs pyarrow. An existing file is replaced.
+    """
+
+    def __init__(self, path, overwrite=True):
+        pyarrow = self._pyarrow = _import_pyarrow()
+        if pyarrow is None:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+        self._schema = pyarrow.schema([
+            ("ip", pyarrow.string()), ("risk_level", pyarrow.string()),
+            ("abuse_confidence_score", pyarrow.int8()), ("total_reports", pyarrow.int64()),
+            ("country_code", pyarrow.string()), ("isp", pyarrow.string()), ("error", pyarrow.string()),
+        ])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, records):
+        pyarrow = self._pyarrow
+        for batch in _batches(records):
+            columns = zip(*batch)
+            self._writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+                schema=self._schema))
+
+    def close(self, summary):
+        # Key-value metadata lives in the file footer, so it can be added last.
+        self._writer.add_key_value_metadata({"summary": json.dumps(summary)})
+        self._writer.close()
+
+
+SINKS = {"csv": CsvSink, "sqlite": SqliteSink, "parquet": ParquetSink}
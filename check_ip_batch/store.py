@@ -0,0 +1,127 @@
+from array import array
+from collections.abc import Mapping
+
+# Placeholder for missing numbers in the integer columns
+_MISSING = -1
+
+
+class ResultStore(Mapping):
+    """
+    Compact, append-only ip -> result mapping for large batches.
+
+    Only the fields the summaries read are kept, in flat columns: the input
+    spellings packed into one byte buffer, the score and report count as
+    machine integers, and country codes, ISPs and error messages as indexes
+    into a table of interned strings. IPs are found through an open-addressing
+    hash table of row numbers rather than a dict of strings. Everything else in the AbuseIPDB
+    payload (hostnames, usageType, domain, ...) is dropped when a result is
+    added, so a million results take tens of megabytes.
+
+    Reading an item rebuilds a small result dictionary with abuseConfidenceScore,
+    totalReports, countryCode and isp, or error and message for a failed lookup.
+    Iteration follows insertion order; adding an IP again replaces its result.
+    """
+
+    def __init__(self, pairs=()):
+        self._ip_data = bytearray()
+        self._ip_ends = array("Q")
+        self._scores = array("b")
+        self._reports = array("q")
+        self._countries = array("I")
+        self._isps = array("I")
+        self._strings = [None]
+        self._string_ids = {None: 0}
+        # Row number + 1 per slot, 0 for an empty slot
+        self._slots = array("q", bytes(8 * 8))
+        self.extend(pairs)
+
+    def _intern(self, value):
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return string_id
+
+    def add(self, ip, result):
+        """Stores the summary fields of one result."""
+        if result.get("error") is not None:
+            # Errors keep their code and message in the country/isp columns.
+            row = (_MISSING, _MISSING, self._intern(result["error"]), self._intern(result.get("message")))
+        else:
+            reports = result.get("totalReports")
+            row = (int(result["abuseConfidenceScore"]), _MISSING if reports is None else reports,
+                   self._intern(result.get("countryCode")), self._intern(result.get("isp")))
+        slot, i = self._find(ip)
+        if i is None:
+            i = len(self._scores)
+            self._slots[slot] = i + 1
+            self._ip_data += ip.encode()
+            self._ip_ends.append(len(self._ip_data))
+            self._scores.append(row[0])
+            self._reports.append(row[1])
+            self._countries.append(row[2])
+            self._isps.append(row[3])
+            if 2 * len(self._scores) > len(self._slots):
+                self._grow()
+        else:
+            self._scores[i], self._reports[i], self._countries[i], self._isps[i] = row
+
+    def _find(self, ip):
+        """(slot, row) for `ip`, or (free slot, None) when it is not stored."""
+        mask = len(self._slots) - 1
+        slot = hash(ip) & mask
+        while True:
+            row = self._slots[slot]
+            if row == 0:
+                return slot, None
+            if self._ip(row - 1) == ip:
+                return slot, row - 1
+            slot = (slot + 1) & mask
+
+    def _grow(self):
+        self._slots = array("q", bytes(16 * len(self._slots)))
+        mask = len(self._slots) - 1
+        for i in range(len(self._scores)):
+            slot = hash(self._ip(i)) & mask
+            while self._slots[slot]:
+                slot = (slot + 1) & mask
+            self._slots[slot] = i + 1
+
+    def extend(self, pairs):
+        for ip, result in pairs:
+            self.add(ip, result)
+
+    def _ip(self, i):
+        start = self._ip_ends[i - 1] if i else 0
+        return self._ip_data[start:self._ip_ends[i]].decode()
+
+    def _result(self, i):
+        if self._scores[i] == _MISSING:
+            return {"error": self._strings[self._countries[i]], "message": self._strings[self._isps[i]]}
+        reports = self._reports[i]
+        return {
+            "abuseConfidenceScore": self._scores[i],
+            "totalReports": None if reports == _MISSING else reports,
+            "countryCode": self._strings[self._countries[i]],
+            "isp": self._strings[self._isps[i]],
+        }
+
+    def __getitem__(self, ip):
+        i = self._find(ip)[1] if isinstance(ip, str) else None
+        if i is None:
+            raise KeyError(ip)
+        return self._result(i)
+
+    def __contains__(self, ip):
+        return isinstance(ip, str) and self._find(ip)[1] is not None
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __iter__(self):
+        for i in range(len(self._scores)):
+            yield self._ip(i)
+
+    def items(self):
+        """(ip, result) pairs in insertion order, without index lookups."""
+        return ((self._ip(i), self._result(i)) for i in range(len(self._scores)))
@@ -0,0 +1,60 @@
+import unittest
+import io
+import os
+import gzip
+import tempfile
+from unittest.mock import patch
+from check_ip_batch.inputs import iter_ip_addresses
+
+
+class TestIterIpAddresses(unittest.TestCase):
+    """Test cases for the streaming batch input reader"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text, compress=False):
+        path = os.path.join(self.tmp.name, name)
+        opener = gzip.open if compress else open
+        with opener(path, 'wt') as handle:
+            handle.write(text)
+        return path
+
+    def test_one_per_line(self):
+        """Blank lines and comments are skipped, values are trimmed"""
+        path = self.write('ips.txt', '# scanners\n1.2.3.4\n\n  10.0.0.1 \n')
+        self.assertEqual(list(iter_ip_addresses(path)), ['1.2.3.4', '10.0.0.1'])
+
+    def test_gzip(self):
+        path = self.write('ips.txt.gz', '1.2.3.4\n8.8.8.8\n', compress=True)
+        self.assertEqual(list(iter_ip_addresses(path)), ['1.2.3.4', '8.8.8.8'])
+
+    def test_csv_column_by_name(self):
+        path = self.write('flows.csv', 'ts,src_ip,port\n1,1.2.3.4,22\n2,,80\n3,8.8.8.8,443\n')
+        self.assertEqual(list(iter_ip_addresses(path, 'src_ip')), ['1.2.3.4', '8.8.8.8'])
+
+    def test_csv_column_by_index(self):
+        path = self.write('flows.csv', '1,1.2.3.4\n2,8.8.8.8\n3\n')
+        self.assertEqual(list(iter_ip_addresses(path, '1')), ['1.2.3.4', '8.8.8.8'])
+
+    def test_missing_column(self):
+        path = self.write('flows.csv', 'ts,dst\n1,1.2.3.4\n')
+        with self.assertRaises(ValueError):
+            list(iter_ip_addresses(path, 'src_ip'))
+
+    def test_stdin(self):
+        with patch('sys.stdin', io.StringIO('1.2.3.4\n')):
+            self.assertEqual(list(iter_ip_addresses('-')), ['1.2.3.4'])
+
+    def test_lazy(self):
+        """The reader is a generator: nothing is read until values are requested"""
+        path = self.write('ips.txt', '1.2.3.4\n')
+        stream = iter_ip_addresses(path)
+        os.remove(path)
+        with self.assertRaises(FileNotFoundError):
+            next(stream)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import os
+import io
+import json
+import tempfile
+from unittest.mock import patch, MagicMock
+from check_ip_batch.journal import BatchJournal, journal_from_env
+from check_ip_batch.main import run_journaled, final_summary, batch_stream, write_ndjson
+
+
+def ok(ip, score=0):
+    return {'ipAddress': ip, 'abuseConfidenceScore': score, 'totalReports': 1,
+            'countryCode': 'US', 'isp': 'Example ISP'}
+
+
+class TestBatchJournal(unittest.TestCase):
+    """Test cases for the resumable batch journal"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'journal.db')
+
+    def test_rerun_skips_completed(self):
+        """A rerun of the same job only looks up what is missing"""
+        with BatchJournal(self.path, 'job-1') as journal:
+            journal.record('8.8.8.8', ok('8.8.8.8'))
+            journal.record('bad', {'error': 'invalid_ip', 'message': 'Invalid IP address format'})
+
+        lookup = MagicMock(side_effect=ok)
+        with BatchJournal(self.path, 'job-1') as journal:
+            results = run_journaled(['8.8.8.8', 'bad', '1.1.1.1'], journal, lookup=lookup)
+        lookup.assert_called_once_with('1.1.1.1')
+        self.assertEqual(list(results), ['8.8.8.8', 'bad', '1.1.1.1'])
+
+    def test_api_failures_are_retried(self):
+        with BatchJournal(self.path, 'job-1') as journal:
+            journal.record('8.8.8.8', {'error': 'api_failed', 'message': 'API request failed'})
+            journal.record('1.1.1.1', {'error': 'rate_limited', 'message': 'Daily API quota exhausted'})
+            self.assertEqual(journal.completed(), set())
+
+            lookup = MagicMock(side_effect=ok)
+            results = run_journaled(['8.8.8.8', '1.1.1.1'], journal, lookup=lookup)
+        self.assertEqual(lookup.call_count, 2)
+        self.assertEqual(final_summary(results)['step_status'], {'code': 0, 'message': 'success'})
+
+    def test_jobs_are_separate(self):
+        with BatchJournal(self.path, 'job-1') as journal:
+            journal.record('8.8.8.8', ok('8.8.8.8'))
+        with BatchJournal(self.path, 'job-2') as journal:
+            self.assertEqual(journal.results(), {})
+            self.assertEqual(list(journal.pending(['8.8.8.8'])), ['8.8.8.8'])
+
+    def test_interrupted_run_keeps_finished_results(self):
+        """Results recorded before a crash survive it"""
+        def lookup(ip):
+            if ip == '9.9.9.9':
+                raise KeyboardInterrupt
+            return ok(ip)
+
+        journal = BatchJournal(self.path, 'job-1', commit_every=1)
+        with self.assertRaises(KeyboardInterrupt):
+            run_journaled(['8.8.8.8', '1.1.1.1', '9.9.9.9'], journal, lookup=lookup)
+        journal.close()
+
+        with BatchJournal(self.path, 'job-1') as journal:
+            self.assertEqual(journal.completed(), {'8.8.8.8', '1.1.1.1'})
+
+    def test_ndjson_resume_summarises_whole_job(self):
+        """A resumed NDJSON run streams only new results but closes with the job's totals"""
+        ips = [f'198.51.100.{i}' for i in range(10)]
+        with BatchJournal(self.path, 'job-1') as journal:
+            for ip in ips[:4]:
+                journal.record(ip, ok(ip))
+        lookup = MagicMock(side_effect=ok)
+        out = io.StringIO()
+        with BatchJournal(self.path, 'job-1') as journal:
+            write_ndjson(batch_stream(ips, lookup=lookup, journal=journal), out, journal)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([line['ip'] for line in lines[:-1]], ips[4:])
+        self.assertEqual(lines[-1]['api_object']['summary']['total'], 10)
+        self.assertEqual(lookup.call_count, 6)
+
+    def test_journal_from_env(self):
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(journal_from_env())
+        with patch.dict(os.environ, {'BATCH_JOB_ID': 'nightly', 'BATCH_JOURNAL_PATH': self.path}):
+            journal = journal_from_env()
+        self.assertEqual((journal.job_id, journal.path), ('nightly', self.path))
+        journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
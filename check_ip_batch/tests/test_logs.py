@@ -0,0 +1,83 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+from check_ip_batch.logs import chunk_bounds, extract_ips, log_ip_addresses
+from check_ip_batch.main import input_ip_addresses, batch_stream
+from check_ip_batch.scheduler import DeferredQueue
+
+LOG = (
+    '203.0.113.7 - - [10/Oct/2024:13:55:36 +0000] "GET /wp-login.php HTTP/1.1" 404 153 "-" "curl/8.1.2"\n'
+    'Oct 10 13:55:40 host sshd[811]: Failed password for root from 2001:DB8::1 port 52144 ssh2\n'
+    'Oct 10 13:55:41 host sshd[811]: Failed password for root from 2001:db8:0:0::1 port 52145 ssh2\n'
+    '198.51.100.23 - - [10/Oct/2024:13:55:42 +0000] "GET / HTTP/1.1" 200 612 "-" "Mozilla/5.0"\n'
+    'Oct 10 13:55:43 host sshd[812]: Connection closed by 192.0.2.9.\n'
+    'upstream: [::ffff:203.0.113.7]:443 client 203.0.113.7:51234, build v1.2.3.4 std::vector 999.1.1.1 de:ad:be:ef:00:01\n'
+)
+
+
+class TestLogs(unittest.TestCase):
+    """Test cases for extracting IP addresses from raw log files"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as handle:
+            handle.write(content)
+        return path
+
+    def test_extract_counts_canonical_addresses(self):
+        counts = extract_ips([self.write('access.log', LOG)])
+        self.assertEqual(dict(counts), {'203.0.113.7': 3, '2001:db8::1': 2, '198.51.100.23': 1,
+                                        '192.0.2.9': 1})
+
+    def test_short_and_scoped_ipv6(self):
+        path = self.write('ipv6.log', 'from ::1 port 22\nfrom fe80::1 and fe80::2%eth0 :: std::vector 1.5 10:30\n')
+        self.assertEqual(dict(extract_ips([path])), {'::1': 1, 'fe80::1': 1, 'fe80::2%eth0': 1})
+
+    def test_chunks_end_on_line_breaks(self):
+        path = self.write('access.log', LOG * 3)
+        bounds = chunk_bounds(path, 100)
+        self.assertGreater(len(bounds), 1)
+        self.assertEqual(bounds[0][0], 0)
+        self.assertEqual(bounds[-1][1], os.path.getsize(path))
+        with open(path, 'rb') as handle:
+            data = handle.read()
+        for (_, end), (start, _) in zip(bounds, bounds[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[end - 1:end], b'\n')
+
+    def test_small_chunks_and_processes_match_single_scan(self):
+        paths = [self.write('a.log', LOG * 20), self.write('b.log', LOG), self.write('empty.log', '')]
+        expected = extract_ips(paths, workers=1)
+        self.assertEqual(extract_ips(paths, workers=2, chunk_size=256), expected)
+        self.assertEqual(expected['203.0.113.7'], 63)
+
+    def test_most_frequent_first(self):
+        path = self.write('access.log', LOG)
+        addresses = log_ip_addresses([path])
+        self.assertEqual(list(addresses), ['203.0.113.7', '2001:db8::1', '198.51.100.23', '192.0.2.9'])
+        self.assertEqual(addresses['203.0.113.7'], 3)
+
+    def test_counts_become_deferral_priorities(self):
+        """With quota-aware scheduling, log counts are the priorities lookups are parked with"""
+        addresses = log_ip_addresses([self.write('access.log', LOG)])
+        limited = {'error': 'rate_limited', 'message': 'Daily API quota exhausted'}
+        with DeferredQueue(os.path.join(self.tmp.name, 'deferred.db')) as deferred:
+            self.assertEqual(list(batch_stream(addresses, lookup=lambda ip: limited, deferred=deferred)), [])
+            self.assertEqual(deferred.items(), [('203.0.113.7', 3), ('2001:db8::1', 2),
+                                                ('198.51.100.23', 1), ('192.0.2.9', 1)])
+
+    def test_batch_input_from_env(self):
+        first = self.write('a.log', '198.51.100.23 GET /\n')
+        second = self.write('b.log', LOG)
+        with patch.dict(os.environ, {'IP_INPUT_LOGS': f'{first}, {second}'}, clear=True):
+            self.assertEqual(list(input_ip_addresses()), ['203.0.113.7', '198.51.100.23', '2001:db8::1',
+                                                          '192.0.2.9'])
+
+
+if __name__ == '__main__':
+    unittest.main()
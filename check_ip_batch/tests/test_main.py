@@ -1,13 +1,29 @@
 import unittest
-from unittest.mock import patch
+import os
+import io
+import json
+import asyncio
+import threading
+from unittest.mock import patch, MagicMock
+from abuseipdb.blacklist import Blacklist
+from abuseipdb.blocklist_index import BlocklistIndex
 from check_ip_batch.main import ( 
     separate_ip_addresses, 
     make_requests, 
+    canonical_spellings,
+    iter_results,
+    iter_results_async,
+    input_ip_addresses,
+    block_lookup,
+    screened_lookup,
+    indexed_lookup,
     api_object_summary, 
     batch_status_code_message, 
     results_summary, 
     error_summary, 
-    final_summary
+    final_summary,
+    BatchAggregator,
+    write_ndjson,
 )
 
 class TestMainFunctions(unittest.TestCase):
@@ -26,19 +42,235 @@ class TestMainFunctions(unittest.TestCase):
         result = separate_ip_addresses()
         self.assertEqual(result, [])
 
-    @patch('check_ip_batch.main.time.sleep')
     @patch('check_ip_batch.main.make_ip_check_request')
-    def test_make_requests(self, mock_make_request, mock_sleep):
+    def test_make_requests(self, mock_make_request):
         """
         Verify request dispatch maps IP -> result using a mocked API call.
-        Rate limiting (time.sleep) is mocked to keep tests fast.
+        Rate limiting lives in the API layer, so no fixed delay is added here.
         """
         mock_make_request.return_value = {'abuseConfidenceScore': 50}
         result = make_requests(['192.168.1.1', '10.0.0.1'])
         self.assertEqual(result['192.168.1.1']['abuseConfidenceScore'], 50)
         self.assertEqual(result['10.0.0.1']['abuseConfidenceScore'], 50)
-        # Verify sleep was called once between 2 requests (rate limiting)
-        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertEqual(mock_make_request.call_count, 2)
+
+    @patch('check_ip_batch.main.make_ip_check_request')
+    def test_make_requests_thread_pool(self, mock_make_request):
+        """
+        Concurrent mode returns the same IP -> result mapping, in input order.
+        """
+        mock_make_request.side_effect = lambda ip: {'ipAddress': ip}
+        ips = ['192.168.1.%d' % i for i in range(20)]
+        result = make_requests(ips, workers=8)
+        self.assertEqual(list(result), ips)
+        self.assertEqual(result['192.168.1.7']['ipAddress'], '192.168.1.7')
+        self.assertEqual(mock_make_request.call_count, 20)
+
+    @patch('check_ip_batch.main.make_ip_check_request')
+    def test_make_requests_asyncio(self, mock_make_request):
+        """
+        The asyncio mode produces the same mapping as the thread pool.
+        """
+        mock_make_request.side_effect = lambda ip: {'ipAddress': ip}
+        ips = ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+        result = make_requests(ips, workers=2, mode='asyncio')
+        self.assertEqual(list(result), ips)
+        self.assertEqual(result['10.0.0.2'], {'ipAddress': '10.0.0.2'})
+
+    def test_iter_results_async_consumes_lazily(self):
+        """
+        The asyncio mode streams results from a generator input, looking up
+        each address once for all its spellings.
+        """
+        consumed = []
+
+        def source():
+            for i in range(100):
+                consumed.append(i)
+                yield '10.0.0.%d' % i
+                yield '::ffff:10.0.0.%d' % i
+
+        lookup = MagicMock(side_effect=lambda ip: {'ipAddress': ip})
+
+        async def consume():
+            stream = iter_results_async(source(), 4, lookup=lookup)
+            first = await stream.__anext__()
+            read = len(consumed)
+            return first, read, [pair async for pair in stream]
+
+        first, read, rest = asyncio.run(consume())
+        self.assertEqual(first, ('10.0.0.0', {'ipAddress': '10.0.0.0'}))
+        self.assertLess(read, 100)
+        self.assertEqual(len(rest), 199)
+        self.assertEqual(lookup.call_count, 100)
+        result = make_requests((ip for ip in ['10.0.0.1', '::ffff:10.0.0.1', '10.0.0.2']), workers=2,
+                               mode='asyncio', lookup=lambda ip: {'ipAddress': ip})
+        self.assertEqual(list(result), ['10.0.0.1', '::ffff:10.0.0.1', '10.0.0.2'])
+
+    def test_make_requests_custom_lookup(self):
+        """
+        A client's bound check method can replace make_ip_check_request.
+        """
+        result = make_requests(['10.0.0.1', '10.0.0.2'], workers=2, lookup=lambda ip: {'ip': ip})
+        self.assertEqual(result['10.0.0.2'], {'ip': '10.0.0.2'})
+
+    @patch('check_ip_batch.main.make_ip_check_request')
+    def test_make_requests_deduplicates(self, mock_make_request):
+        """
+        Spelling variants of one address cost a single lookup, and the result
+        is fanned back out to every original spelling, errors included.
+        """
+        mock_make_request.side_effect = lambda ip: (
+            {'ipAddress': ip} if ip != 'bad' else {'error': 'invalid_ip', 'message': 'Invalid'})
+        ips = ['1.2.3.4', '::ffff:1.2.3.4', '2001:db8::1', '2001:0db8::0001', 'bad', '1.2.3.4']
+        result = make_requests(ips, workers=4)
+        self.assertEqual(mock_make_request.call_count, 3)
+        self.assertEqual(list(result), ['1.2.3.4', '::ffff:1.2.3.4', '2001:db8::1', '2001:0db8::0001', 'bad'])
+        self.assertEqual(result['::ffff:1.2.3.4'], {'ipAddress': '1.2.3.4'})
+        self.assertEqual(result['2001:0db8::0001'], {'ipAddress': '2001:db8::1'})
+        self.assertEqual(error_summary(result), {'bad': 'Invalid'})
+
+    def test_canonical_spellings(self):
+        spellings = canonical_spellings(['2001:DB8::1', '::ffff:10.0.0.1', 'nope'])
+        self.assertEqual(spellings, {'2001:DB8::1': '2001:db8::1', '::ffff:10.0.0.1': '10.0.0.1', 'nope': 'nope'})
+
+    def test_iter_results_consumes_lazily(self):
+        """
+        Results stream out while the input generator is still being read.
+        """
+        consumed = []
+
+        def source():
+            for i in range(100):
+                consumed.append(i)
+                yield '10.0.0.%d' % i
+
+        for workers in (1, 4):
+            consumed.clear()
+            stream = iter_results(source(), workers=workers, lookup=lambda ip: {'ipAddress': ip})
+            self.assertEqual(next(stream), ('10.0.0.0', {'ipAddress': '10.0.0.0'}))
+            self.assertLess(len(consumed), 100)
+            self.assertEqual(len(list(stream)), 99)
+
+    def test_iter_results_unordered(self):
+        """
+        Unordered mode yields a fast lookup before a slow one started earlier,
+        and still fans results out to every spelling.
+        """
+        release = threading.Event()
+
+        def lookup(ip):
+            if ip == '10.0.0.1':
+                release.wait(5)
+            return {'ipAddress': ip}
+
+        stream = iter_results(['10.0.0.1', '10.0.0.2', '::ffff:10.0.0.2'], workers=2,
+                              lookup=lookup, window=2, ordered=False)
+        first = next(stream)
+        release.set()
+        rest = list(stream)
+        self.assertEqual(first, ('10.0.0.2', {'ipAddress': '10.0.0.2'}))
+        self.assertEqual(sorted(ip for ip, _ in rest), ['10.0.0.1', '::ffff:10.0.0.2'])
+
+    def test_iter_results_keeps_compact_rows_for_spellings(self):
+        """
+        Only the first spelling of an address gets the full payload; later ones,
+        after it has been yielded, get its compact row.
+        """
+        def lookup(ip):
+            return {'ipAddress': ip, 'abuseConfidenceScore': 80, 'totalReports': 2, 'countryCode': 'US',
+                    'isp': 'Example ISP', 'hostnames': ['x' * 1000]}
+
+        ips = ['10.0.0.%d' % i for i in range(10)] + ['::ffff:10.0.0.1']
+        for workers in (1, 4):
+            results = dict(iter_results(ips, workers=workers, lookup=lookup, window=4))
+            self.assertIn('hostnames', results['10.0.0.1'])
+            self.assertEqual(results['::ffff:10.0.0.1'], {'abuseConfidenceScore': 80, 'totalReports': 2,
+                                                          'countryCode': 'US', 'isp': 'Example ISP'})
+
+    def test_input_ip_addresses_defaults_to_env(self):
+        """
+        Without IP_INPUT_FILE the batch comes from IP_ADDRESSES as before.
+        """
+        with patch.dict(os.environ, {'IP_ADDRESSES': '1.1.1.1'}):
+            os.environ.pop('IP_INPUT_FILE', None)
+            self.assertEqual(input_ip_addresses(), ['1.1.1.1'])
+
+    def test_make_requests_network_input(self):
+        """
+        A CIDR input costs one check-block request and yields a row for the
+        network plus one row per reported address.
+        """
+        check = MagicMock(return_value={'ipAddress': '8.8.8.8', 'abuseConfidenceScore': 0,
+                                        'totalReports': 0, 'countryCode': 'US', 'isp': 'Google'})
+        check_block = MagicMock(return_value={'networkAddress': '203.0.113.0', 'reportedAddress': [
+            {'ipAddress': '203.0.113.5', 'numReports': 3, 'mostRecentReport': '2024-01-01T00:00:00+00:00',
+             'abuseConfidenceScore': 80, 'countryCode': 'NL'},
+            {'ipAddress': '203.0.113.9', 'numReports': 1, 'mostRecentReport': '2024-01-01T00:00:00+00:00',
+             'abuseConfidenceScore': 10, 'countryCode': 'NL'},
+        ]})
+        result = make_requests(['203.0.113.0/24', '8.8.8.8'], lookup=block_lookup(check, check_block))
+        check_block.assert_called_once_with('203.0.113.0/24')
+        check.assert_called_once_with('8.8.8.8')
+        self.assertEqual(list(result), ['203.0.113.0/24', '203.0.113.5', '203.0.113.9', '8.8.8.8'])
+        self.assertEqual(result['203.0.113.0/24']['abuseConfidenceScore'], 80)
+        self.assertEqual(result['203.0.113.0/24']['totalReports'], 4)
+        self.assertEqual(result['203.0.113.5']['countryCode'], 'NL')
+        summary = final_summary(result)
+        self.assertEqual(summary['api_object']['summary']['total'], 4)
+
+    def test_block_lookup_counts_explicit_address_once(self):
+        """
+        An address given explicitly and reported inside a network is one row
+        in every output format, so the JSON and NDJSON totals agree.
+        """
+        check = MagicMock(side_effect=lambda ip: {'ipAddress': ip, 'abuseConfidenceScore': 0,
+                                                        'totalReports': 0, 'countryCode': 'US', 'isp': 'Example'})
+        check_block = MagicMock(return_value={'networkAddress': '203.0.113.0', 'reportedAddress': [
+            {'ipAddress': '203.0.113.9', 'numReports': 1, 'abuseConfidenceScore': 10, 'countryCode': 'NL'},
+            {'ipAddress': '203.0.113.10', 'numReports': 2, 'abuseConfidenceScore': 20, 'countryCode': 'NL'},
+        ]})
+        ips = ['203.0.113.9', '203.0.113.0/24', '8.8.8.8', '203.0.113.10']
+        result = make_requests(ips, lookup=block_lookup(check, check_block))
+        out = io.StringIO()
+        write_ndjson(iter_results(ips, lookup=block_lookup(check, check_block)), out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        streamed = [line['ip'] for line in lines[:-1]]
+        self.assertEqual(sorted(streamed), sorted(result))
+        self.assertEqual(len(streamed), len(set(streamed)))
+        self.assertEqual(lines[-1]['api_object']['summary'],
+                         final_summary(result)['api_object']['summary'])
+        self.assertEqual(lines[-1]['api_object']['summary']['total'], 4)
+
+    def test_make_requests_network_error(self):
+        check_block = MagicMock(return_value={'error': 'api_failed', 'message': 'API request failed'})
+        result = make_requests(['203.0.113.0/24'], lookup=block_lookup(MagicMock(), check_block))
+        self.assertEqual(result, {'203.0.113.0/24': {'error': 'api_failed', 'message': 'API request failed'}})
+
+    def test_screened_lookup_skips_blacklisted(self):
+        """
+        Addresses on the local blacklist are answered without a per-IP check.
+        """
+        blacklist = Blacklist([{'ipAddress': '1.2.3.4', 'abuseConfidenceScore': 100, 'countryCode': 'CN'}])
+        check = MagicMock(return_value={'ipAddress': '8.8.8.8', 'abuseConfidenceScore': 0})
+        result = make_requests(['1.2.3.4', '8.8.8.8'], lookup=screened_lookup(check, blacklist))
+        check.assert_called_once_with('8.8.8.8')
+        self.assertEqual(result['1.2.3.4']['abuseConfidenceScore'], 100)
+
+    def test_indexed_lookup_skips_known_ranges(self):
+        """
+        Addresses inside an offline index range need no API call.
+        """
+        index = BlocklistIndex.build([('203.0.113.0/24', 90)])
+        check = MagicMock(return_value={'ipAddress': '8.8.8.8'})
+        result = make_requests(['203.0.113.7', '8.8.8.8'], lookup=indexed_lookup(check, index))
+        check.assert_called_once_with('8.8.8.8')
+        self.assertEqual(result['203.0.113.7']['abuseConfidenceScore'], 90)
+        self.assertEqual(result['203.0.113.7']['source'], 'blocklist_index')
+
+    def test_make_requests_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            make_requests(['10.0.0.1'], workers=2, mode='fork')
 
     @patch('check_ip_batch.main.calculate_risk_level')
     def test_api_object_summary(self, mock_risk_level):
@@ -118,5 +350,69 @@ class TestMainFunctions(unittest.TestCase):
         self.assertIn('api_object', summary)
         self.assertIn('results', summary['api_object'])
 
+
+class TestNdjsonOutput(unittest.TestCase):
+
+    RESULTS = {
+        '192.168.1.1': {'abuseConfidenceScore': 90, 'totalReports': 5, 'countryCode': 'US', 'isp': 'ISP1'},
+        '10.0.0.1': {'abuseConfidenceScore': 20, 'totalReports': 2, 'countryCode': 'CA', 'isp': 'ISP2'},
+        '8.8.8.8': {'error': 'api_failed', 'message': 'API request failed'},
+        'bad': {'error': 'invalid_ip', 'message': 'Invalid IP address format'},
+    }
+
+    @patch.dict(os.environ, {'CONFIDENCE_THRESHOLD': '70'})
+    def test_aggregator_matches_scanning_functions(self):
+        """
+        Incremental counters agree with the functions that re-scan the dict.
+        """
+        aggregator = BatchAggregator()
+        for ip, result in self.RESULTS.items():
+            aggregator.add(ip, result)
+        self.assertEqual(aggregator.summary(), api_object_summary(self.RESULTS))
+        self.assertEqual(aggregator.step_status(), batch_status_code_message(self.RESULTS))
+        self.assertEqual(BatchAggregator().step_status(), (1, 'failed'))
+
+    @patch.dict(os.environ, {'CONFIDENCE_THRESHOLD': '70'})
+    def test_final_summary_matches_multi_pass(self):
+        """
+        The single-pass final_summary builds the same document as the
+        individual summary functions.
+        """
+        summary = final_summary(self.RESULTS)
+        self.assertEqual(summary['step_status'], {'code': 0, 'message': 'partial_success'})
+        self.assertEqual(summary['api_object']['summary'], api_object_summary(self.RESULTS))
+        self.assertEqual(summary['api_object']['results'], results_summary(self.RESULTS))
+        self.assertEqual(summary['api_object']['errors'], error_summary(self.RESULTS))
+        self.assertEqual(list(summary['api_object']), ['summary', 'results', 'errors'])
+
+    def test_aggregator_reads_threshold_once(self):
+        """
+        The confidence threshold is resolved when the aggregator is created.
+        """
+        with patch('check_ip_batch.main.confidence_threshold', return_value=95) as mock_threshold:
+            aggregator = BatchAggregator(keep_results=True)
+            for ip, result in self.RESULTS.items():
+                aggregator.add(ip, result)
+        self.assertEqual(mock_threshold.call_count, 1)
+        self.assertEqual(aggregator.results['192.168.1.1']['risk_level'], 'MEDIUM')
+
+    @patch.dict(os.environ, {'CONFIDENCE_THRESHOLD': '70'})
+    def test_write_ndjson(self):
+        """
+        One compact line per IP in arrival order, summary record last.
+        """
+        out = io.StringIO()
+        write_ndjson(iter(self.RESULTS.items()), out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertNotIn(' ', lines[0])
+        first = json.loads(lines[0])
+        self.assertEqual(first['ip'], '192.168.1.1')
+        self.assertEqual(first['result']['risk_level'], 'HIGH')
+        self.assertEqual(json.loads(lines[2]), {'ip': '8.8.8.8', 'error': 'API request failed'})
+        closing = json.loads(lines[-1])
+        self.assertEqual(closing['step_status'], {'code': 0, 'message': 'partial_success'})
+        self.assertEqual(closing['api_object']['summary']['failed'], 2)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+from check_ip_batch.scheduler import prioritize, DeferredQueue, schedule, deferred_from_env
+from check_ip_batch.main import batch_stream, iter_results
+from check_ip_batch.journal import BatchJournal
+
+QUOTA_EXHAUSTED = {'error': 'rate_limited', 'message': 'Daily API quota exhausted'}
+
+
+def quota_lookup(budget):
+    """Lookup that succeeds `budget` times and then reports the quota as spent."""
+    calls = []
+
+    def lookup(ip):
+        calls.append(ip)
+        if len(calls) > budget:
+            return dict(QUOTA_EXHAUSTED)
+        return {'ipAddress': ip, 'abuseConfidenceScore': 0, 'totalReports': 0,
+                'countryCode': 'US', 'isp': 'Example ISP'}
+    return lookup, calls
+
+
+class TestScheduler(unittest.TestCase):
+    """Test cases for priority ordering and quota deferral"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'deferred.db')
+
+    def test_prioritize_by_occurrences(self):
+        ips = ['1.1.1.1', '8.8.8.8', '::ffff:8.8.8.8', '9.9.9.9', '8.8.8.8', '9.9.9.9']
+        self.assertEqual(prioritize(ips), [('8.8.8.8', 3), ('::ffff:8.8.8.8', 3),
+                                           ('9.9.9.9', 2), ('1.1.1.1', 1)])
+
+    def test_prioritize_explicit(self):
+        ranked = prioritize(['1.1.1.1', '8.8.8.8', '8.8.8.8'], {'1.1.1.1': 10})
+        self.assertEqual([ip for ip, _ in ranked], ['1.1.1.1', '8.8.8.8'])
+
+    def test_exhausted_quota_defers_rest(self):
+        """Most frequent IPs are looked up first; the rest wait for the next window"""
+        lookup, calls = quota_lookup(budget=2)
+        ips = ['1.1.1.1', '8.8.8.8', '8.8.8.8', '9.9.9.9', '9.9.9.9', '9.9.9.9']
+        with DeferredQueue(self.path) as deferred:
+            results = dict(batch_stream(ips, lookup=lookup, deferred=deferred))
+            self.assertEqual(list(results), ['9.9.9.9', '8.8.8.8'])
+            self.assertEqual(deferred.items(), [('1.1.1.1', 1)])
+
+    def test_deferred_lookups_run_first_next_window(self):
+        with DeferredQueue(self.path) as deferred:
+            deferred.add('1.1.1.1', 5)
+        lookup, calls = quota_lookup(budget=10)
+        with DeferredQueue(self.path) as deferred:
+            results = dict(schedule(['8.8.8.8', '8.8.8.8'], deferred,
+                                    lambda ranked: iter_results(ranked, lookup=lookup)))
+            self.assertEqual(calls, ['1.1.1.1', '8.8.8.8'])
+            self.assertEqual(len(deferred), 0)
+        self.assertEqual(set(results), {'1.1.1.1', '8.8.8.8'})
+
+    def test_add_keeps_highest_priority(self):
+        with DeferredQueue(self.path) as deferred:
+            deferred.add('1.1.1.1', 5)
+            deferred.add('1.1.1.1', 2)
+            self.assertEqual(deferred.items(), [('1.1.1.1', 5)])
+
+    def test_deferred_not_journaled_as_final(self):
+        lookup, _ = quota_lookup(budget=0)
+        journal = BatchJournal(os.path.join(self.tmp.name, 'journal.db'), 'job')
+        with DeferredQueue(self.path) as deferred:
+            list(batch_stream(['8.8.8.8'], lookup=lookup, journal=journal, deferred=deferred))
+        self.assertEqual(journal.results(), {})
+        journal.close()
+
+    def test_deferred_from_env(self):
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(deferred_from_env())
+        with patch.dict(os.environ, {'BATCH_DEFERRED_PATH': self.path}):
+            deferred = deferred_from_env()
+        self.assertEqual(deferred.path, self.path)
+        deferred.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
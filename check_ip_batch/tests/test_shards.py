@@ -0,0 +1,105 @@
+import unittest
+import os
+import io
+import json
+import tempfile
+from unittest.mock import patch
+from check_ip_batch.shards import shard_of, select_shard, run_shard, run_sharded, merge_shards
+from check_ip_batch.main import make_requests, final_summary, run_shards, network_result
+from benchmarks.fake_server import FakeAbuseIPDB
+
+IPS = [f'198.51.100.{i}' for i in range(1, 21)] + ['::ffff:198.51.100.1', 'bad', '2001:db8::7']
+
+
+def fake_lookup(ip):
+    """Module-level, so shard processes can receive it."""
+    if ip == 'bad':
+        return {'error': 'invalid_ip', 'message': 'Invalid IP address format'}
+    return {'ipAddress': ip, 'abuseConfidenceScore': sum(map(ord, ip)) % 101,
+            'totalReports': 1, 'countryCode': 'US', 'isp': 'Example ISP'}
+
+
+def fake_block_lookup(ip):
+    """fake_lookup that also answers a check-block for 203.0.113.0/24."""
+    if ip == '203.0.113.0/24':
+        return network_result(ip, {'reportedAddress': [
+            {'ipAddress': '203.0.113.9', 'abuseConfidenceScore': 90, 'numReports': 3, 'countryCode': 'US'}]})
+    return fake_lookup(ip)
+
+
+class TestShards(unittest.TestCase):
+    """Test cases for sharded batch execution"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.directory = os.path.join(self.tmp.name, 'shards')
+
+    def test_shard_of_is_stable(self):
+        self.assertEqual(shard_of('198.51.100.1', 7), shard_of(' ::ffff:198.51.100.1', 7))
+        self.assertEqual([shard_of(ip, 4) for ip in ('1.1.1.1', '8.8.8.8', 'bad')], [3, 1, 3])
+
+    def test_shards_partition_the_input(self):
+        parts = [list(select_shard(IPS, shard, 3)) for shard in range(3)]
+        self.assertEqual(sorted(sum(parts, [])), sorted(IPS))
+        self.assertTrue(all(parts))
+
+    def test_run_sharded_matches_single_process(self):
+        expected = final_summary(make_requests(IPS, lookup=fake_lookup))
+        results = run_sharded(IPS, 3, self.directory, workers=2, lookup=fake_lookup)
+        self.assertEqual(final_summary(results), expected)
+        self.assertEqual(list(results), list(dict.fromkeys(IPS)))
+
+    def test_merge_keeps_network_expansions(self):
+        """Addresses reported in a check-block result survive the merge"""
+        ips = ['1.1.1.1', '203.0.113.0/24', '8.8.8.8']
+        expected = final_summary(make_requests(ips, lookup=fake_block_lookup))
+        results = run_sharded(ips, 2, self.directory, lookup=fake_block_lookup)
+        self.assertEqual(final_summary(results), expected)
+        self.assertEqual(list(results), ips + ['203.0.113.9'])
+
+    def test_shards_run_separately_then_merge(self):
+        """Shards run one at a time (as on separate machines) merge into the same document"""
+        for shard in range(3):
+            run_shard(IPS, shard, 3, self.directory, lookup=fake_lookup)
+        expected = final_summary(make_requests(IPS, lookup=fake_lookup))
+        self.assertEqual(final_summary(merge_shards(self.directory, 3)), expected)
+        out = io.StringIO()
+        run_shards([], 3, self.directory, merge=True, out=out)
+        self.assertEqual(json.loads(out.getvalue())['api_object']['summary'], expected['api_object']['summary'])
+
+    def test_merge_needs_every_shard(self):
+        run_shard(IPS, 0, 2, self.directory, lookup=fake_lookup)
+        with self.assertRaises(FileNotFoundError):
+            merge_shards(self.directory, 2)
+
+    def test_shared_quota_across_processes(self):
+        """Shard processes together spend no more than the daily quota"""
+        with FakeAbuseIPDB() as server:
+            env = {'ABUSEIPDB_API_KEY': 'test_key', 'ABUSEIPDB_BASE_URL': server.base_url,
+                   'ABUSEIPDB_DAILY_QUOTA': '5', 'ABUSEIPDB_RATE_LIMIT': '1000', 'ABUSEIPDB_CACHE_SIZE': '0',
+                   'ABUSEIPDB_MAX_RETRIES': '0', 'ABUSEIPDB_QUOTA_PATH': os.path.join(self.tmp.name, 'quota.db')}
+            with patch.dict(os.environ, env):
+                results = run_sharded(IPS[:20], 3, self.directory, workers=2)
+        summary = final_summary(results)['api_object']['summary']
+        self.assertEqual(summary['successful'], 5)
+        self.assertEqual(server.requests, 5)
+        self.assertEqual(set(final_summary(results)['api_object']['errors'].values()),
+                         {'Daily API quota exhausted'})
+
+    def test_shared_quota_defaults_to_shard_dir(self):
+        """Without ABUSEIPDB_QUOTA_PATH the shards share a quota file in their directory"""
+        with FakeAbuseIPDB() as server:
+            env = {'ABUSEIPDB_API_KEY': 'test_key', 'ABUSEIPDB_BASE_URL': server.base_url,
+                   'ABUSEIPDB_DAILY_QUOTA': '5', 'ABUSEIPDB_RATE_LIMIT': '1000', 'ABUSEIPDB_CACHE_SIZE': '0',
+                   'ABUSEIPDB_MAX_RETRIES': '0'}
+            with patch.dict(os.environ, env):
+                os.environ.pop('ABUSEIPDB_QUOTA_PATH', None)
+                results = run_sharded(IPS[:20], 3, self.directory, workers=2)
+        self.assertEqual(final_summary(results)['api_object']['summary']['successful'], 5)
+        self.assertEqual(server.requests, 5)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'quota.db')))
+
+
+if __name__ == '__main__':
+    unittest.main()
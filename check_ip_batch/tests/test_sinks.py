@@ -0,0 +1,129 @@
+import unittest
+import os
+import io
+import csv
+import json
+import sqlite3
+import tempfile
+import importlib.util
+from contextlib import redirect_stderr
+from unittest.mock import patch
+from check_ip_batch import sinks
+from check_ip_batch.sinks import CsvSink, SqliteSink, ParquetSink, COLUMNS
+from check_ip_batch.main import write_sink, parse_args
+
+RESULTS = [
+    ('118.25.6.39', {'ipAddress': '118.25.6.39', 'abuseConfidenceScore': 100, 'totalReports': 1203,
+                     'countryCode': 'CN', 'isp': 'Tencent Cloud', 'usageType': 'Data Center'}),
+    ('8.8.8.8', {'ipAddress': '8.8.8.8', 'abuseConfidenceScore': 0, 'totalReports': 0,
+                 'countryCode': 'US', 'isp': 'Google LLC'}),
+    ('bad', {'error': 'invalid_ip', 'message': 'Invalid IP address format'}),
+]
+SUMMARY = {'step_status': {'code': 0, 'message': 'success'},
+           'api_object': {'summary': {'total': 3, 'successful': 2, 'failed': 1,
+                                      'risk_counts': {'HIGH': 1, 'MEDIUM': 0, 'LOW': 1}}}}
+
+
+class TestSinks(unittest.TestCase):
+    """Test cases for the bulk batch output sinks"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_csv(self):
+        aggregator = write_sink(iter(RESULTS), CsvSink(self.path('out.csv')))
+        self.assertEqual(aggregator.summary_document(), SUMMARY)
+        with open(self.path('out.csv'), newline='') as handle:
+            rows = list(csv.reader(handle))
+        self.assertEqual(rows[0], list(COLUMNS))
+        self.assertEqual(rows[1], ['118.25.6.39', 'HIGH', '100', '1203', 'CN', 'Tencent Cloud', ''])
+        self.assertEqual(rows[3], ['bad', '', '', '', '', '', 'Invalid IP address format'])
+        with open(self.path('out.csv.summary.json')) as handle:
+            self.assertEqual(json.load(handle), SUMMARY)
+
+    def test_sqlite_batches_and_summary(self):
+        with patch.object(sinks, 'BATCH_ROWS', 2):
+            write_sink(iter(RESULTS), SqliteSink(self.path('out.db')))
+        db = sqlite3.connect(self.path('out.db'))
+        rows = db.execute('SELECT ip, risk_level, total_reports, error FROM results ORDER BY rowid').fetchall()
+        self.assertEqual(rows, [('118.25.6.39', 'HIGH', 1203, None), ('8.8.8.8', 'LOW', 0, None),
+                                ('bad', None, None, 'Invalid IP address format')])
+        self.assertEqual(json.loads(db.execute('SELECT document FROM summary').fetchone()[0]), SUMMARY)
+        db.close()
+
+    def test_sqlite_replaces_previous_output(self):
+        write_sink(iter(RESULTS), SqliteSink(self.path('out.db')))
+        write_sink(iter(RESULTS[:1]), SqliteSink(self.path('out.db'), overwrite=True))
+        db = sqlite3.connect(self.path('out.db'))
+        self.assertEqual(db.execute('SELECT COUNT(*) FROM results').fetchone()[0], 1)
+        db.close()
+
+    def test_sqlite_keeps_existing_tables(self):
+        """Without overwrite, a database that already has a results table is left alone"""
+        db = sqlite3.connect(self.path('out.db'))
+        db.execute('CREATE TABLE results (note TEXT)')
+        db.execute("INSERT INTO results VALUES ('keep me')")
+        db.execute('CREATE TABLE other (n INTEGER)')
+        db.commit()
+        db.close()
+        with self.assertRaises(FileExistsError):
+            SqliteSink(self.path('out.db'))
+        db = sqlite3.connect(self.path('out.db'))
+        self.assertEqual(db.execute('SELECT note FROM results').fetchall(), [('keep me',)])
+        db.close()
+        self.assertEqual(SqliteSink.existing_tables(self.path('missing.db')), [])
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_parquet(self):
+        import pyarrow.parquet
+        write_sink(iter(RESULTS), ParquetSink(self.path('out.parquet')))
+        table = pyarrow.parquet.read_table(self.path('out.parquet'))
+        self.assertEqual(table.column('ip').to_pylist(), ['118.25.6.39', '8.8.8.8', 'bad'])
+        metadata = pyarrow.parquet.read_metadata(self.path('out.parquet')).metadata
+        self.assertEqual(json.loads(metadata[b'summary']), SUMMARY)
+
+    def test_parquet_needs_pyarrow(self):
+        with patch.object(sinks, '_import_pyarrow', return_value=None):
+            with self.assertRaises(RuntimeError):
+                ParquetSink(self.path('out.parquet'))
+
+
+class TestParseArgs(unittest.TestCase):
+    """Test cases for the batch command-line options"""
+
+    def test_defaults_from_env(self):
+        with patch.dict(os.environ, {'OUTPUT_FORMAT': 'ndjson'}):
+            self.assertEqual(parse_args([]).format, 'ndjson')
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(parse_args([]).format, 'json')
+
+    def test_sink_needs_output(self):
+        with patch.dict(os.environ, {}, clear=True), redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                parse_args(['--format', 'csv'])
+        args = parse_args(['--format', 'sqlite', '--output', 'results.db'])
+        self.assertEqual((args.format, args.output), ('sqlite', 'results.db'))
+
+    def test_sqlite_output_needs_overwrite(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'results.db')
+            write_sink(iter(RESULTS), SqliteSink(path))
+            with patch.dict(os.environ, {}, clear=True):
+                with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                    parse_args(['--format', 'sqlite', '--output', path])
+                self.assertTrue(parse_args(['--format', 'sqlite', '--output', path, '--overwrite']).overwrite)
+
+    def test_parquet_needs_pyarrow_up_front(self):
+        """Without pyarrow, --format parquet is refused before any lookup runs"""
+        with patch('importlib.util.find_spec', return_value=None), redirect_stderr(io.StringIO()) as err:
+            with self.assertRaises(SystemExit):
+                parse_args(['--format', 'parquet', '--output', 'results.parquet'])
+        self.assertIn('needs pyarrow', err.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from check_ip_batch.store import ResultStore
+from check_ip_batch.main import final_summary, make_requests
+
+
+def full_result(ip, score, isp='Example ISP'):
+    return {'ipAddress': ip, 'isPublic': True, 'abuseConfidenceScore': score, 'countryCode': 'US',
+            'usageType': 'Data Center/Web Hosting/Transit', 'isp': isp, 'domain': 'example.com',
+            'hostnames': [], 'totalReports': 12, 'numDistinctUsers': 3,
+            'lastReportedAt': '2024-01-01T00:00:00+00:00'}
+
+
+class TestResultStore(unittest.TestCase):
+    """Test cases for the compact columnar ResultStore"""
+
+    def setUp(self):
+        self.results = {
+            '8.8.8.8': full_result('8.8.8.8', 0),
+            '118.25.6.39': full_result('118.25.6.39', 100, 'Tencent Cloud'),
+            'bad': {'error': 'invalid_ip', 'message': 'Invalid IP address format'},
+            '203.0.113.9': {'ipAddress': '203.0.113.9', 'abuseConfidenceScore': 90, 'totalReports': None,
+                            'countryCode': None, 'isp': None, 'source': 'blacklist'},
+        }
+        self.store = ResultStore(self.results.items())
+
+    def test_keeps_only_summary_fields(self):
+        self.assertEqual(self.store['118.25.6.39'], {'abuseConfidenceScore': 100, 'totalReports': 12,
+                                                     'countryCode': 'US', 'isp': 'Tencent Cloud'})
+        self.assertEqual(self.store['bad'], {'error': 'invalid_ip', 'message': 'Invalid IP address format'})
+        self.assertIsNone(self.store['203.0.113.9']['totalReports'])
+
+    def test_mapping_interface(self):
+        self.assertEqual(list(self.store), list(self.results))
+        self.assertEqual(len(self.store), 4)
+        self.assertIn('8.8.8.8', self.store)
+        self.assertNotIn('1.1.1.1', self.store)
+        self.assertNotIn(42, self.store)
+        self.assertEqual(self.store.get('1.1.1.1'), None)
+        with self.assertRaises(KeyError):
+            self.store['1.1.1.1']
+
+    def test_summary_matches_full_results(self):
+        self.assertEqual(final_summary(self.store), final_summary(self.results))
+
+    def test_adding_again_replaces(self):
+        self.store.add('8.8.8.8', {'error': 'api_failed', 'message': 'API request failed'})
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(self.store['8.8.8.8']['error'], 'api_failed')
+
+    def test_strings_are_interned(self):
+        store = ResultStore((f'10.0.0.{i}', full_result(f'10.0.0.{i}', i % 101)) for i in range(200))
+        self.assertEqual(len(store), 200)
+        self.assertEqual(store['10.0.0.150']['abuseConfidenceScore'], 49)
+        self.assertEqual(len(store._strings), 3)
+
+    def test_make_requests_into_store(self):
+        store = make_requests(['8.8.8.8', '1.1.1.1'], lookup=lambda ip: full_result(ip, 5), store=ResultStore())
+        self.assertIsInstance(store, ResultStore)
+        self.assertEqual(list(store), ['8.8.8.8', '1.1.1.1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import os
+import json
+import asyncio
+from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
+from abuseipdb.cache import cache_from_env
+from abuseipdb.api_call import AbuseIPDBClient
+from abuseipdb.refresh import refresher_from_env
+from abuseipdb.metrics import get_metrics
+from abuseipdb.rate_limit import get_rate_limiter
+from check_ip.main import build_result
+from check_ip_batch.main import make_requests, final_summary, build_lookup
+from check_ip_batch.store import ResultStore
+
+MAX_HEADER_LINES = 100
+MAX_BODY_BYTES = 10 * 1024 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 502: "Bad Gateway"}
+# step_status code -> HTTP status
+HTTP_STATUS = {0: 200, 1: 400, 2: 502}
+
+
+class ReputationService:
+    """
+    Resident HTTP front end for IP reputation lookups.
+
+    GET /check/{ip} answers with the check_ip build_result document and
+    POST /batch (a JSON list of IPs, or {"ips": [...]}) with the
+    check_ip_batch final_summary document. GET /metrics returns the lookup
+    metrics in Prometheus text format, with quota and cache gauges read from
+    `limiter` and `cache`. Connections are kept alive, and lookups run on a
+    shared thread pool so the client's connection pool and cache stay warm
+    between requests.
+    """
+
+    def __init__(self, lookup, batch_lookup=None, workers=32, cache=None, limiter=None):
+        self.lookup = lookup
+        self.batch_lookup = batch_lookup or lookup
+        self.workers = workers
+        self.cache = cache
+        self.limiter = limiter
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    async def handle(self, method, path, body):
+        """
+        Routes one request and returns (HTTP status, payload): a JSON-serializable
+        object, or a str sent as plain text.
+        """
+        loop = asyncio.get_running_loop()
+        if path.startswith("/check/"):
+            if method != "GET":
+                return 405, {"error": "method not allowed"}
+            ip = unquote(path[len("/check/"):])
+            data = await loop.run_in_executor(self.executor, self.lookup, ip)
+            result = build_result(data)
+            return HTTP_STATUS[result["step_status"]["code"]], result
+        if path == "/batch":
+            if method != "POST":
+                return 405, {"error": "method not allowed"}
+            try:
+                payload = json.loads(body or b"null")
+            except ValueError:
+                return 400, {"error": "body is not valid JSON"}
+            ips = payload.get("ips") if isinstance(payload, dict) else payload
+            if not isinstance(ips, list) or not all(isinstance(ip, str) for ip in ips):
+                return 400, {"error": "expected a JSON list of IP strings"}
+            results = await loop.run_in_executor(
+                self.executor, lambda: make_requests(ips, self.workers, lookup=self.batch_lookup,
+                                                     store=ResultStore()))
+            summary = final_summary(results)
+            return HTTP_STATUS[summary["step_status"]["code"]], summary
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/metrics":
+            if method != "GET":
+                return 405, {"error": "method not allowed"}
+            return 200, get_metrics().render(self.cache, self.limiter)
+        return 404, {"error": "not found"}
+
+    async def handle_connection(self, reader, writer):
+        """Serves HTTP/1.1 requests on one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request line"}, False)
+                    break
+
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "invalid content-length"}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                try:
+                    status, payload = await self.handle(method, target.split("?", 1)[0], body)
+                except Exception:
+                    status, payload = 500, {"error": "internal error"}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def start(self, host="0.0.0.0", port=8080):
+        """Starts listening and returns the asyncio server."""
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+async def serve(service, host, port):
+    server = await service.start(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def run(host="0.0.0.0", port=8080, workers=32, cache=None):
+    """Serves until interrupted, with a proactive cache refresher when configured."""
+    with AbuseIPDBClient(pool_size=workers, cache=cache) as client:
+        service = ReputationService(client.check, build_lookup(client), workers,
+                                    client.cache, client.limiter or get_rate_limiter())
+        refresher = refresher_from_env(client)
+        if refresher is not None:
+            refresher.start()
+        try:
+            asyncio.run(serve(service, host, port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if refresher is not None:
+                refresher.stop()
+            service.close()
+
+
+if __name__ == "__main__":
+    run(os.getenv("SERVICE_HOST", "0.0.0.0"), int(os.getenv("SERVICE_PORT", 8080)),
+        int(os.getenv("SERVICE_WORKERS", 32)), cache_from_env())
@@ -0,0 +1,120 @@
+import unittest
+import os
+import json
+import asyncio
+from unittest.mock import patch, MagicMock
+from check_ip_service.main import ReputationService
+
+GOOD = {
+    'ipAddress': '118.25.6.39',
+    'abuseConfidenceScore': 85,
+    'totalReports': 10,
+    'countryCode': 'CN',
+    'isp': 'Tencent',
+    'isPublic': True
+}
+
+
+def fake_lookup(ip):
+    if ip == 'bad':
+        return {'error': 'invalid_ip', 'message': 'Invalid IP address format'}
+    return dict(GOOD, ipAddress=ip)
+
+
+class TestReputationService(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the resident HTTP service"""
+
+    async def asyncSetUp(self):
+        self.lookup = MagicMock(side_effect=fake_lookup)
+        self.service = ReputationService(self.lookup, workers=4)
+        self.server = await self.service.start('127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+        self.service.close()
+
+    async def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else b''
+        self.writer.write(
+            f'{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(data)}\r\n\r\n'.encode() + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode().partition(':')
+            headers[name.lower()] = value.strip()
+        payload = await self.reader.readexactly(int(headers['content-length']))
+        if headers['content-type'].startswith('text/plain'):
+            return status, payload.decode()
+        return status, json.loads(payload)
+
+    async def test_check(self):
+        """GET /check/{ip} returns the check_ip build_result document"""
+        with patch.dict(os.environ, {'CONFIDENCE_THRESHOLD': '70'}):
+            status, result = await self.request('GET', '/check/118.25.6.39')
+        self.assertEqual(status, 200)
+        self.assertEqual(result['step_status'], {'code': 0, 'message': 'success'})
+        self.assertEqual(result['api_object']['risk_level'], 'HIGH')
+        self.lookup.assert_called_once_with('118.25.6.39')
+
+    async def test_check_invalid_ip(self):
+        status, result = await self.request('GET', '/check/bad')
+        self.assertEqual(status, 400)
+        self.assertEqual(result['step_status']['code'], 1)
+
+    async def test_keep_alive(self):
+        """Several requests are served over one connection"""
+        for ip in ('1.1.1.1', '8.8.8.8', '9.9.9.9'):
+            status, result = await self.request('GET', f'/check/{ip}')
+            self.assertEqual(result['api_object']['ip'], ip)
+        self.assertEqual(self.lookup.call_count, 3)
+
+    async def test_batch(self):
+        """POST /batch returns the check_ip_batch final_summary document"""
+        status, summary = await self.request('POST', '/batch', {'ips': ['1.1.1.1', '::ffff:1.1.1.1', 'bad']})
+        self.assertEqual(status, 200)
+        self.assertEqual(summary['api_object']['summary']['total'], 3)
+        self.assertEqual(summary['api_object']['errors'], {'bad': 'Invalid IP address format'})
+        self.assertEqual(self.lookup.call_count, 2)
+
+    async def test_batch_rejects_bad_body(self):
+        status, _ = await self.request('POST', '/batch', {'ips': 'not a list'})
+        self.assertEqual(status, 400)
+
+    async def test_invalid_content_length(self):
+        """A non-numeric or negative Content-Length gets a 400 and closes the connection"""
+        for value in ('abc', '-5'):
+            reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+            writer.write(f'POST /batch HTTP/1.1\r\nHost: test\r\nContent-Length: {value}\r\n\r\n'.encode())
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            self.assertTrue(response.startswith(b'HTTP/1.1 400 '), response)
+            self.assertIn(b'invalid content-length', response)
+
+    async def test_unknown_route_and_method(self):
+        status, _ = await self.request('GET', '/nope')
+        self.assertEqual(status, 404)
+        status, _ = await self.request('POST', '/check/1.1.1.1')
+        self.assertEqual(status, 405)
+        status, _ = await self.request('GET', '/health')
+        self.assertEqual(status, 200)
+
+    async def test_metrics(self):
+        """GET /metrics returns Prometheus text including the summarize stage"""
+        await self.request('POST', '/batch', ['1.1.1.1'])
+        status, text = await self.request('GET', '/metrics')
+        self.assertEqual(status, 200)
+        self.assertIn('# TYPE abuseipdb_stage_seconds histogram', text)
+        self.assertIn('abuseipdb_stage_seconds_count{stage="summarize"}', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
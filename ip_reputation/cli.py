@@ -0,0 +1,140 @@
+"""
+ip-reputation: one command-line entry point for the single, batch, service
+and benchmark tools.
+
+    ip-reputation check 118.25.6.39
+    ip-reputation batch --input suspects.txt --workers 16 --format csv --output results.csv
+    ip-reputation batch --logs access.log auth.log --format csv --output results.csv
+    ip-reputation serve --port 8080
+    ip-reputation bench summary 100000
+
+Flags override the environment variables the individual tools read. Each
+subcommand imports only what it needs, and the HTTP stack is imported only
+when a request is actually sent, so validation errors and cache hits return
+quickly from shell pipelines.
+"""
+import os
+import sys
+import json
+import argparse
+
+
+def _cache(args):
+    if args.no_cache:
+        return None
+    from abuseipdb.cache import cache_from_env
+    return cache_from_env(args.cache_path)
+
+def _apply_threshold(args):
+    # calculate_risk_level reads the threshold from the environment.
+    if args.threshold is not None:
+        os.environ["CONFIDENCE_THRESHOLD"] = str(args.threshold)
+
+def check(args):
+    from check_ip.main import run
+    _apply_threshold(args)
+    result = run(args.ip, _cache(args))
+    print(json.dumps(result, indent=4))
+    return result["step_status"]["code"]
+
+def batch(args):
+    from check_ip_batch import main as batch_main
+    from check_ip_batch.journal import BatchJournal
+    from check_ip_batch.scheduler import DeferredQueue
+    from check_ip_batch.inputs import iter_ip_addresses
+    _apply_threshold(args)
+    if args.ips:
+        ip_addresses = args.ips
+    elif args.input:
+        ip_addresses = iter_ip_addresses(args.input, args.column)
+    elif args.logs:
+        from check_ip_batch.logs import log_ip_addresses
+        ip_addresses = log_ip_addresses(args.logs)
+    else:
+        ip_addresses = batch_main.input_ip_addresses()
+    if args.shards:
+        # Shard processes build their own cache from the environment.
+        if args.no_cache:
+            os.environ["ABUSEIPDB_CACHE_SIZE"] = "0"
+        elif args.cache_path:
+            os.environ["ABUSEIPDB_CACHE_PATH"] = args.cache_path
+        batch_main.run_shards(ip_addresses, args.shards, args.shard_dir, args.workers, args.format,
+                              args.output, args.shard, args.merge, overwrite=args.overwrite)
+        return 0
+    journal = BatchJournal(args.journal_path, args.job_id) if args.job_id else None
+    deferred = DeferredQueue(args.deferred_path) if args.deferred_path else None
+    batch_main.run(ip_addresses, args.workers, args.mode, args.format, args.output,
+                   journal, deferred, _cache(args), metrics_path=args.metrics_path, profile=args.profile,
+                   overwrite=args.overwrite)
+    return 0
+
+def serve(args):
+    from check_ip_service.main import run
+    run(args.host, args.port, args.workers, _cache(args))
+    return 0
+
+def benchmarks():
+    import pkgutil
+    import benchmarks as package
+    return sorted(module.name[len("bench_"):] for module in pkgutil.iter_modules(package.__path__)
+                  if module.name.startswith("bench_"))
+
+def bench(args):
+    import runpy
+    sys.argv = [f"benchmarks.bench_{args.name}", *args.args]
+    runpy.run_module(f"benchmarks.bench_{args.name}", run_name="__main__", alter_sys=True)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ip-reputation", description="IP reputation checks against AbuseIPDB.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    cache = argparse.ArgumentParser(add_help=False)
+    cache.add_argument("--no-cache", action="store_true", help="do not use the reputation cache")
+    cache.add_argument("--cache-path", help="SQLite file that keeps the cache between runs")
+    threshold = argparse.ArgumentParser(add_help=False)
+    threshold.add_argument("--threshold", type=int, help="score from which an IP is HIGH risk")
+
+    parser_check = commands.add_parser("check", parents=[cache, threshold], help="check one IP address")
+    parser_check.add_argument("ip", nargs="?", default=os.getenv("IP_ADDRESS"), help="IP address to check")
+    parser_check.set_defaults(func=check)
+
+    parser_batch = commands.add_parser("batch", parents=[cache, threshold], help="check many IP addresses")
+    parser_batch.add_argument("ips", nargs="*", help="IP addresses or CIDR networks (default: --input or IP_ADDRESSES)")
+    parser_batch.add_argument("--input", default=os.getenv("IP_INPUT_FILE"),
+                              help='file with one IP per line, CSV or gzip ("-" for stdin)')
+    parser_batch.add_argument("--logs", nargs="+", metavar="LOG",
+                              help="raw log files to extract the IPs from (most frequent first)")
+    parser_batch.add_argument("--column", default=os.getenv("IP_INPUT_COLUMN"), help="CSV column with the IPs")
+    parser_batch.add_argument("--workers", type=int, default=int(os.getenv("BATCH_WORKERS", 1)),
+                              help="lookups kept in flight at once")
+    parser_batch.add_argument("--mode", choices=["thread", "asyncio"], default=os.getenv("BATCH_MODE", "thread"))
+    parser_batch.add_argument("--job-id", default=os.getenv("BATCH_JOB_ID"), help="resumable job ID")
+    parser_batch.add_argument("--journal-path", default=os.getenv("BATCH_JOURNAL_PATH", "batch_journal.db"))
+    parser_batch.add_argument("--deferred-path", default=os.getenv("BATCH_DEFERRED_PATH"),
+                              help="queue for lookups deferred past the daily quota")
+    from check_ip_batch.options import add_batch_options
+    add_batch_options(parser_batch)
+    parser_batch.set_defaults(func=batch)
+
+    parser_serve = commands.add_parser("serve", parents=[cache], help="run the HTTP reputation service")
+    parser_serve.add_argument("--host", default=os.getenv("SERVICE_HOST", "0.0.0.0"))
+    parser_serve.add_argument("--port", type=int, default=int(os.getenv("SERVICE_PORT", 8080)))
+    parser_serve.add_argument("--workers", type=int, default=int(os.getenv("SERVICE_WORKERS", 32)))
+    parser_serve.set_defaults(func=serve)
+
+    parser_bench = commands.add_parser("bench", help="run a benchmark from the benchmarks package")
+    parser_bench.add_argument("name", help="benchmark name, e.g. summary or store")
+    parser_bench.add_argument("args", nargs=argparse.REMAINDER, help="arguments passed to the benchmark")
+    parser_bench.set_defaults(func=bench)
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        from check_ip_batch.options import check_batch_options
+        check_batch_options(parser, args)
+    if args.command == "bench" and args.name not in benchmarks():
+        parser.error(f"unknown benchmark {args.name!r} (available: {', '.join(benchmarks())})")
+    return args.func(args)
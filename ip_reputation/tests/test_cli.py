@@ -0,0 +1,102 @@
+import unittest
+import os
+import io
+import sys
+import csv
+import json
+import tempfile
+import subprocess
+from contextlib import redirect_stdout, redirect_stderr
+from unittest.mock import patch
+from ip_reputation.cli import main, build_parser, benchmarks
+
+
+class TestCli(unittest.TestCase):
+    """Test cases for the ip-reputation command-line entry point"""
+
+    def run_cli(self, *argv):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            code = main(list(argv))
+        return code, out.getvalue()
+
+    def test_check_invalid_ip(self):
+        code, out = self.run_cli('check', 'not_an_ip', '--no-cache')
+        self.assertEqual(code, 1)
+        self.assertEqual(json.loads(out)['step_status'], {'code': 1, 'message': 'failed'})
+
+    def test_check_without_network_skips_http_imports(self):
+        """A validation-only run never imports the HTTP stack"""
+        script = ("import sys\nfrom ip_reputation.cli import main\n"
+                  "main(['check', 'bad', '--no-cache'])\n"
+                  "print('loaded' if 'urllib3' in sys.modules else 'lazy', file=sys.stderr)")
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        proc = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True)
+        self.assertEqual(proc.stderr.strip(), 'lazy')
+
+    def test_check_skips_batch_and_optional_imports(self):
+        """check loads neither the HTTP stack nor the batch sinks and their optional pyarrow"""
+        script = ("import sys\nfrom ip_reputation.cli import main\n"
+                  "main(['check', 'bad', '--no-cache'])\n"
+                  "print(sorted(name for name in ('requests', 'pyarrow', 'check_ip_batch.sinks')\n"
+                  "             if name in sys.modules), file=sys.stderr)")
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        proc = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True)
+        self.assertEqual(proc.stderr.strip(), '[]')
+
+    def test_batch_to_csv(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.csv')
+            with patch.dict(os.environ, {}, clear=True):
+                code, out = self.run_cli('batch', 'bad', 'worse', '--no-cache', '--format', 'csv',
+                                         '--output', path)
+            with open(path, newline='') as handle:
+                rows = list(csv.reader(handle))
+        self.assertEqual(code, 0)
+        self.assertEqual([row[0] for row in rows[1:]], ['bad', 'worse'])
+        self.assertEqual(json.loads(out)['api_object']['summary']['total'], 2)
+
+    def test_batch_metrics_and_profile(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            metrics, profile = os.path.join(tmp, 'batch.prom'), os.path.join(tmp, 'batch.prof')
+            with patch.dict(os.environ, {}, clear=True):
+                code, _ = self.run_cli('batch', 'bad', '--no-cache', '--metrics-path', metrics,
+                                       '--profile', profile)
+            with open(metrics) as handle:
+                text = handle.read()
+            self.assertTrue(os.path.getsize(profile) > 0)
+        self.assertEqual(code, 0)
+        self.assertIn('abuseipdb_stage_seconds_count{stage="summarize"}', text)
+        self.assertIn('abuseipdb_api_errors_total{type="invalid_ip"}', text)
+
+    def test_batch_shard_flags(self):
+        args = build_parser().parse_args(['batch', '--shards', '4', '--shard', '2'])
+        self.assertEqual((args.shards, args.shard, args.merge), (4, 2, False))
+        with redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                main(['batch', '--shard', '2'])
+            with self.assertRaises(SystemExit):
+                main(['batch', '--shards', '2', '--shard', '2'])
+
+    def test_batch_logs_flag(self):
+        args = build_parser().parse_args(['batch', '--logs', 'access.log', 'auth.log'])
+        self.assertEqual(args.logs, ['access.log', 'auth.log'])
+        self.assertEqual(args.ips, [])
+
+    def test_flags_default_to_env(self):
+        with patch.dict(os.environ, {'BATCH_WORKERS': '8', 'OUTPUT_FORMAT': 'ndjson'}):
+            args = build_parser().parse_args(['batch'])
+        self.assertEqual((args.workers, args.format), (8, 'ndjson'))
+
+    def test_sink_needs_output(self):
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main(['batch', 'bad', '--format', 'sqlite'])
+
+    def test_bench_names(self):
+        self.assertIn('summary', benchmarks())
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main(['bench', 'nope'])
+
+
+if __name__ == '__main__':
+    unittest.main()